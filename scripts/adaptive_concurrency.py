@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+一括REST操作の並列数を自動調整するコントローラー（AIMD）
+
+delete_routes_final.py のように1件ずつ time.sleep(0.1) を挟むと遅すぎ、
+制限なしに並列で投げると 429 / 503 で失敗します。AdaptiveLimiter は同時実行数を
+
+- レイテンシが安定していて並列数を使い切っている間は +1 ずつ増やし（加算的増加）
+- 429 / 503 / タイムアウトが返ったら半分にし、Retry-After の間は新しいリクエストを止め（乗算的減少）
+- 直近のp95レイテンシが基準の --latency-tolerance 倍を超えたら 0.8 倍に減らす
+
+ことで、サーバーが捌ける最大の速さに自動で合わせます。基準レイテンシは観測したp95の最小値で、
+負荷の性質が変わったときに追従できるよう判定のたびに少しずつ緩めます。
+
+使い方（一括ローダー・削除・検証スクリプトから）:
+  from adaptive_concurrency import AdaptiveLimiter
+
+  limiter = AdaptiveLimiter(max_limit=32, label='削除')
+  for route_id, response in limiter.map(lambda rid: session.delete(url(rid)), route_ids):
+      ...
+  print(limiter.summary())
+
+  # 自前のスレッドから1件ずつ
+  response = limiter.call(session.get, url, timeout=30)
+
+call() は429 / 503 を受けたら待って再試行し、最後の応答を返します。例外のうち再試行するのは
+接続エラー・タイムアウトと、429 / 503 にあたる APIError（supabase-py は4xx / 5xx を例外にする）だけで、
+400 / 409 などはその場で送出し、並列数も変えません。
+実行中は report_interval 秒ごとに並列数・スループット・p95を1行で表示します。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+OVERLOAD_STATUSES = (429, 503)
+# APIError.code のうち混雑・一時的な接続不能を表すもの（JSONでない応答ではHTTPステータスが入る）
+OVERLOAD_ERROR_CODES = {'429', '503', 'PGRST000', 'PGRST001', 'PGRST002', '53300', '57P03'}
+# requests / httpx / 標準ライブラリの接続エラー・タイムアウト（MROのクラス名で判定）
+TRANSIENT_ERROR_NAMES = {'ConnectionError', 'Timeout', 'TimeoutError', 'TimeoutException',
+                         'NetworkError', 'RemoteProtocolError'}
+THROUGHPUT_WINDOW_SECONDS = 10.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    value = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """再試行してよい例外か（接続エラー・タイムアウト、または429 / 503 にあたる APIError）"""
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    return type(error).__name__ == 'APIError' and str(getattr(error, 'code', '')) in OVERLOAD_ERROR_CODES
+
+
+@dataclass
+class LimiterSnapshot:
+    limit: int
+    in_flight: int
+    completed: int
+    overloaded: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 backoff: float = 0.5, latency_backoff: float = 0.8, latency_tolerance: float = 2.0,
+                 max_rate: Optional[float] = None, max_retries: int = 5,
+                 report_interval: Optional[float] = 5.0, label: str = ''):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_rate = max_rate
+        self.max_retries = max_retries
+        self.report_interval = report_interval
+        self.label = label
+
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.completed = 0
+        self.overloaded = 0
+        self.errors = 0
+        self._started = time.monotonic()
+        self._pause_until = 0.0
+        self._next_start = 0.0
+        self._window: List[float] = []
+        self._saturated = False
+        self._hold = 0
+        self._baseline: Optional[float] = None
+        self._recent: Deque[float] = deque(maxlen=500)
+        self._finished: Deque[float] = deque()
+        self._last_report = time.monotonic()
+        self.peak_limit = self.limit
+
+    # ---------------- スロット ----------------
+
+    def acquire(self) -> float:
+        """実行枠を1つ取る（並列数・一時停止・最大レートを守るまで待つ）。戻り値は開始時刻"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._pause_until:
+                    self._cond.wait(self._pause_until - now)
+                    continue
+                if self.in_flight >= self.limit:
+                    self._cond.wait(0.5)
+                    continue
+                if self.max_rate:
+                    wait = self._next_start - now
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    self._next_start = max(now, self._next_start) + 1.0 / self.max_rate
+                self.in_flight += 1
+                if self.in_flight >= self.limit:
+                    self._saturated = True
+                return now
+
+    def release(self, started: float, overloaded: bool = False, error: bool = False,
+                retry_after: Optional[float] = None):
+        """実行枠を返し、結果を並列数の調整に使う"""
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            self._finished.append(now)
+            if overloaded:
+                self.overloaded += 1
+                self._on_overload(now, retry_after)
+            elif error:
+                self.errors += 1
+            else:
+                latency = now - started
+                self.completed += 1
+                self._recent.append(latency)
+                self._window.append(latency)
+                if self._hold:
+                    self._hold -= 1
+                if len(self._window) >= max(8, self.limit):
+                    self._on_window()
+            self._cond.notify_all()
+        self._maybe_report(now)
+
+    def _on_overload(self, now: float, retry_after: Optional[float]):
+        if retry_after:
+            self._pause_until = max(self._pause_until, now + min(retry_after, 60.0))
+        # 同じ混雑で何度も半減しないよう、減らした後は今の並列数ぶん成功するまで据え置く
+        if not self._hold:
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+            self._hold = self.limit
+            self._window.clear()
+            self._saturated = False
+
+    def _on_window(self):
+        p95 = percentile(self._window, 0.95)
+        if self._baseline is None:
+            self._baseline = p95
+        if p95 > self._baseline * self.latency_tolerance and not self._hold:
+            self.limit = max(self.min_limit, int(self.limit * self.latency_backoff))
+            self._hold = self.limit
+        elif self._saturated and not self._hold:
+            self.limit = min(self.max_limit, self.limit + 1)
+        self.peak_limit = max(self.peak_limit, self.limit)
+        # 基準は最小のp95。少しずつ緩めて、処理内容が重くなったときにも追従する
+        self._baseline = min(p95, self._baseline * 1.02)
+        self._window.clear()
+        self._saturated = False
+
+    # ---------------- 実行 ----------------
+
+    def call(self, func: Callable, *args, **kwargs):
+        """func(*args, **kwargs) を枠内で実行する。429 / 503 は待って再試行し、最後の応答を返す"""
+        for attempt in range(self.max_retries + 1):
+            started = self.acquire()
+            try:
+                response = func(*args, **kwargs)
+            except Exception as e:
+                if not is_overload_error(e):
+                    # 400 / 409 などは再試行しても同じなので、並列数を変えずにそのまま送出
+                    self.release(started, error=True)
+                    raise
+                # 接続エラーやタイムアウトも混雑とみなす
+                self.release(started, overloaded=True)
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(min(8.0, 0.5 * 2 ** attempt))
+                continue
+            status = getattr(response, 'status_code', None)
+            if status in OVERLOAD_STATUSES:
+                retry_after = retry_after_seconds(response)
+                self.release(started, overloaded=True, retry_after=retry_after)
+                if attempt < self.max_retries:
+                    if retry_after is None:
+                        time.sleep(min(8.0, 0.5 * 2 ** attempt))
+                    continue
+            else:
+                self.release(started, error=status is not None and status >= 500)
+            return response
+
+    def map(self, func: Callable, items: Iterable) -> Iterator[Tuple[object, object]]:
+        """items の各要素に func を並列に適用し、(要素, 結果) を入力順に返す。例外は結果として返す"""
+        def task(item):
+            try:
+                return item, self.call(func, item)
+            except Exception as e:
+                return item, e
+
+        with ThreadPoolExecutor(max_workers=self.max_limit) as pool:
+            yield from pool.map(task, items)
+        self._maybe_report(time.monotonic(), force=True)
+
+    # ---------------- 状態 ----------------
+
+    def snapshot(self) -> LimiterSnapshot:
+        now = time.monotonic()
+        with self._cond:
+            while self._finished and now - self._finished[0] > THROUGHPUT_WINDOW_SECONDS:
+                self._finished.popleft()
+            span = min(THROUGHPUT_WINDOW_SECONDS, max(now - self._started, 1e-6))
+            recent = list(self._recent)
+            return LimiterSnapshot(self.limit, self.in_flight, self.completed, self.overloaded, self.errors,
+                                   len(self._finished) / span,
+                                   percentile(recent, 0.5) * 1000, percentile(recent, 0.95) * 1000)
+
+    def summary(self) -> str:
+        s = self.snapshot()
+        elapsed = time.monotonic() - self._started
+        return (f"{self.label + ': ' if self.label else ''}{s.completed}件 / {elapsed:.1f}秒 "
+                f"(平均 {s.completed / max(elapsed, 1e-6):.1f}件/秒, 並列 最大{self.peak_limit} 最終{s.limit}, "
+                f"p50 {s.p50_ms:.0f}ms / p95 {s.p95_ms:.0f}ms, 混雑 {s.overloaded}回, エラー {s.errors}件)")
+
+    def _maybe_report(self, now: float, force: bool = False):
+        if not self.report_interval or (not force and now - self._last_report < self.report_interval):
+            return
+        self._last_report = now
+        s = self.snapshot()
+        print(f"   ⚡ {self.label + ' ' if self.label else ''}並列 {s.limit} (実行中 {s.in_flight}) / "
+              f"{s.throughput:.1f}件/秒 / p95 {s.p95_ms:.0f}ms / 完了 {s.completed} / 混雑 {s.overloaded}",
+              end='\n' if force else '\r', flush=True)
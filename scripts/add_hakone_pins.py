@@ -3,21 +3,11 @@
 箱根エリアの9本のルートに各3-5個のサンプルPinを追加
 """
 
-import os
-import json
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from areas import AREA_GROUPS
+from ops_env import create_service_client
+from route_resolver import RouteResolver
 
-load_dotenv('/home/user/wanwalk/.env')
-
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# ルートIDマッピングを読み込み
-with open('/home/user/wanwalk/scripts/hakone_route_ids.json', 'r', encoding='utf-8') as f:
-    route_ids = json.load(f)
+supabase = create_service_client()
 
 # テストユーザーID（プロジェクトドキュメントに記載）
 TEST_USER_ID = 'e09b6a6b-fb41-44ff-853e-7cc437836c77'
@@ -261,13 +251,18 @@ def main():
     
     total_success = 0
     total_error = 0
-    
-    for route_name, route_id in route_ids.items():
-        if route_name not in pins_data:
-            print(f"⚠️  {route_name} のPinデータが見つかりません")
+
+    # 箱根（親エリア＋サブエリア）の ルート名 → id を1回のクエリで解決
+    resolver = RouteResolver(supabase).load(AREA_GROUPS['箱根'])
+    route_ids = resolver.by_name(AREA_GROUPS['箱根'])
+
+    for route_name, pins in pins_data.items():
+        route_id = route_ids.get(route_name)
+        if route_id is None:
+            print(f"⚠️  {route_name} がDBに見つかりません（add_hakone_routes.py で追加してください）")
+            total_error += len(pins)
             continue
-        
-        pins = pins_data[route_name]
+
         print(f"\n🗺️  {route_name} ({len(pins)}個のPin)")
         print("-" * 80)
         
@@ -2,12 +2,10 @@
 """
 横浜・鎌倉エリアの各ルートにサンプルPinを追加
 """
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+from ops_env import create_service_client
+from route_resolver import RouteResolver
 
-load_dotenv('/home/user/wanwalk/.env')
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
+supabase = create_service_client()
 TEST_USER = 'e09b6a6b-fb41-44ff-853e-7cc437836c77'
 
 # エリアごとのPin
@@ -57,14 +55,16 @@ pins = {
     ],
 }
 
+# 全エリアの ルート名 → id を1回のクエリで解決
+resolver = RouteResolver(supabase).load(list(pins))
+
 total = 0
 for area_id, routes in pins.items():
     area_name = '横浜' if '2222' in area_id else '鎌倉'
     print(f"\n{'='*60}\n{area_name}エリアのPin追加\n{'='*60}")
     
     for route_data in routes:
-        res = supabase.table('official_routes').select('id').eq('area_id', area_id).eq('name', route_data['route']).single().execute()
-        route_id = res.data['id']
+        route_id = resolver.resolve(area_id, route_data['route'])
         
         print(f"\n🗺️  {route_data['route']} ({len(route_data['pins'])}個)")
         for idx, p in enumerate(route_data['pins'], 1):
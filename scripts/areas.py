@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+エリア名・エリアIDの解決ヘルパー
+
+エリア名→area_id の対応は csv_to_sql.py の AREA_MAP（全21エリア）を正とします。
+「箱根」は親エリアと5つのサブエリアをまとめて指します。
+"""
+
+import re
+from typing import Dict, List
+
+from csv_to_sql import AREA_MAP
+
+HAKONE_PARENT_AREA_ID = 'a1111111-1111-1111-1111-111111111111'
+
+AREA_GROUPS: Dict[str, List[str]] = {
+    '箱根': [HAKONE_PARENT_AREA_ID] + [area_id for name, area_id in AREA_MAP.items() if name.startswith('箱根・')],
+}
+
+UUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+
+def resolve_area_ids(name_or_id: str) -> List[str]:
+    """エリア名・グループ名・area_id のいずれかから area_id のリストを返す"""
+    key = name_or_id.strip()
+    if UUID_PATTERN.match(key):
+        return [key.lower()]
+    if key in AREA_GROUPS:
+        return list(AREA_GROUPS[key])
+    if key in AREA_MAP:
+        return [AREA_MAP[key]]
+    raise KeyError(f"エリア '{key}' が見つかりません。利用可能なエリア: {', '.join(list(AREA_GROUPS) + list(AREA_MAP))}")
+
+
+def area_name(area_id: str) -> str:
+    """area_id から表示用のエリア名を返す（不明ならIDのまま）"""
+    for name, known_id in AREA_MAP.items():
+        if known_id == area_id:
+            return name
+    if area_id == HAKONE_PARENT_AREA_ID:
+        return '箱根'
+    return area_id
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+サムネイル（thumbnail_url）の一括補完スクリプト
+
+auto_update_thumbnail.sql の fn_auto_update_thumbnail は route_photos への INSERT 時にしか
+動かないため、トリガー導入前のルートや散歩は thumbnail_url が NULL のまま、
+あるいは古い写真のままになっています。
+
+このスクリプトは親テーブルを主キー順のチャンクに分け、チャンクごとに
+DISTINCT ON で「最適な候補写真」を1回のクエリで選んで、値が変わる行だけを UPDATE します。
+処理済みの位置は .cache/thumbnail_backfill.json に保存するので、中断しても続きから再開でき、
+何度実行しても結果は同じです。
+
+対象:
+  routes.thumbnail_url          ← route_photos.storage_path
+                                   （display_order → created_at の順で最初の写真。トリガーと同じ規則）
+  official_routes.thumbnail_url ← route_pin_photos.photo_url
+                                   （いいねの多いピンの1枚目。手動で設定済みの画像は上書きしない）
+
+使い方:
+  python3 scripts/backfill_thumbnails.py --dry-run
+  python3 scripts/backfill_thumbnails.py --only routes.thumbnail_url --chunk-size 2000
+  python3 scripts/backfill_thumbnails.py --restart          # チェックポイントを無視して最初から
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from ops_env import PROJECT_ROOT, connect, resolve_dsn
+
+CHECKPOINT_PATH = PROJECT_ROOT / '.cache' / 'thumbnail_backfill.json'
+
+
+@dataclass
+class ThumbnailSpec:
+    """親テーブルのサムネイル列と、チャンク内の候補を (parent_id, url) で返すSQL"""
+    table: str
+    column: str
+    candidates_sql: str
+    only_missing: bool
+    required_tables: List[str]
+
+    @property
+    def key(self) -> str:
+        return f"{self.table}.{self.column}"
+
+
+# 候補SQLは %(ids)s（チャンクのID配列）を受け取り、親ごとに最大1行を返す
+THUMBNAILS = [
+    ThumbnailSpec(
+        'routes', 'thumbnail_url',
+        """
+        SELECT DISTINCT ON (p.route_id) p.route_id AS parent_id, p.storage_path AS url
+        FROM route_photos p
+        WHERE p.route_id = ANY(%(ids)s)
+        ORDER BY p.route_id, p.display_order NULLS LAST, p.created_at, p.id
+        """,
+        only_missing=False,
+        required_tables=['routes', 'route_photos'],
+    ),
+    ThumbnailSpec(
+        'official_routes', 'thumbnail_url',
+        """
+        SELECT DISTINCT ON (pin.route_id) pin.route_id AS parent_id, ph.photo_url AS url
+        FROM route_pins pin
+        JOIN route_pin_photos ph ON ph.pin_id = pin.id
+        WHERE pin.route_id = ANY(%(ids)s)
+        ORDER BY pin.route_id, pin.likes_count DESC NULLS LAST, pin.created_at, ph.photo_order, ph.id
+        """,
+        only_missing=True,
+        required_tables=['official_routes', 'route_pins', 'route_pin_photos'],
+    ),
+]
+
+
+@dataclass
+class BackfillStats:
+    spec: ThumbnailSpec
+    scanned: int = 0
+    changed: int = 0
+    updated: int = 0
+    chunks: int = 0
+    resumed_from: Optional[str] = None
+    duration_ms: float = 0.0
+
+
+def load_checkpoints() -> Dict[str, str]:
+    try:
+        return json.loads(CHECKPOINT_PATH.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_checkpoints(checkpoints: Dict[str, str]):
+    CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CHECKPOINT_PATH.with_suffix('.tmp')
+    tmp.write_text(json.dumps(checkpoints, indent=2), encoding='utf-8')
+    tmp.replace(CHECKPOINT_PATH)
+
+
+class ThumbnailBackfiller:
+    def __init__(self, conn, chunk_size: int, dry_run: bool, verbose: bool):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.verbose = verbose
+
+    def exists(self, spec: ThumbnailSpec) -> bool:
+        row = self.conn.execute(
+            """
+            SELECT
+              EXISTS (SELECT 1 FROM information_schema.columns
+                      WHERE table_schema = 'public' AND table_name = %s AND column_name = %s),
+              (SELECT COUNT(*) FROM information_schema.tables
+               WHERE table_schema = 'public' AND table_name = ANY(%s))
+            """,
+            (spec.table, spec.column, spec.required_tables),
+        ).fetchone()
+        return bool(row[0]) and row[1] == len(spec.required_tables)
+
+    def backfill(self, spec: ThumbnailSpec, checkpoints: Dict[str, str]) -> BackfillStats:
+        stats = BackfillStats(spec, resumed_from=checkpoints.get(spec.key))
+        started = time.perf_counter()
+        last_id = stats.resumed_from
+
+        while True:
+            with self.conn.transaction():
+                chunk_ids = self._next_chunk(spec, last_id)
+                if not chunk_ids:
+                    break
+                changes = self._diff_chunk(spec, chunk_ids)
+                if changes and not self.dry_run:
+                    stats.updated += self._apply(spec, changes)
+
+            last_id = str(chunk_ids[-1])
+            stats.chunks += 1
+            stats.scanned += len(chunk_ids)
+            stats.changed += len(changes)
+            for parent_id, old, new in (changes if self.dry_run or self.verbose else []):
+                print(f"   {'🔍' if self.dry_run else '🖼️ '} {parent_id}: {old or '(なし)'} → {new}")
+            if not self.dry_run:
+                # コミット済みのチャンクまでを記録（中断後はこの次のIDから再開）
+                checkpoints[spec.key] = last_id
+                save_checkpoints(checkpoints)
+            if len(chunk_ids) < self.chunk_size:
+                break
+
+        if not self.dry_run:
+            checkpoints.pop(spec.key, None)
+            save_checkpoints(checkpoints)
+        stats.duration_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def _next_chunk(self, spec: ThumbnailSpec, last_id: Optional[str]) -> List:
+        where = ["id > %s"] if last_id is not None else []
+        if spec.only_missing:
+            where.append(f"({spec.column} IS NULL OR {spec.column} = '')")
+        params = ((last_id,) if last_id is not None else ()) + (self.chunk_size,)
+        rows = self.conn.execute(
+            f"SELECT id FROM {spec.table} {'WHERE ' + ' AND '.join(where) if where else ''} "
+            f"ORDER BY id LIMIT %s",
+            params,
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _diff_chunk(self, spec: ThumbnailSpec, chunk_ids: List) -> List:
+        """チャンク内で候補と現在値が異なる行を (id, 現在値, 新しい値) で返す"""
+        return self.conn.execute(
+            f"""
+            WITH best AS ({spec.candidates_sql})
+            SELECT t.id, t.{spec.column}, best.url
+            FROM {spec.table} t
+            JOIN best ON best.parent_id = t.id
+            WHERE t.{spec.column} IS DISTINCT FROM best.url
+            ORDER BY t.id
+            """,
+            {'ids': chunk_ids},
+        ).fetchall()
+
+    def _apply(self, spec: ThumbnailSpec, changes: List) -> int:
+        missing_only = f"AND (t.{spec.column} IS NULL OR t.{spec.column} = '')" if spec.only_missing else ""
+        cursor = self.conn.execute(
+            f"""
+            UPDATE {spec.table} AS t
+            SET {spec.column} = d.url
+            FROM UNNEST(%s::uuid[], %s::text[]) AS d(id, url)
+            WHERE t.id = d.id
+              AND t.{spec.column} IS DISTINCT FROM d.url
+              {missing_only}
+            """,
+            ([c[0] for c in changes], [c[2] for c in changes]),
+        )
+        return cursor.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='サムネイル（thumbnail_url）の一括補完')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--dry-run', action='store_true', help='変更内容を表示するだけで更新しない')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='1トランザクションで処理する親行数')
+    parser.add_argument('--only', action='append', choices=[s.key for s in THUMBNAILS],
+                        help='対象を限定（複数指定可）')
+    parser.add_argument('--restart', action='store_true', help='チェックポイントを破棄して最初から処理')
+    parser.add_argument('--verbose', action='store_true', help='適用時も更新した行を表示')
+    args = parser.parse_args()
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    checkpoints = {} if args.restart or args.dry_run else load_checkpoints()
+    conn = connect(dsn)
+    backfiller = ThumbnailBackfiller(conn, args.chunk_size, args.dry_run, args.verbose)
+    specs = [s for s in THUMBNAILS if not args.only or s.key in args.only]
+
+    print("=" * 80)
+    print(f"🖼️  サムネイル補完{'（ドライラン）' if args.dry_run else ''}")
+    print("=" * 80)
+
+    results = []
+    try:
+        for spec in specs:
+            if not backfiller.exists(spec):
+                print(f"\n⏭️  {spec.key}: テーブルまたはカラムが存在しないためスキップ")
+                continue
+            resume = f"（{checkpoints[spec.key]} の次から再開）" if spec.key in checkpoints else ''
+            print(f"\n📊 {spec.key}{resume}")
+            results.append(backfiller.backfill(spec, checkpoints))
+    except KeyboardInterrupt:
+        print("\n⏹️  中断しました。再実行するとチェックポイントから再開します")
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 80)
+    print("📋 結果")
+    print("=" * 80)
+    for stats in results:
+        action = f"更新 {stats.updated}件" if not args.dry_run else "未適用"
+        print(f"  {stats.spec.key}: 走査 {stats.scanned}行 / 変更 {stats.changed}件 / {action} "
+              f"({stats.chunks}チャンク, {stats.duration_ms / 1000:.2f}秒)")
+    if args.dry_run and any(s.changed for s in results):
+        print("\n💡 --dry-run を外して実行すると更新を適用します")
+
+
+if __name__ == '__main__':
+    main()
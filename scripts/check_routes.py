@@ -14,7 +14,7 @@ import os
 import sys
 import json
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 
 try:
     import requests
@@ -24,6 +24,8 @@ except ImportError:
     print("  pip3 install requests")
     sys.exit(1)
 
+from stream_rows import StreamError, stream_rows
+
 
 @dataclass
 class RouteIssue:
@@ -56,21 +58,16 @@ class RouteValidator:
             'Content-Type': 'application/json'
         }
     
-    def fetch_all_routes(self) -> List[Dict[str, Any]]:
-        """全ての推奨ルートを取得"""
-        url = f"{self.supabase_url}/rest/v1/recommended_routes?select=*"
+    def iter_routes(self) -> Iterator[Dict[str, Any]]:
+        """全ての推奨ルートを1件ずつ取得（応答を読みながら返すので全件をメモリに載せない）"""
+        url = f"{self.supabase_url}/rest/v1/recommended_routes"
         
         print("📡 Supabaseから推奨ルートデータを取得中...")
-        response = requests.get(url, headers=self.headers)
-        
-        if response.status_code != 200:
-            print(f"❌ エラー: ステータスコード {response.status_code}")
-            print(f"レスポンス: {response.text}")
+        try:
+            yield from stream_rows(url, self.headers, params={'select': '*'})
+        except StreamError as e:
+            print(f"❌ エラー: {e}")
             sys.exit(1)
-        
-        routes = response.json()
-        print(f"✅ {len(routes)}件の推奨ルートを取得しました\n")
-        return routes
     
     def validate_route(self, route: Dict[str, Any]) -> List[RouteIssue]:
         """単一ルートの妥当性をチェック"""
@@ -303,17 +300,17 @@ def main():
     # 検証実行
     validator = RouteValidator(supabase_url, supabase_key)
     
-    # 全ルート取得
-    routes = validator.fetch_all_routes()
-    
-    # 各ルートを検証
+    # 全ルートを取得しながら検証
     all_issues = []
-    for route in routes:
+    total_routes = 0
+    for route in validator.iter_routes():
+        total_routes += 1
         issues = validator.validate_route(route)
         all_issues.extend(issues)
+    print(f"✅ {total_routes}件の推奨ルートを取得しました\n")
     
     # レポート生成
-    validator.generate_report(all_issues, len(routes))
+    validator.generate_report(all_issues, total_routes)
 
 
 if __name__ == '__main__':
@@ -59,6 +59,17 @@ def escape_sql_string(s):
     """SQLのシングルクォートをエスケープ"""
     return s.replace("'", "''")
 
+def build_pet_info(row):
+    """CSVの1行からpet_info（JSONB）の辞書を構築"""
+    return {
+        "parking": row.get('駐車場情報', '').strip(),
+        "surface": row.get('路面状況', '').strip(),
+        "restroom": row.get('トイレ情報', '').strip(),
+        "water_station": row.get('水飲み場情報', '').strip(),
+        "pet_facilities": row.get('ペット関連施設', '').strip(),
+        "others": row.get('その他備考', '').strip()
+    }
+
 def csv_to_sql(csv_file_path, output_sql_path):
     """CSVファイルをSQLファイルに変換"""
     
@@ -95,14 +106,7 @@ def csv_to_sql(csv_file_path, output_sql_path):
                     continue
                 
                 # pet_infoをJSON形式で構築
-                pet_info = {
-                    "parking": row.get('駐車場情報', '').strip(),
-                    "surface": row.get('路面状況', '').strip(),
-                    "restroom": row.get('トイレ情報', '').strip(),
-                    "water_station": row.get('水飲み場情報', '').strip(),
-                    "pet_facilities": row.get('ペット関連施設', '').strip(),
-                    "others": row.get('その他備考', '').strip()
-                }
+                pet_info = build_pet_info(row)
                 
                 # JSON文字列化（エスケープ処理）
                 pet_info_json = json.dumps(pet_info, ensure_ascii=False)
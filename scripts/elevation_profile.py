@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+標高プロファイル・獲得標高の一括計算スクリプト
+
+elevation_gain_meters はカタログや CSV テンプレートで手入力されている一方、
+散歩中に記録している route_points.altitude は使われていません。
+このスクリプトは親テーブルを主キー順のチャンクに分け、チャンク内の経路ポイントを
+1回のクエリで取得して numpy でまとめて計算し、値が変わった行だけを一括UPDATEします。
+
+計算手順（ルート・散歩ごと）:
+  1. 点間距離（haversine）の累積で距離軸を作り、標高を --step m 間隔に再サンプリング
+  2. --smooth m の移動平均で平滑化
+  3. 単調区間の端点（極値）だけを取り出し、--threshold m のヒステリシスで上り・下りを合計
+     （GPS標高の数mの揺れを獲得標高に数えない）
+  4. --grade-window m 区間ごとの勾配の最大値（上り下りの絶対値）
+  5. 断面を --profile-points 点に間引いて elevation_profile に保存
+
+対象:
+  official_routes ← official_route_points.elevation_m
+  routes          ← route_points.altitude（アプリの散歩記録）
+  daily_walks     ← daily_walk_points.altitude（001 適用環境）
+
+標高データのないルートは手入力の値をそのまま残します。
+015_elevation_profiles.sql の適用が必要です。
+
+使い方:
+  python3 scripts/elevation_profile.py --dry-run
+  python3 scripts/elevation_profile.py --only official_routes --threshold 5
+  python3 scripts/elevation_profile.py --chunk-size 200 --verbose
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from geo_utils import EARTH_RADIUS_M
+from ops_env import connect, resolve_dsn
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ numpyモジュールがインストールされていません")
+    print("以下のコマンドでインストールしてください:")
+    print("  pip3 install numpy")
+    sys.exit(1)
+
+RESULT_COLUMNS = ['elevation_loss_meters', 'max_grade_percent', 'elevation_profile']
+
+
+@dataclass
+class ProfileSpec:
+    """標高を書き戻す親テーブルと、順序付きの経路ポイントを持つ子テーブル"""
+    table: str
+    points_table: str
+    altitude_column: str
+    order_columns: List[str]  # 先に見つかった列で並べる
+    gain_columns: List[str]  # 環境によって列名が異なる
+    coords_sql: str
+
+    @property
+    def key(self) -> str:
+        return self.table
+
+
+PROFILES = [
+    ProfileSpec(
+        'official_routes', 'official_route_points', 'elevation_m',
+        order_columns=['point_order', 'sequence_number'],
+        gain_columns=['elevation_gain_meters', 'elevation_gain_m'],
+        coords_sql="ST_Y(p.location::geometry), ST_X(p.location::geometry)",
+    ),
+    ProfileSpec(
+        'routes', 'route_points', 'altitude',
+        order_columns=['sequence_number'],
+        gain_columns=['elevation_gain_meters'],
+        coords_sql="p.latitude, p.longitude",
+    ),
+    ProfileSpec(
+        'daily_walks', 'daily_walk_points', 'altitude',
+        order_columns=['sequence_number'],
+        gain_columns=['elevation_gain_meters'],
+        coords_sql="p.latitude, p.longitude",
+    ),
+]
+
+
+@dataclass
+class ProfileParams:
+    step_m: float = 10.0
+    smooth_m: float = 50.0
+    threshold_m: float = 3.0
+    grade_window_m: float = 50.0
+    profile_points: int = 100
+
+
+@dataclass
+class ElevationResult:
+    gain: float
+    loss: float
+    max_grade: float
+    profile: List[List[float]]
+
+
+@dataclass
+class ProfileStats:
+    spec: ProfileSpec
+    scanned: int = 0
+    computed: int = 0
+    no_elevation: int = 0
+    changed: int = 0
+    updated: int = 0
+    chunks: int = 0
+    points: int = 0
+    duration_ms: float = 0.0
+
+
+def cumulative_distance(lat: 'np.ndarray', lon: 'np.ndarray', starts: 'np.ndarray') -> 'np.ndarray':
+    """系列ごとの累積距離（m）。starts は各系列の先頭インデックス（昇順）"""
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    dlat, dlon = np.diff(lat_r), np.diff(lon_r)
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(dlon / 2) ** 2
+    seg = np.concatenate([[0.0], 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0, 1)))])
+    seg[starts] = 0.0  # 系列の境目はつながない
+    total = np.cumsum(seg)
+    lengths = np.diff(np.append(starts, len(lat)))
+    return total - np.repeat(total[starts], lengths)
+
+
+def hysteresis_gain_loss(values: 'np.ndarray', threshold: float) -> Tuple[float, float]:
+    """閾値未満の折り返しを無視して上り・下りの合計を求める"""
+    diff = np.diff(values)
+    moving = np.flatnonzero(diff != 0)
+    if len(moving) == 0:
+        return 0.0, 0.0
+    # 向きが変わる位置（極値）だけを残すと、逐次処理は数十点で済む
+    direction = np.sign(diff[moving])
+    turns = moving[1:][direction[1:] != direction[:-1]]
+    keys = values[np.concatenate([[0], turns, [len(values) - 1]])]
+
+    gain = loss = 0.0
+    anchor = extreme = float(keys[0])
+    trend = 0
+    for v in keys[1:]:
+        v = float(v)
+        if trend == 0:
+            if abs(v - anchor) >= threshold:
+                trend = 1 if v > anchor else -1
+                extreme = v
+        elif trend > 0:
+            if v > extreme:
+                extreme = v
+            elif extreme - v >= threshold:
+                gain += extreme - anchor
+                anchor, extreme, trend = extreme, v, -1
+        else:
+            if v < extreme:
+                extreme = v
+            elif v - extreme >= threshold:
+                loss += anchor - extreme
+                anchor, extreme, trend = extreme, v, 1
+    if trend > 0:
+        gain += extreme - anchor
+    elif trend < 0:
+        loss += anchor - extreme
+    return gain, loss
+
+
+def compute_profile(distance: 'np.ndarray', altitude: 'np.ndarray',
+                    params: ProfileParams) -> Optional[ElevationResult]:
+    """1ルート分の距離・標高の系列から獲得標高・勾配・断面を計算（標高が足りなければ None）"""
+    valid = ~np.isnan(altitude)
+    if valid.sum() < 2:
+        return None
+    d, a = distance[valid], altitude[valid]
+    total = float(distance[-1])
+    if d[-1] - d[0] < params.step_m:
+        return None
+
+    n = max(int(total // params.step_m), 1) + 1
+    grid = np.linspace(0.0, total, n)
+    step = total / (n - 1)
+    resampled = np.interp(grid, d, a)
+
+    window = max(int(round(params.smooth_m / step)), 1) | 1  # 奇数にして中心をそろえる
+    if window > 1 and n > window:
+        padded = np.pad(resampled, window // 2, mode='edge')
+        smoothed = np.convolve(padded, np.ones(window) / window, mode='valid')
+    else:
+        smoothed = resampled
+
+    gain, loss = hysteresis_gain_loss(smoothed, params.threshold_m)
+
+    k = max(int(round(params.grade_window_m / step)), 1)
+    if n > k:
+        grades = (smoothed[k:] - smoothed[:-k]) / (grid[k:] - grid[:-k]) * 100
+        max_grade = float(np.abs(grades).max())
+    else:
+        max_grade = float(abs(smoothed[-1] - smoothed[0]) / total * 100)
+
+    xs = np.linspace(0.0, total, min(params.profile_points, n))
+    ys = np.interp(xs, grid, smoothed)
+    profile = [[int(round(x)), round(float(y), 1)] for x, y in zip(xs, ys)]
+    return ElevationResult(round(gain, 1), round(loss, 1), round(max_grade, 1), profile)
+
+
+def compute_chunk(rows: List[Tuple], params: ProfileParams) -> Tuple[Dict[str, ElevationResult], int]:
+    """(parent_id, lat, lon, altitude) の行（parent_id・順序でソート済み）を系列ごとに計算"""
+    if not rows:
+        return {}, 0
+    ids = np.array([str(r[0]) for r in rows], dtype=object)
+    coords = np.array([(r[1], r[2], r[3]) for r in rows], dtype=float)
+    starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+    distance = cumulative_distance(coords[:, 0], coords[:, 1], starts)
+
+    results = {}
+    bounds = np.append(starts, len(rows))
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        result = compute_profile(distance[begin:end], coords[begin:end, 2], params)
+        if result is not None:
+            results[ids[begin]] = result
+    return results, len(rows)
+
+
+class ElevationProfiler:
+    def __init__(self, conn, params: ProfileParams, chunk_size: int, dry_run: bool, verbose: bool):
+        self.conn = conn
+        self.params = params
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.verbose = verbose
+
+    def resolve(self, spec: ProfileSpec) -> Optional[Dict[str, str]]:
+        """実際の列名を調べる（テーブル・列が揃っていなければ None）"""
+        rows = self.conn.execute(
+            """
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = ANY(%s)
+            """,
+            ([spec.table, spec.points_table],),
+        ).fetchall()
+        parent = {c for t, c in rows if t == spec.table}
+        points = {c for t, c in rows if t == spec.points_table}
+        order = next((c for c in spec.order_columns if c in points), None)
+        gain = next((c for c in spec.gain_columns if c in parent), None)
+        if not order or not gain or spec.altitude_column not in points or not set(RESULT_COLUMNS) <= parent:
+            return None
+        return {'order': order, 'gain': gain}
+
+    def run(self, spec: ProfileSpec, columns: Dict[str, str]) -> ProfileStats:
+        stats = ProfileStats(spec)
+        started = time.perf_counter()
+        last_id = None
+
+        while True:
+            with self.conn.transaction():
+                stored = self._next_chunk(spec, columns, last_id)
+                if not stored:
+                    break
+                points = self._fetch_points(spec, columns, list(stored))
+                results, n_points = compute_chunk(points, self.params)
+                changes = [
+                    (parent_id, result) for parent_id, result in results.items()
+                    if _changed(stored[parent_id], result)
+                ]
+                if changes and not self.dry_run:
+                    stats.updated += self._apply(spec, columns, changes)
+
+            last_id = list(stored)[-1]
+            stats.chunks += 1
+            stats.scanned += len(stored)
+            stats.points += n_points
+            stats.computed += len(results)
+            stats.no_elevation += len(stored) - len(results)
+            stats.changed += len(changes)
+            for parent_id, result in changes:
+                if self.dry_run or self.verbose:
+                    old = stored[parent_id][0]
+                    print(f"   {'🔍' if self.dry_run else '⛰️ '} {parent_id}: 獲得標高 "
+                          f"{'(なし)' if old is None else f'{float(old):.1f}m'} → {result.gain:.1f}m "
+                          f"/ 下り {result.loss:.1f}m / 最大勾配 {result.max_grade:.1f}%")
+            if len(stored) < self.chunk_size:
+                break
+
+        stats.duration_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def _next_chunk(self, spec: ProfileSpec, columns: Dict[str, str], last_id: Optional[str]) -> Dict[str, Tuple]:
+        """チャンクの親IDと現在の保存値（ID順）"""
+        where = "WHERE id > %s" if last_id is not None else ""
+        params = ((last_id,) if last_id is not None else ()) + (self.chunk_size,)
+        rows = self.conn.execute(
+            f"""
+            SELECT id, {columns['gain']}, elevation_loss_meters, max_grade_percent, elevation_profile
+            FROM {spec.table} {where}
+            ORDER BY id LIMIT %s
+            """,
+            params,
+        ).fetchall()
+        return {str(row[0]): tuple(row[1:]) for row in rows}
+
+    def _fetch_points(self, spec: ProfileSpec, columns: Dict[str, str], parent_ids: List[str]) -> List[Tuple]:
+        return self.conn.execute(
+            f"""
+            SELECT p.route_id, {spec.coords_sql}, p.{spec.altitude_column}
+            FROM {spec.points_table} p
+            WHERE p.route_id = ANY(%s::uuid[])
+            ORDER BY p.route_id, p.{columns['order']}
+            """,
+            (parent_ids,),
+        ).fetchall()
+
+    def _apply(self, spec: ProfileSpec, columns: Dict[str, str], changes: List) -> int:
+        gain = columns['gain']
+        cursor = self.conn.execute(
+            f"""
+            UPDATE {spec.table} AS t
+            SET {gain} = d.gain,
+                elevation_loss_meters = d.loss,
+                max_grade_percent = d.grade,
+                elevation_profile = d.profile::jsonb
+            FROM UNNEST(%s::uuid[], %s::numeric[], %s::numeric[], %s::numeric[], %s::text[])
+                 AS d(id, gain, loss, grade, profile)
+            WHERE t.id = d.id
+              AND (t.{gain}, t.elevation_loss_meters, t.max_grade_percent, t.elevation_profile)
+                  IS DISTINCT FROM (d.gain, d.loss, d.grade, d.profile::jsonb)
+            """,
+            (
+                [c[0] for c in changes],
+                [c[1].gain for c in changes],
+                [c[1].loss for c in changes],
+                [c[1].max_grade for c in changes],
+                [json.dumps(c[1].profile, separators=(',', ':')) for c in changes],
+            ),
+        )
+        return cursor.rowcount
+
+
+def _changed(stored: Tuple, result: ElevationResult) -> bool:
+    gain, loss, grade, profile = stored
+    if profile != result.profile:
+        return True
+    for old, new in ((gain, result.gain), (loss, result.loss), (grade, result.max_grade)):
+        # 整数列（elevation_gain_m）には丸めた値が入る
+        if old is None or float(old) not in (new, float(round(new))):
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='標高プロファイル・獲得標高の一括計算')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--dry-run', action='store_true', help='変更内容を表示するだけで更新しない')
+    parser.add_argument('--chunk-size', type=int, default=500, help='1トランザクションで処理する親行数')
+    parser.add_argument('--only', action='append', choices=[s.key for s in PROFILES],
+                        help='対象を限定（複数指定可）')
+    parser.add_argument('--step', type=float, default=10.0, help='再サンプリング間隔（m）')
+    parser.add_argument('--smooth', type=float, default=50.0, help='移動平均の幅（m）')
+    parser.add_argument('--threshold', type=float, default=3.0, help='ヒステリシスの閾値（m）')
+    parser.add_argument('--grade-window', type=float, default=50.0, help='勾配を測る区間長（m）')
+    parser.add_argument('--profile-points', type=int, default=100, help='保存する断面の点数')
+    parser.add_argument('--verbose', action='store_true', help='適用時も更新した行を表示')
+    args = parser.parse_args()
+
+    if args.step <= 0 or args.profile_points < 2:
+        parser.error('--step は正の値、--profile-points は2以上にしてください')
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    params = ProfileParams(args.step, args.smooth, args.threshold, args.grade_window, args.profile_points)
+    conn = connect(dsn)
+    profiler = ElevationProfiler(conn, params, args.chunk_size, args.dry_run, args.verbose)
+    specs = [s for s in PROFILES if not args.only or s.key in args.only]
+
+    print("=" * 80)
+    print(f"⛰️  標高プロファイル計算{'（ドライラン）' if args.dry_run else ''}")
+    print("=" * 80)
+
+    results = []
+    try:
+        for spec in specs:
+            columns = profiler.resolve(spec)
+            if columns is None:
+                print(f"\n⏭️  {spec.key}: テーブルまたはカラムが存在しないためスキップ"
+                      f"（015_elevation_profiles.sql を適用してください）")
+                continue
+            print(f"\n📊 {spec.key} ← {spec.points_table}.{spec.altitude_column}")
+            results.append(profiler.run(spec, columns))
+    except KeyboardInterrupt:
+        print("\n⏹️  中断しました（コミット済みのチャンクは反映されています）")
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 80)
+    print("📋 結果")
+    print("=" * 80)
+    for stats in results:
+        action = f"更新 {stats.updated}件" if not args.dry_run else "未適用"
+        print(f"  {stats.spec.key}: 走査 {stats.scanned}行 / 計算 {stats.computed}件 "
+              f"(標高なし {stats.no_elevation}件, {stats.points}点) / 変更 {stats.changed}件 / {action} "
+              f"({stats.chunks}チャンク, {stats.duration_ms / 1000:.2f}秒)")
+    if args.dry_run and any(s.changed for s in results):
+        print("\n💡 --dry-run を外して実行すると更新を適用します")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+公式ルートの所要時間を実際の散歩記録から推定するジョブ
+
+estimated_minutes（環境によって estimated_duration_minutes）は手入力で、
+エクスポートガイドも 3.0km/h を前提にしています。一方 route_walks には実際に
+犬と飼い主が歩いた duration_minutes が記録されています。
+
+このジョブは前回の水位以降に追加された route_walks だけを
+route_duration_histogram（ルート×分ごとの散歩数）に加算し、ヒストグラムから
+中央値・p25・p75 を求めて official_routes.duration_* に書き戻します。
+散歩を1件ずつ保持しないので、数百万件でも1回の GROUP BY と数千行の読み込みで済みます。
+加算済みの散歩の削除・修正は 020_route_duration_histogram_deletes.sql のトリガーが反映します。
+
+- --min-minutes / --max-minutes の範囲外（記録の止め忘れなど）は分位点の計算から除外
+- 散歩が --min-walks 件未満のルートは、同じ難易度×標高帯のルートの
+  ペース（分/km）の分位点に距離を掛けて推定（duration_source = 'bucket'）
+- --apply-estimate で、実測（duration_source = 'walks'）の中央値を estimated_minutes にも反映
+
+016_route_duration_stats.sql の適用が必要です。
+--dry-run はヒストグラムへの加算も含めて1つのトランザクションで計算し、最後にロールバックします。
+
+使い方:
+  python3 scripts/estimate_durations.py --dry-run
+  python3 scripts/estimate_durations.py --min-walks 10 --apply-estimate
+  python3 scripts/estimate_durations.py --rebuild          # ヒストグラムを作り直す
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import bisect
+import sys
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ops_env import connect, resolve_dsn
+
+WATERMARK_JOB = 'duration:route_walks'
+QUANTILES = (0.25, 0.5, 0.75)
+
+# 環境によって列名が異なる（値は (列名, メートルへの換算係数)）
+DISTANCE_COLUMNS = [('distance_meters', 1.0), ('distance_km', 1000.0)]
+DIFFICULTY_COLUMNS = ['difficulty_level', 'difficulty']
+GAIN_COLUMNS = ['elevation_gain_meters', 'elevation_gain_m']
+ESTIMATE_COLUMNS = ['estimated_minutes', 'estimated_duration_minutes']
+
+
+@dataclass
+class RouteDuration:
+    id: str
+    name: str
+    distance_m: Optional[float]
+    bucket: Tuple[str, str]
+    estimated: Optional[int]
+    stored: Tuple
+    histogram: List[Tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class DurationEstimate:
+    p25: int
+    median: int
+    p75: int
+    walks: int
+    source: str
+
+    def values(self) -> Tuple:
+        return (self.p25, self.median, self.p75, self.walks, self.source)
+
+
+def weighted_quantiles(histogram: Sequence[Tuple[float, int]], qs: Sequence[float]) -> Optional[List[float]]:
+    """(値, 件数) のヒストグラムから分位点を求める（numpy の linear 補間と同じ定義）"""
+    items = sorted((value, weight) for value, weight in histogram if weight > 0)
+    if not items:
+        return None
+    cumulative = []
+    total = 0
+    for _, weight in items:
+        total += weight
+        cumulative.append(total)
+
+    def value_at(rank: int) -> float:
+        return items[bisect.bisect_right(cumulative, rank)][0]
+
+    results = []
+    for q in qs:
+        position = q * (total - 1)
+        lower = int(position)
+        lo, hi = value_at(lower), value_at(min(lower + 1, total - 1))
+        results.append(lo + (hi - lo) * (position - lower))
+    return results
+
+
+def elevation_band(gain: Optional[float], edges: List[float]) -> str:
+    if gain is None:
+        return '不明'
+    for edge in edges:
+        if float(gain) < edge:
+            return f"<{edge:g}m"
+    return f">={edges[-1]:g}m" if edges else '全体'
+
+
+class DurationEstimator:
+    def __init__(self, conn, min_minutes: int, max_minutes: int, min_walks: int,
+                 elevation_edges: List[float], lag_seconds: int):
+        self.conn = conn
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.min_walks = min_walks
+        self.elevation_edges = elevation_edges
+        self.lag_seconds = lag_seconds
+
+    def resolve_columns(self) -> Optional[Dict[str, object]]:
+        names = {row[0] for row in self.conn.execute(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'official_routes'
+            """
+        ).fetchall()}
+        if 'duration_median_minutes' not in names:
+            return None
+        return {
+            'distance': next(((c, f) for c, f in DISTANCE_COLUMNS if c in names), None),
+            'difficulty': next((c for c in DIFFICULTY_COLUMNS if c in names), None),
+            'gain': next((c for c in GAIN_COLUMNS if c in names), None),
+            'estimate': next((c for c in ESTIMATE_COLUMNS if c in names), None),
+            'label': 'name' if 'name' in names else 'title',
+        }
+
+    def ingest(self, rebuild: bool) -> Tuple[int, int]:
+        """水位以降の散歩をヒストグラムに加算（加算した散歩数・ルート数を返す）"""
+        with self.conn.transaction():
+            if rebuild:
+                self.conn.execute("DELETE FROM route_duration_histogram")
+                self.conn.execute("DELETE FROM maintenance_watermarks WHERE job_name = %s", (WATERMARK_JOB,))
+            # 水位の行をロックしてから数える（削除トリガーは待ってから更新後の水位で判定する）
+            self.conn.execute(
+                "SELECT 1 FROM maintenance_watermarks WHERE job_name = %s FOR UPDATE", (WATERMARK_JOB,)
+            )
+            row = self.conn.execute(
+                """
+                SELECT
+                  COALESCE((SELECT last_created_at FROM maintenance_watermarks WHERE job_name = %s),
+                           '-infinity'::timestamptz),
+                  NOW() - make_interval(secs => %s)
+                """,
+                (WATERMARK_JOB, self.lag_seconds),
+            ).fetchone()
+            since, upper = row
+            walks, routes = self.conn.execute(
+                """
+                WITH new_walks AS (
+                  SELECT route_id, LEAST(duration_minutes, 1440) AS minutes, COUNT(*)::int AS walks
+                  FROM route_walks
+                  WHERE created_at > %s AND created_at <= %s
+                    AND route_id IS NOT NULL AND duration_minutes > 0
+                  GROUP BY 1, 2
+                ), merged AS (
+                  INSERT INTO route_duration_histogram AS h (route_id, minutes, walks)
+                  SELECT route_id, minutes, walks FROM new_walks
+                  ON CONFLICT (route_id, minutes) DO UPDATE SET walks = h.walks + EXCLUDED.walks
+                )
+                SELECT COALESCE(SUM(walks), 0), COUNT(DISTINCT route_id) FROM new_walks
+                """,
+                (since, upper),
+            ).fetchone()
+            self.conn.execute(
+                """
+                INSERT INTO maintenance_watermarks (job_name, last_created_at, updated_at)
+                VALUES (%s, %s, NOW())
+                ON CONFLICT (job_name)
+                  DO UPDATE SET last_created_at = EXCLUDED.last_created_at, updated_at = EXCLUDED.updated_at
+                """,
+                (WATERMARK_JOB, upper),
+            )
+        return int(walks), int(routes)
+
+    def load_routes(self, columns: Dict[str, object]) -> List[RouteDuration]:
+        distance = columns['distance']
+        select = [
+            'r.id', f"r.{columns['label']}",
+            f"r.{distance[0]} * {distance[1]}" if distance else 'NULL',
+            f"r.{columns['difficulty']}" if columns['difficulty'] else 'NULL',
+            f"r.{columns['gain']}" if columns['gain'] else 'NULL',
+            f"r.{columns['estimate']}" if columns['estimate'] else 'NULL',
+            'r.duration_p25_minutes', 'r.duration_median_minutes', 'r.duration_p75_minutes',
+            'r.duration_walks_count', 'r.duration_source',
+        ]
+        routes = {}
+        for row in self.conn.execute(f"SELECT {', '.join(select)} FROM official_routes r ORDER BY r.id").fetchall():
+            route_id, label, distance_m, difficulty, gain, estimated = row[:6]
+            routes[str(route_id)] = RouteDuration(
+                str(route_id), label,
+                float(distance_m) if distance_m else None,
+                (difficulty or '不明', elevation_band(gain, self.elevation_edges)),
+                estimated, tuple(row[6:]),
+            )
+        for route_id, minutes, walks in self.conn.execute(
+            "SELECT route_id, minutes, walks FROM route_duration_histogram WHERE minutes BETWEEN %s AND %s",
+            (self.min_minutes, self.max_minutes),
+        ).fetchall():
+            route = routes.get(str(route_id))
+            if route is not None:
+                route.histogram.append((minutes, walks))
+        return list(routes.values())
+
+    def estimate(self, routes: List[RouteDuration]) -> Dict[str, DurationEstimate]:
+        """十分な散歩があるルートは実測、少ないルートは難易度×標高帯のペースから推定"""
+        paces: Dict[Tuple[str, str], List[Tuple[float, int]]] = defaultdict(list)
+        for route in routes:
+            if route.distance_m:
+                km = route.distance_m / 1000
+                paces[route.bucket].extend((minutes / km, walks) for minutes, walks in route.histogram)
+
+        estimates = {}
+        for route in routes:
+            n = sum(walks for _, walks in route.histogram)
+            if n >= self.min_walks:
+                q = weighted_quantiles(route.histogram, QUANTILES)
+                estimates[route.id] = DurationEstimate(*(int(round(v)) for v in q), n, 'walks')
+                continue
+            bucket = paces.get(route.bucket, [])
+            if route.distance_m and sum(w for _, w in bucket) >= self.min_walks:
+                q = weighted_quantiles(bucket, QUANTILES)
+                km = route.distance_m / 1000
+                estimates[route.id] = DurationEstimate(*(max(int(round(v * km)), 1) for v in q), n, 'bucket')
+        return estimates
+
+    def apply(self, changes: List[Tuple[RouteDuration, DurationEstimate]], estimate_column: Optional[str]) -> int:
+        set_estimate = (
+            f", {estimate_column} = CASE WHEN d.source = 'walks' THEN d.median ELSE t.{estimate_column} END"
+            if estimate_column else ""
+        )
+        with self.conn.transaction():
+            cursor = self.conn.execute(
+                f"""
+                UPDATE official_routes AS t
+                SET duration_p25_minutes = d.p25,
+                    duration_median_minutes = d.median,
+                    duration_p75_minutes = d.p75,
+                    duration_walks_count = d.walks,
+                    duration_source = d.source
+                    {set_estimate}
+                FROM UNNEST(%s::uuid[], %s::int[], %s::int[], %s::int[], %s::int[], %s::text[])
+                     AS d(id, p25, median, p75, walks, source)
+                WHERE t.id = d.id
+                """,
+                (
+                    [route.id for route, _ in changes],
+                    *([e.values()[i] for _, e in changes] for i in range(5)),
+                ),
+            )
+        return cursor.rowcount
+
+
+def _changed(route: RouteDuration, estimate: DurationEstimate, apply_estimate: bool) -> bool:
+    if route.stored != estimate.values():
+        return True
+    return apply_estimate and estimate.source == 'walks' and route.estimated != estimate.median
+
+
+def main():
+    parser = argparse.ArgumentParser(description='公式ルートの所要時間を散歩記録から推定')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--dry-run', action='store_true', help='変更内容を表示するだけで書き戻さない（ヒストグラム・水位も変更しない）')
+    parser.add_argument('--min-walks', type=int, default=5, help='実測値を使う最小散歩数（既定: 5）')
+    parser.add_argument('--min-minutes', type=int, default=5, help='これより短い記録は除外（分）')
+    parser.add_argument('--max-minutes', type=int, default=480, help='これより長い記録は除外（分）')
+    parser.add_argument('--elevation-buckets', default='50,150',
+                        help='標高帯の境界（獲得標高m、カンマ区切り。既定: 50,150）')
+    parser.add_argument('--lag-seconds', type=int, default=60, help='取りこぼし防止の遅延（秒）')
+    parser.add_argument('--rebuild', action='store_true', help='ヒストグラムと水位を作り直す')
+    parser.add_argument('--apply-estimate', action='store_true',
+                        help='実測の中央値を estimated_minutes にも反映する')
+    args = parser.parse_args()
+
+    try:
+        edges = sorted(float(v) for v in args.elevation_buckets.split(',') if v.strip())
+    except ValueError:
+        parser.error('--elevation-buckets は数値のカンマ区切りで指定してください')
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    conn = connect(dsn)
+    estimator = DurationEstimator(conn, args.min_minutes, args.max_minutes, args.min_walks,
+                                  edges, args.lag_seconds)
+    print("=" * 80)
+    print(f"⏱️  所要時間の推定{'（ドライラン）' if args.dry_run else ''}")
+    print("=" * 80)
+
+    try:
+        columns = estimator.resolve_columns()
+        if columns is None:
+            print("❌ official_routes に duration_* 列がありません（016_route_duration_stats.sql を適用してください）")
+            sys.exit(1)
+
+        started = time.perf_counter()
+        # ドライランではヒストグラムへの加算を含めて計算し、読み終えたらロールバックする
+        with conn.transaction(force_rollback=True) if args.dry_run else nullcontext():
+            walks, touched = estimator.ingest(args.rebuild)
+            print(f"\n📥 新しい散歩 {walks}件（{touched}ルート）をヒストグラムに加算"
+                  f"{'（ドライランのため取り消し）' if args.dry_run else ''}")
+
+            routes = estimator.load_routes(columns)
+            estimates = estimator.estimate(routes)
+        changes = [(r, estimates[r.id]) for r in routes
+                   if r.id in estimates and _changed(r, estimates[r.id], args.apply_estimate)]
+        for route, est in changes:
+            manual = f"（手入力 {route.estimated}分）" if route.estimated is not None else ''
+            print(f"   {'🔍' if args.dry_run else '⏱️ '} {route.name}: 中央値 {est.median}分 "
+                  f"[{est.p25}〜{est.p75}] {est.walks}件 {est.source}{manual}")
+
+        updated = 0
+        if changes and not args.dry_run:
+            updated = estimator.apply(changes, columns['estimate'] if args.apply_estimate else None)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+
+    by_source = defaultdict(int)
+    for est in estimates.values():
+        by_source[est.source] += 1
+    print("\n" + "=" * 80)
+    print("📋 結果")
+    print("=" * 80)
+    print(f"  ルート {len(routes)}件: 実測 {by_source['walks']}件 / 帯から推定 {by_source['bucket']}件 / "
+          f"データ不足 {len(routes) - len(estimates)}件")
+    action = f"更新 {updated}件" if not args.dry_run else "未適用"
+    print(f"  変更 {len(changes)}件 / {action} ({elapsed:.2f}秒)")
+    if args.dry_run and changes:
+        print("\n💡 --dry-run を外して実行すると更新を適用します")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 """
 Week 3 データ追加の最終確認
+
+local_mirror.py のミラーを増分同期してから、ローカルのSQLiteで集計します
+（--offline を付けると同期せずに手元のミラーだけで確認）。
+削除済みのルート・ピンを数えないよう、同期では全IDを照合して消えた行も除きます。
 """
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+import sys
+
+from local_mirror import open_mirror, sync_mirror
+
+if '--offline' not in sys.argv:
+    sync_mirror(tables=['official_routes', 'route_pins'], prune=True)
+db = open_mirror()
 
-load_dotenv('/home/user/wanwalk/.env')
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
+# route_pins が空のまま同期されたミラーには id 列しかない
+pin_columns = {row[1] for row in db.execute('PRAGMA table_info("route_pins")')}
+pin_join = "LEFT JOIN route_pins p ON p.route_id = r.id" if 'route_id' in pin_columns else ""
+pin_count_sql = "COUNT(p.id)" if pin_join else "0"
 
 print("=" * 80)
 print("📊 Week 3 データ追加 - 最終確認レポート")
@@ -24,21 +34,21 @@ total_routes = 0
 total_pins = 0
 
 for area_name, area_id in areas:
-    # ルート数
-    routes_res = supabase.table('official_routes').select('id', count='exact').eq('area_id', area_id).execute()
-    route_count = routes_res.count if hasattr(routes_res, 'count') else len(routes_res.data)
-    
-    # Pin数を取得
-    route_ids = [r['id'] for r in routes_res.data]
-    pin_count = 0
-    for rid in route_ids:
-        pc = supabase.table('route_pins').select('id', count='exact').eq('route_id', rid).execute()
-        pin_count += pc.count if hasattr(pc, 'count') else len(pc.data)
-    
+    # ルート数・Pin数
+    route_count, pin_count = db.execute(
+        f"""
+        SELECT COUNT(DISTINCT r.id), {pin_count_sql}
+        FROM official_routes r
+        {pin_join}
+        WHERE r.area_id = ?
+        """,
+        (area_id,),
+    ).fetchone()
+
     print(f"\n🗺️  {area_name}エリア")
     print(f"  - ルート数: {route_count}本")
     print(f"  - Pin数: {pin_count}個")
-    
+
     total_routes += route_count
     total_pins += pin_count
 
@@ -51,15 +61,19 @@ print("\n📋 最近追加されたルート")
 print("-" * 80)
 
 for area_name, area_id in areas:
-    result = supabase.table('official_routes')\
-        .select('name, distance_meters, difficulty_level, created_at')\
-        .eq('area_id', area_id)\
-        .order('created_at', desc=True)\
-        .limit(3)\
-        .execute()
-    
+    rows = db.execute(
+        """
+        SELECT name, distance_meters, difficulty_level, created_at
+        FROM official_routes
+        WHERE area_id = ?
+        ORDER BY created_at DESC
+        LIMIT 3
+        """,
+        (area_id,),
+    ).fetchall()
+
     print(f"\n{area_name}:")
-    for idx, route in enumerate(result.data, 1):
+    for idx, route in enumerate(rows, 1):
         print(f"  {idx}. {route['name']}")
         print(f"     {route['distance_meters']}m / {route['difficulty_level']} / {route['created_at'][:10]}")
 
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+運用スクリプト共通の位置情報ヘルパー
+
+PostgRESTは GEOGRAPHY 列を16進数のEWKB文字列で返すため、
+ここで緯度経度に変換します。書き込みは EWKT（SRID=4326;POINT(lon lat)）を使います。
+"""
+
+import math
+import re
+import struct
+from typing import List, Optional, Tuple
+
+LatLon = Tuple[float, float]
+
+EARTH_RADIUS_M = 6371008.8
+
+WKB_POINT = 1
+WKB_LINESTRING = 2
+EWKB_SRID_FLAG = 0x20000000
+EWKB_Z_FLAG = 0x80000000
+EWKB_M_FLAG = 0x40000000
+
+
+def _parse_ewkb(value: str) -> Tuple[int, List[LatLon]]:
+    data = bytes.fromhex(value)
+    order = '<' if data[0] == 1 else '>'
+    geom_type = struct.unpack(order + 'I', data[1:5])[0]
+    offset = 5
+    if geom_type & EWKB_SRID_FLAG:
+        offset += 4
+    dims = 2 + bool(geom_type & EWKB_Z_FLAG) + bool(geom_type & EWKB_M_FLAG)
+    base_type = geom_type & 0xFF
+
+    if base_type == WKB_POINT:
+        x, y = struct.unpack(order + 'dd', data[offset:offset + 16])
+        return base_type, [(y, x)]
+    if base_type == WKB_LINESTRING:
+        count = struct.unpack(order + 'I', data[offset:offset + 4])[0]
+        offset += 4
+        points = []
+        for _ in range(count):
+            x, y = struct.unpack(order + 'dd', data[offset:offset + 16])
+            points.append((y, x))
+            offset += 8 * dims
+        return base_type, points
+    raise ValueError(f"未対応のジオメトリ型です: {base_type}")
+
+
+def _parse_wkt_coords(text: str) -> List[LatLon]:
+    body = text[text.index('(') + 1:text.rindex(')')]
+    points = []
+    for pair in body.split(','):
+        parts = pair.split()
+        points.append((float(parts[1]), float(parts[0])))
+    return points
+
+
+def parse_point(value) -> Optional[LatLon]:
+    """EWKB(16進) / EWKT / GeoJSON のPointを (lat, lon) に変換"""
+    if not value:
+        return None
+    if isinstance(value, dict):
+        lon, lat = value['coordinates'][:2]
+        return (lat, lon)
+    if re.match(r'^[0-9A-Fa-f]+$', value):
+        _, points = _parse_ewkb(value)
+        return points[0]
+    return _parse_wkt_coords(value)[0]
+
+
+def parse_linestring(value) -> List[LatLon]:
+    """EWKB(16進) / EWKT / GeoJSON のLineStringを [(lat, lon), ...] に変換"""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [(c[1], c[0]) for c in value['coordinates']]
+    if re.match(r'^[0-9A-Fa-f]+$', value):
+        _, points = _parse_ewkb(value)
+        return points
+    return _parse_wkt_coords(value)
+
+
+def point_ewkt(lat: float, lon: float) -> str:
+    return f"SRID=4326;POINT({lon} {lat})"
+
+
+def linestring_ewkt(points: List[LatLon]) -> str:
+    return "SRID=4326;LINESTRING(" + ', '.join(f"{lon} {lat}" for lat, lon in points) + ")"
+
+
+def haversine_m(a: LatLon, b: LatLon) -> float:
+    """2点間の大円距離（メートル）"""
+    lat1, lon1 = map(math.radians, a)
+    lat2, lon2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+ルート・ピン写真の縮小版（WebP / AVIF）一括生成スクリプト
+
+route_pin_photos.photo_url や official_routes.thumbnail_url / gallery_images は
+原寸画像を指しているため、アプリの OptimizedImage が毎回大きな画像を受け取っています。
+このスクリプトは原画像のディレクトリ（またはパス一覧）から、固定幅の WebP / AVIF を
+プロセスプールで並列生成し、EXIF等のメタデータを取り除いて manifest.json に記録します。
+
+- 向きはEXIFのOrientationを反映してから保存（メタデータ自体は書き出さない）
+- 原画像より大きい幅には拡大しない
+- 原画像のSHA-256と変換設定が前回の manifest と同じで出力が揃っていればスキップ
+
+使い方:
+  python3 scripts/image_derivatives.py --input originals/ --out build/images
+  python3 scripts/image_derivatives.py --input originals/ --out build/images --widths 400 800 --formats webp
+  python3 scripts/image_derivatives.py --list photos.txt --out build/images --base-url https://cdn.example.com/images
+
+manifest.json の形式:
+  {"version": 1, "settings": {...}, "images": {
+     "<key>": {"source": "...", "sha256": "...", "width": 4032, "height": 3024,
+               "derivatives": [{"format": "webp", "width": 640, "height": 480,
+                                "path": "<key>/640.webp", "bytes": 51234, "url": "..."}]}}}
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    print("❌ Pillowモジュールがインストールされていません")
+    print("以下のコマンドでインストールしてください:")
+    print("  pip3 install Pillow pillow-avif-plugin")
+    sys.exit(1)
+
+try:
+    import pillow_avif  # noqa: F401  Pillow 11.3未満でAVIFを有効にする
+except ImportError:
+    pass
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff'}
+DEFAULT_WIDTHS = [320, 640, 1280]
+DEFAULT_FORMATS = ['webp', 'avif']
+QUALITY = {'webp': 80, 'avif': 55}
+SAVE_OPTIONS = {
+    'webp': {'quality': QUALITY['webp'], 'method': 6},
+    'avif': {'quality': QUALITY['avif']},
+}
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ImageJob:
+    key: str
+    source: str
+    widths: List[int]
+    formats: List[str]
+    out_dir: str
+    previous_sha256: Optional[str]
+    previous_entry: Optional[Dict[str, Any]]
+    settings_changed: bool
+
+
+def avif_available() -> bool:
+    return 'AVIF' in Image.SAVE or bool(features.check('avif'))
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _outputs_exist(out_dir: Path, entry: Dict[str, Any]) -> bool:
+    return all((out_dir / d['path']).exists() for d in entry.get('derivatives', []))
+
+
+def process_image(job: ImageJob) -> Dict[str, Any]:
+    """1枚の原画像から全幅・全形式の縮小版を作る（ワーカープロセスで実行）"""
+    source = Path(job.source)
+    out_dir = Path(job.out_dir)
+    sha256 = file_sha256(source)
+
+    if (not job.settings_changed and job.previous_entry and sha256 == job.previous_sha256
+            and _outputs_exist(out_dir, job.previous_entry)):
+        return {'key': job.key, 'status': 'skipped', 'entry': job.previous_entry}
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        width, height = image.size
+
+        # 原寸より大きい幅には拡大しない（原寸が最大幅以下なら原寸の版も作る）
+        targets = sorted({w for w in job.widths if w < width} | ({width} if width <= max(job.widths) else set()))
+        derivatives = []
+        for target in targets:
+            target_height = max(1, round(height * target / width))
+            resized = image if target == width else image.resize((target, target_height), Image.LANCZOS)
+            # exif_transpose / resize は info の exif・xmp・icc_profile を引き継ぎ、pillow-avif-plugin は
+            # 保存時に info を使うので、ここで空にしてメタデータを書き出さない
+            resized.info = {}
+            for fmt in job.formats:
+                rel_path = f"{job.key}/{target}.{fmt}"
+                dest = out_dir / rel_path
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dest.with_name(dest.name + '.tmp')
+                resized.save(tmp, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                os.replace(tmp, dest)
+                derivatives.append({
+                    'format': fmt,
+                    'width': target,
+                    'height': target_height,
+                    'path': rel_path,
+                    'bytes': dest.stat().st_size,
+                })
+
+    entry = {
+        'source': str(source),
+        'sha256': sha256,
+        'width': width,
+        'height': height,
+        'source_bytes': source.stat().st_size,
+        'derivatives': derivatives,
+    }
+    return {'key': job.key, 'status': 'built', 'entry': entry}
+
+
+def collect_sources(input_dir: Optional[Path], list_file: Optional[Path]) -> Dict[str, Path]:
+    """キー（出力先のサブディレクトリ名）→ 原画像パス
+
+    --list の画像はファイル名（拡張子なし）をキーにするため、別の画像が同じキーに
+    なると出力と manifest が上書きされてしまう。その場合は ValueError にする。
+    """
+    sources: Dict[str, Path] = {}
+
+    def add(key: str, path: Path):
+        existing = sources.get(key)
+        if existing is not None and existing.resolve() != path.resolve():
+            raise ValueError(f"出力先のキー '{key}' が重複しています: {existing} / {path}")
+        sources[key] = path
+
+    if input_dir:
+        for path in sorted(input_dir.rglob('*')):
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                add(path.relative_to(input_dir).with_suffix('').as_posix(), path)
+    if list_file:
+        for line in list_file.read_text(encoding='utf-8').splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                path = Path(line)
+                add(path.with_suffix('').name, path)
+    return sources
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+
+def write_manifest(path: Path, manifest: Dict[str, Any]):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='写真の縮小版（WebP / AVIF）一括生成')
+    source = parser.add_argument_group('入力（どちらか、または両方）')
+    source.add_argument('--input', type=Path, help='原画像のディレクトリ（サブディレクトリも対象）')
+    source.add_argument('--list', type=Path, help='原画像パスを1行1件で書いたファイル')
+    parser.add_argument('--out', type=Path, required=True, help='出力ディレクトリ（manifest.json もここに書く）')
+    parser.add_argument('--widths', type=int, nargs='+', default=DEFAULT_WIDTHS, help='生成する幅（px）')
+    parser.add_argument('--formats', nargs='+', choices=['webp', 'avif'], default=DEFAULT_FORMATS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='並列プロセス数')
+    parser.add_argument('--base-url', help='manifest の各縮小版に url を付ける場合のベースURL')
+    parser.add_argument('--force', action='store_true', help='変更がなくても作り直す')
+    args = parser.parse_args()
+
+    if not args.input and not args.list:
+        parser.error('--input または --list を指定してください')
+
+    formats = list(args.formats)
+    if 'avif' in formats and not avif_available():
+        print("⚠️  このPillowではAVIFを書き出せないため、WebPのみ生成します")
+        print("   pip3 install pillow-avif-plugin で有効になります")
+        formats.remove('avif')
+    if not formats:
+        sys.exit(1)
+
+    try:
+        sources = collect_sources(args.input, args.list)
+    except ValueError as e:
+        print(f"❌ エラー: {e}")
+        print("   ファイル名を変えるか、--input でディレクトリごと指定してください")
+        sys.exit(1)
+    if not sources:
+        print("⚠️  対象の画像がありません")
+        return
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    manifest_path = args.out / 'manifest.json'
+    previous = load_manifest(manifest_path)
+    settings = {'widths': sorted(set(args.widths)), 'formats': formats, 'quality': {f: QUALITY[f] for f in formats}}
+    settings_changed = args.force or previous.get('settings') != settings
+    previous_images = previous.get('images', {})
+
+    jobs = [
+        ImageJob(key, str(path), settings['widths'], formats, str(args.out),
+                 previous_images.get(key, {}).get('sha256'), previous_images.get(key), settings_changed)
+        for key, path in sources.items()
+    ]
+
+    print("=" * 60)
+    print(f"🖼️  縮小版生成: {len(jobs)}枚 × 幅{settings['widths']} × {'/'.join(formats)}（{args.workers}プロセス）")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    images: Dict[str, Any] = {}
+    built = skipped = failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(process_image, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  ❌ {job.key}: {e}")
+                failed += 1
+                # 失敗した画像は前回の結果を残しておく
+                if job.previous_entry:
+                    images[job.key] = job.previous_entry
+                continue
+            images[job.key] = result['entry']
+            if result['status'] == 'built':
+                built += 1
+                print(f"  ✅ {job.key} ({len(result['entry']['derivatives'])}ファイル)")
+            else:
+                skipped += 1
+
+    if args.base_url:
+        base = args.base_url.rstrip('/')
+        for entry in images.values():
+            for derivative in entry['derivatives']:
+                derivative['url'] = f"{base}/{derivative['path']}"
+
+    write_manifest(manifest_path, {
+        'version': MANIFEST_VERSION,
+        'settings': settings,
+        'images': dict(sorted(images.items())),
+    })
+
+    source_bytes = sum(e.get('source_bytes', 0) for e in images.values())
+    output_bytes = sum(d['bytes'] for e in images.values() for d in e['derivatives'])
+    print("\n" + "=" * 60)
+    print(f"📊 生成 {built}枚 / 変更なし {skipped}枚 / 失敗 {failed}枚 "
+          f"({time.perf_counter() - started:.1f}秒)")
+    print(f"   原画像 {source_bytes / 1e6:.1f}MB → 縮小版合計 {output_bytes / 1e6:.1f}MB")
+    print(f"   manifest: {manifest_path}")
+    print("=" * 60)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
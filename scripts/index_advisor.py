@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+"""
+マイグレーションSQLの静的インデックスアドバイザー
+
+supabase_migrations/ と supabase/migrations/ のSQLを解析し、
+RPC関数・ビューの WHERE / JOIN / ORDER BY で使われるカラムを抽出して
+既存の CREATE INDEX と突き合わせ、不足している複合インデックス・
+部分インデックスを提案します。
+
+使い方:
+  python3 scripts/index_advisor.py
+  python3 scripts/index_advisor.py --stats table_stats.json
+  python3 scripts/index_advisor.py --dsn "$DATABASE_URL" --dump-stats table_stats.json
+  python3 scripts/index_advisor.py --sql proposed_indexes.sql
+
+テーブルサイズの統計スナップショット（--stats）は以下のどちらかの形式:
+  {"route_pins": 120000, "official_routes": 300}
+  [{"relname": "route_pins", "n_live_tup": 120000}, ...]
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from migration_runner import migration_sort_key
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MIGRATION_DIRS = [
+    PROJECT_ROOT / 'supabase_migrations',
+    PROJECT_ROOT / 'supabase' / 'migrations',
+]
+
+# テーブル別名として扱わないキーワード
+SQL_KEYWORDS = {
+    'where', 'on', 'join', 'left', 'right', 'inner', 'outer', 'full', 'cross',
+    'group', 'order', 'limit', 'offset', 'set', 'values', 'using', 'with',
+    'select', 'returning', 'union', 'having', 'window', 'lateral', 'as',
+    'and', 'or', 'not', 'natural', 'for', 'into', 'default', 'then', 'end',
+}
+
+# CREATE TABLE 内でカラム定義ではない行の先頭キーワード
+CONSTRAINT_ITEM = re.compile(r'\s*(constraint|primary|unique|foreign|check|exclude|like)\b', re.IGNORECASE)
+
+# 比較演算子の種類
+EQ_OPERATORS = {'=', 'in', 'is'}
+RANGE_OPERATORS = {'<', '>', '<=', '>=', 'between'}
+
+
+@dataclass
+class IndexDef:
+    """既存インデックス（主キー・UNIQUE制約を含む）"""
+    name: str
+    table: str
+    columns: List[str]
+    method: str = 'btree'
+    where: Optional[str] = None
+    source: str = ''
+
+
+@dataclass
+class TableDef:
+    """CREATE TABLE / ALTER TABLE から得たカラム情報"""
+    name: str
+    columns: Dict[str, str] = field(default_factory=dict)  # カラム名 → 型
+
+
+@dataclass
+class Predicate:
+    """関数内で検出した1つの述語"""
+    table: str
+    column: str
+    kind: str  # 'eq', 'range', 'order', 'spatial', 'join'
+    constant: Optional[str] = None  # 部分インデックス候補（例: 'TRUE'）
+
+
+@dataclass
+class QueryUsage:
+    """関数（またはビュー）ごと・テーブルごとのアクセスパターン"""
+    function: str
+    table: str
+    eq: List[str] = field(default_factory=list)
+    range: List[str] = field(default_factory=list)
+    order: List[str] = field(default_factory=list)
+    spatial: List[str] = field(default_factory=list)
+    constants: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class Proposal:
+    """インデックス提案"""
+    table: str
+    columns: List[str]
+    where: Optional[str]
+    method: str
+    status: str  # 'missing'（未カバー）/ 'prefix'（先頭列のみカバー）
+    functions: Set[str] = field(default_factory=set)
+    table_rows: int = 0
+
+    @property
+    def name(self) -> str:
+        suffix = '_'.join(self.columns)
+        if self.where:
+            suffix += '_partial'
+        return f"{self.table}_{suffix}_idx"
+
+    @property
+    def score(self) -> int:
+        weight = 2 if self.status == 'missing' else 1
+        return weight * max(self.table_rows, 1) * len(self.functions)
+
+    def to_sql(self) -> str:
+        using = f" USING {self.method.upper()}" if self.method != 'btree' else ''
+        sql = f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table}{using} ({', '.join(self.columns)})"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql + ';'
+
+
+# ============================================================
+# SQLファイルの読み込み
+# ============================================================
+
+def list_migration_files(dirs: List[Path]) -> List[Path]:
+    files: List[Path] = []
+    for directory in dirs:
+        if directory.exists():
+            files.extend(sorted(directory.glob('*.sql'), key=migration_sort_key))
+    return files
+
+
+def strip_comments(sql: str) -> str:
+    """-- と /* */ コメントを除去（文字列リテラル内は保持）"""
+    result = []
+    i = 0
+    in_string = False
+    while i < len(sql):
+        ch = sql[i]
+        if in_string:
+            result.append(ch)
+            if ch == "'":
+                in_string = False
+            i += 1
+        elif ch == "'":
+            in_string = True
+            result.append(ch)
+            i += 1
+        elif sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = len(sql) if end == -1 else end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = len(sql) if end == -1 else end + 2
+        else:
+            result.append(ch)
+            i += 1
+    return ''.join(result)
+
+
+def find_matching_paren(text: str, start: int) -> int:
+    """text[start] == '(' に対応する ')' の位置を返す"""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == '(':
+            depth += 1
+        elif text[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(text) - 1
+
+
+def split_top_level(text: str, sep: str = ',') -> List[str]:
+    """括弧の外側にある区切り文字で分割"""
+    parts = []
+    depth = 0
+    current = []
+    for ch in text:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def bare_name(identifier: str) -> str:
+    """public.route_pins → route_pins"""
+    return identifier.strip().strip('"').split('.')[-1].strip('"').lower()
+
+
+# ============================================================
+# スキーマ（テーブル・インデックス）の抽出
+# ============================================================
+
+class SchemaCatalog:
+    """マイグレーションを順に適用した結果のテーブル・インデックス・関数定義"""
+
+    def __init__(self):
+        self.tables: Dict[str, TableDef] = {}
+        self.indexes: Dict[str, IndexDef] = {}
+        self.functions: Dict[str, Tuple[str, str]] = {}  # 名前 → (本文, ファイル名)
+
+    def load(self, files: List[Path]):
+        for path in files:
+            sql = strip_comments(path.read_text(encoding='utf-8'))
+            self._parse_tables(sql, path.name)
+            self._parse_alter_tables(sql)
+            self._parse_indexes(sql, path.name)
+            self._parse_functions(sql, path.name)
+            self._parse_views(sql, path.name)
+
+    def _parse_tables(self, sql: str, source: str):
+        pattern = re.compile(
+            r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)\s*\(', re.IGNORECASE)
+        for match in pattern.finditer(sql):
+            table = bare_name(match.group(1))
+            body_end = find_matching_paren(sql, match.end() - 1)
+            body = sql[match.end():body_end]
+            table_def = self.tables.setdefault(table, TableDef(table))
+            for item in split_top_level(body):
+                tokens = item.split()
+                if not tokens:
+                    continue
+                head = tokens[0].lower().strip('"')
+                # UNIQUE(a, b) のように括弧が続くと最初のトークンが 'unique(a,' になる
+                if CONSTRAINT_ITEM.match(item):
+                    self._parse_table_constraint(table, item, source)
+                    continue
+                col_type = tokens[1].lower() if len(tokens) > 1 else ''
+                table_def.columns[head] = col_type
+                if re.search(r'\bPRIMARY\s+KEY\b', item, re.IGNORECASE):
+                    self._add_index(IndexDef(f"{table}_pkey", table, [head], source=source))
+                elif re.search(r'\bUNIQUE\b', item, re.IGNORECASE):
+                    self._add_index(IndexDef(f"{table}_{head}_key", table, [head], source=source))
+
+    def _parse_table_constraint(self, table: str, item: str, source: str):
+        match = re.search(r'(PRIMARY\s+KEY|UNIQUE)\s*\(([^)]*)\)', item, re.IGNORECASE)
+        if not match:
+            return
+        columns = [bare_name(c) for c in match.group(2).split(',')]
+        kind = 'pkey' if match.group(1).upper().startswith('PRIMARY') else 'key'
+        self._add_index(IndexDef(f"{table}_{'_'.join(columns)}_{kind}", table, columns, source=source))
+
+    def _parse_alter_tables(self, sql: str):
+        for match in re.finditer(r'ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?([\w."]+)\s+(.*?);',
+                                 sql, re.IGNORECASE | re.DOTALL):
+            table = bare_name(match.group(1))
+            action = match.group(2)
+            rename = re.match(r'RENAME\s+TO\s+([\w"]+)', action, re.IGNORECASE)
+            if rename:
+                self._rename_table(table, bare_name(rename.group(1)))
+                continue
+            table_def = self.tables.setdefault(table, TableDef(table))
+            rename_col = re.match(r'RENAME\s+COLUMN\s+([\w"]+)\s+TO\s+([\w"]+)', action, re.IGNORECASE)
+            if rename_col:
+                old, new = bare_name(rename_col.group(1)), bare_name(rename_col.group(2))
+                table_def.columns[new] = table_def.columns.pop(old, '')
+                continue
+            for add in re.finditer(r'ADD\s+COLUMN\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w"]+)\s+([\w]+)',
+                                   action, re.IGNORECASE):
+                table_def.columns[bare_name(add.group(1))] = add.group(2).lower()
+            for drop in re.finditer(r'DROP\s+COLUMN\s+(?:IF\s+EXISTS\s+)?([\w"]+)', action, re.IGNORECASE):
+                table_def.columns.pop(bare_name(drop.group(1)), None)
+
+    def _rename_table(self, old: str, new: str):
+        if old in self.tables:
+            table_def = self.tables.pop(old)
+            table_def.name = new
+            self.tables[new] = table_def
+        for index in self.indexes.values():
+            if index.table == old:
+                index.table = new
+
+    def _parse_indexes(self, sql: str, source: str):
+        for match in re.finditer(r'DROP\s+INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?([\w."]+)',
+                                 sql, re.IGNORECASE):
+            self.indexes.pop(bare_name(match.group(1)), None)
+
+        pattern = re.compile(
+            r'CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?'
+            r'([\w"]+)?\s*ON\s+(?:ONLY\s+)?([\w."]+)\s*(?:USING\s+(\w+)\s*)?\(',
+            re.IGNORECASE)
+        for match in pattern.finditer(sql):
+            table = bare_name(match.group(3))
+            close = find_matching_paren(sql, match.end() - 1)
+            columns = []
+            for item in split_top_level(sql[match.end():close]):
+                token = item.split()[0] if item.split() else item
+                columns.append(bare_name(token) if re.match(r'^[\w"]+$', token) else item.strip())
+            tail = sql[close + 1:sql.find(';', close) if sql.find(';', close) != -1 else len(sql)]
+            where_match = re.search(r'\bWHERE\s+(.*)$', tail, re.IGNORECASE | re.DOTALL)
+            name = bare_name(match.group(2)) if match.group(2) else f"{table}_{'_'.join(columns)}_idx"
+            self._add_index(IndexDef(
+                name=name,
+                table=table,
+                columns=columns,
+                method=(match.group(4) or 'btree').lower(),
+                where=' '.join(where_match.group(1).split()) if where_match else None,
+                source=source,
+            ))
+
+    def _add_index(self, index: IndexDef):
+        self.indexes[index.name] = index
+
+    def _parse_functions(self, sql: str, source: str):
+        pattern = re.compile(r'CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+([\w."]+)\s*\(', re.IGNORECASE)
+        for match in pattern.finditer(sql):
+            name = bare_name(match.group(1))
+            body_match = re.compile(r'AS\s+(\$\w*\$)(.*?)\1', re.DOTALL | re.IGNORECASE).search(sql, match.end())
+            if body_match:
+                # 後のマイグレーションで再定義された関数は上書き
+                self.functions[name] = (body_match.group(2), source)
+
+    def _parse_views(self, sql: str, source: str):
+        pattern = re.compile(
+            r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:MATERIALIZED\s+)?VIEW\s+([\w."]+)\s+AS\s+(.*?);',
+            re.IGNORECASE | re.DOTALL)
+        for match in pattern.finditer(sql):
+            self.functions[f"view:{bare_name(match.group(1))}"] = (match.group(2), source)
+
+    def indexes_for(self, table: str) -> List[IndexDef]:
+        return [index for index in self.indexes.values() if index.table == table]
+
+
+# ============================================================
+# 関数本文の解析
+# ============================================================
+
+COLUMN_REF = r'(?:([a-z_]\w*)\.)?([a-z_]\w*)'
+COMPARISON = re.compile(
+    COLUMN_REF + r'\s*(<=|>=|<>|!=|=|<|>|\bIN\b|\bIS\b|\bBETWEEN\b)\s*'
+    r'(?:(NOT\s+)?(NULL|TRUE|FALSE|\'[^\']*\')|' + COLUMN_REF + r')?',
+    re.IGNORECASE)
+FILTER_START = re.compile(r'\b(WHERE|ON|HAVING)\b(?!\s+CONFLICT)', re.IGNORECASE)
+FILTER_END = re.compile(
+    r'\b(GROUP|ORDER|LIMIT|OFFSET|RETURNING|UNION|EXCEPT|INTERSECT|WINDOW|LOOP|THEN|'
+    r'WHERE|JOIN|LEFT|RIGHT|INNER|FULL|CROSS|INTO|DO)\b|;',
+    re.IGNORECASE)
+SPATIAL_CALL = re.compile(
+    r'\bST_(?:DWithin|Intersects|Contains|Within|Covers)\s*\(\s*' + COLUMN_REF, re.IGNORECASE)
+ORDER_BY = re.compile(r'ORDER\s+BY\s+(.*?)(?=\bLIMIT\b|\bOFFSET\b|;|\)|$)', re.IGNORECASE | re.DOTALL)
+# 「p_x IS NULL OR col = p_x」（逆順も）のように引数がNULLなら外れる任意条件
+OPTIONAL_GUARD = re.compile(
+    r'\b([a-z_]\w*)\s+IS\s+NULL\s+OR\s+' + COLUMN_REF + r'\s*(?:<=|>=|=|<|>|\bIN\b)\s*\1\b'
+    r'|' + COLUMN_REF + r'\s*(?:<=|>=|=|<|>|\bIN\b)\s*([a-z_]\w*)\s+OR\s+\6\s+IS\s+NULL\b',
+    re.IGNORECASE)
+TABLE_REF = re.compile(
+    r'\b(?:FROM|JOIN|UPDATE|INTO)\s+([\w."]+)(?:\s+(?:AS\s+)?([a-z_]\w*))?', re.IGNORECASE)
+
+
+class FunctionAnalyzer:
+    """関数本文から (テーブル, カラム, 述語種別) を抽出"""
+
+    def __init__(self, catalog: SchemaCatalog):
+        self.catalog = catalog
+
+    def analyze(self, function: str, body: str) -> List[QueryUsage]:
+        aliases = self._collect_aliases(body)
+        if not aliases:
+            return []
+        predicates: List[Predicate] = []
+
+        for start, region in self._filter_regions(body):
+            # 任意条件はインデックスのキーにしない（引数がNULLのときは使われない）
+            region = OPTIONAL_GUARD.sub(lambda m: ' ' * len(m.group(0)), region)
+            default = self._statement_table(aliases, body, start)
+            for match in COMPARISON.finditer(region):
+                predicates.extend(self._comparison_predicates(aliases, match, default))
+
+        for match in SPATIAL_CALL.finditer(body):
+            table = self._resolve(aliases, match.group(1), match.group(2))
+            if table:
+                predicates.append(Predicate(table, match.group(2).lower(), 'spatial'))
+
+        for match in ORDER_BY.finditer(body):
+            for item in split_top_level(match.group(1)):
+                ref = re.match(COLUMN_REF + r'\s*(?:ASC|DESC)?', item.strip(), re.IGNORECASE)
+                if not ref:
+                    continue
+                table = self._resolve(aliases, ref.group(1), ref.group(2))
+                if table:
+                    predicates.append(Predicate(table, ref.group(2).lower(), 'order'))
+                # 最初のソートキーのみインデックス候補
+                break
+
+        return self._group(function, predicates)
+
+    @staticmethod
+    def _filter_regions(body: str) -> List[Tuple[int, str]]:
+        """WHERE / ON / HAVING 句の (開始位置, 本文) を切り出す（SET句やSELECT句の比較を除外）"""
+        regions = []
+        for start in FILTER_START.finditer(body):
+            depth = 0
+            position = start.end()
+            end = len(body)
+            while position < len(body):
+                ch = body[position]
+                if ch == '(':
+                    depth += 1
+                elif ch == ')':
+                    depth -= 1
+                    if depth < 0:
+                        end = position
+                        break
+                elif depth == 0:
+                    stop = FILTER_END.match(body, position)
+                    if stop and (ch == ';' or position == 0
+                                 or not (body[position - 1].isalnum() or body[position - 1] == '_')):
+                        end = position
+                        break
+                position += 1
+            regions.append((start.start(), body[start.end():end]))
+        return regions
+
+    def _statement_table(self, aliases: Dict[str, Set[str]], body: str, start: int) -> Optional[str]:
+        """WHERE の直前の UPDATE t / DELETE FROM t / FROM t（1テーブルだけ）の t
+
+        修飾のない列が複数のテーブルにあるとき（UPDATE routes ... WHERE id = ... の中に
+        route_photos のサブクエリがある等）は、その WHERE が属する文のテーブルの列とみなす。
+        """
+        if not re.match(r'WHERE\b', body[start:], re.IGNORECASE):
+            return None
+        refs = [m for m in TABLE_REF.finditer(body, 0, start)]
+        if not refs:
+            return None
+        ref = refs[-1]
+        between = body[ref.end():start]
+        keyword = ref.group(0).split()[0].upper()
+        if ';' in between or keyword not in ('FROM', 'UPDATE') or (keyword == 'FROM' and ',' in between):
+            return None
+        tables = aliases.get(bare_name(ref.group(1)), set())
+        return next(iter(tables)) if len(tables) == 1 else None
+
+    def _comparison_predicates(self, aliases: Dict[str, Set[str]], match: re.Match,
+                               default: Optional[str] = None) -> List[Predicate]:
+        qualifier, column, operator, negated, constant, rhs_qualifier, rhs_column = match.groups()
+        operator = operator.lower()
+        kind = 'eq' if operator in EQ_OPERATORS else 'range' if operator in RANGE_OPERATORS else None
+        # IS は NULL / TRUE / FALSE との比較だけ（IS DISTINCT FROM は変更検出で、検索条件ではない）
+        if kind is None or (operator == 'is' and (negated or not constant)):
+            return []
+        predicates = []
+        table = self._resolve(aliases, qualifier, column, default)
+        # LEFT JOIN ... WHERE x.id IS NULL のアンチジョインは対象外
+        if table and not (operator == 'is' and column.lower() == 'id'):
+            normalized = constant.upper() if constant and not constant.startswith("'") else constant
+            predicates.append(Predicate(table, column.lower(), kind, normalized))
+        if rhs_column and operator == '=':
+            rhs_table = self._resolve(aliases, rhs_qualifier, rhs_column)
+            if rhs_table:
+                predicates.append(Predicate(rhs_table, rhs_column.lower(), 'join'))
+        return predicates
+
+    def _collect_aliases(self, body: str) -> Dict[str, Set[str]]:
+        aliases: Dict[str, Set[str]] = {}
+        for match in TABLE_REF.finditer(body):
+            table = bare_name(match.group(1))
+            if table not in self.catalog.tables:
+                continue
+            aliases.setdefault(table, set()).add(table)
+            alias = (match.group(2) or '').lower()
+            if alias and alias not in SQL_KEYWORDS:
+                aliases.setdefault(alias, set()).add(table)
+        return aliases
+
+    def _resolve(self, aliases: Dict[str, Set[str]], qualifier: Optional[str], column: str,
+                 default: Optional[str] = None) -> Optional[str]:
+        column = column.lower()
+        if qualifier:
+            candidates = aliases.get(qualifier.lower(), set())
+        else:
+            candidates = {t for tables in aliases.values() for t in tables}
+        owners = [t for t in candidates if column in self.catalog.tables[t].columns]
+        if len(owners) > 1 and not qualifier and default in owners:
+            return default
+        return owners[0] if len(owners) == 1 else None
+
+    def _group(self, function: str, predicates: List[Predicate]) -> List[QueryUsage]:
+        usages: Dict[str, QueryUsage] = {}
+        for p in predicates:
+            usage = usages.setdefault(p.table, QueryUsage(function, p.table))
+            bucket = {'eq': usage.eq, 'join': usage.eq, 'range': usage.range,
+                      'order': usage.order, 'spatial': usage.spatial}[p.kind]
+            if p.column not in bucket:
+                bucket.append(p.column)
+            if p.kind == 'eq' and p.constant:
+                usage.constants[p.column] = p.constant
+        return list(usages.values())
+
+
+# ============================================================
+# 既存インデックスとの照合
+# ============================================================
+
+class IndexAdvisor:
+    def __init__(self, catalog: SchemaCatalog, table_rows: Dict[str, int]):
+        self.catalog = catalog
+        self.table_rows = table_rows
+        self.proposals: Dict[Tuple[str, Tuple[str, ...], Optional[str], str], Proposal] = {}
+        self.covered: List[QueryUsage] = []
+        self.eq_usage: Dict[Tuple[str, str], int] = {}
+
+    def evaluate_all(self, usages: List[QueryUsage]):
+        """等価条件の列を「使っている関数の数」で並べるため、先に全体を数えてから評価する"""
+        for usage in usages:
+            for column in usage.eq:
+                self.eq_usage[(usage.table, column)] = self.eq_usage.get((usage.table, column), 0) + 1
+        for usage in usages:
+            self.evaluate(usage)
+
+    def evaluate(self, usage: QueryUsage):
+        table_def = self.catalog.tables[usage.table]
+        indexes = self.catalog.indexes_for(usage.table)
+
+        for column in usage.spatial:
+            if not any(i.method in ('gist', 'spgist', 'brin') and i.columns[:1] == [column] for i in indexes):
+                self._propose(usage, [column], None, 'gist', 'missing')
+
+        # 低選択度の定数条件（boolean / IS NULL）は部分インデックスのWHEREへ
+        partial_terms = []
+        key_eq = []
+        for column in usage.eq:
+            constant = usage.constants.get(column)
+            is_flag = table_def.columns.get(column, '').startswith('bool') or constant == 'NULL'
+            if constant and is_flag:
+                partial_terms.append(f"{column} IS NULL" if constant == 'NULL' else f"{column} = {constant}")
+            else:
+                key_eq.append(column)
+        where = ' AND '.join(sorted(partial_terms)) or None
+
+        tail = (usage.range + [c for c in usage.order if c not in usage.range])[:1]
+        # 多くの関数が等価条件に使う列を先頭に（同数なら関数内で書かれた順）。
+        # 先頭列を共有するほど1つのインデックスで多くのクエリをカバーできる
+        eq_columns = sorted((c for c in key_eq if c != 'id'),
+                            key=lambda c: (-self.eq_usage.get((usage.table, c), 1), key_eq.index(c)))
+        key = eq_columns + [c for c in tail if c not in key_eq and c != 'id']
+        if not key:
+            if where and 'id' not in key_eq:
+                key = sorted(c for c in usage.eq if c in usage.constants)[:1]
+                where = None
+            if not key:
+                return
+        if 'id' in key_eq and self._has_leading(indexes, ['id']):
+            # 主キー検索は常にカバー済み
+            self.covered.append(usage)
+            return
+        if any(i.name.endswith(('_pkey', '_key')) and set(i.columns) <= set(key_eq) for i in indexes):
+            # 主キー・UNIQUE制約の全列が等価条件なら1行に絞れる
+            self.covered.append(usage)
+            return
+
+        if self._has_leading(indexes, key, where):
+            self.covered.append(usage)
+        elif self._has_leading(indexes, key[:1]):
+            if len(key) > 1:
+                self._propose(usage, key, where, 'btree', 'prefix')
+            else:
+                self.covered.append(usage)
+        else:
+            self._propose(usage, key, where, 'btree', 'missing')
+
+    def _has_leading(self, indexes: List[IndexDef], key: List[str], where: Optional[str] = None) -> bool:
+        """インデックスの先頭 len(key) 列が key と同じ集合（最後の列は範囲・ソート列）か"""
+        for index in indexes:
+            if index.method != 'btree' or len(index.columns) < len(key):
+                continue
+            prefix = index.columns[:len(key)]
+            if len(key) > 1:
+                same = set(prefix[:-1]) == set(key[:-1]) and prefix[-1] == key[-1]
+            else:
+                same = prefix == key
+            if not same:
+                continue
+            if index.where and index.where.lower() != (where or '').lower():
+                continue
+            return True
+        return False
+
+    def _propose(self, usage: QueryUsage, columns: List[str], where: Optional[str], method: str, status: str):
+        key = (usage.table, tuple(columns), where, method)
+        proposal = self.proposals.get(key)
+        if proposal is None:
+            proposal = Proposal(usage.table, columns, where, method, status,
+                                table_rows=self.table_rows.get(usage.table, 0))
+            self.proposals[key] = proposal
+        proposal.functions.add(usage.function)
+
+    def ranked(self) -> List[Proposal]:
+        return sorted(self.proposals.values(), key=lambda p: (-p.score, p.table, p.name))
+
+
+# ============================================================
+# テーブルサイズ統計
+# ============================================================
+
+def load_stats_snapshot(path: Path) -> Dict[str, int]:
+    data = json.loads(path.read_text(encoding='utf-8'))
+    if isinstance(data, dict):
+        return {bare_name(k): int(v) for k, v in data.items()}
+    return {bare_name(row['relname']): int(row.get('n_live_tup') or row.get('reltuples') or 0) for row in data}
+
+
+def fetch_live_stats(dsn: str) -> Dict[str, int]:
+    try:
+        import psycopg
+    except ImportError:
+        print("❌ psycopgモジュールがインストールされていません")
+        print("以下のコマンドでインストールしてください:")
+        print("  pip3 install 'psycopg[binary]'")
+        sys.exit(1)
+
+    query = """
+        SELECT c.relname, GREATEST(c.reltuples, s.n_live_tup)::BIGINT
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = 'public' AND c.relkind = 'r'
+    """
+    with psycopg.connect(dsn) as conn:
+        rows = conn.execute(query).fetchall()
+    return {name: int(count or 0) for name, count in rows}
+
+
+# ============================================================
+# レポート
+# ============================================================
+
+def print_report(catalog: SchemaCatalog, advisor: IndexAdvisor, analyzed: int, has_stats: bool):
+    proposals = advisor.ranked()
+    print("\n" + "=" * 80)
+    print("📊 インデックスアドバイザー結果")
+    print("=" * 80 + "\n")
+    print(f"📂 テーブル数: {len(catalog.tables)}")
+    print(f"🗂️  既存インデックス数: {len(catalog.indexes)}（主キー・UNIQUE制約を含む）")
+    print(f"🔍 解析した関数・ビュー: {analyzed}")
+    print(f"✅ カバー済みアクセスパターン: {len(advisor.covered)}")
+    print(f"🔴 未カバー: {sum(1 for p in proposals if p.status == 'missing')}件")
+    print(f"🟡 先頭列のみカバー: {sum(1 for p in proposals if p.status == 'prefix')}件")
+    if not has_stats:
+        print("\n💡 --stats または --dsn を指定するとテーブルサイズ順に並びます")
+
+    for idx, proposal in enumerate(proposals, 1):
+        emoji = '🔴' if proposal.status == 'missing' else '🟡'
+        rows = f"{proposal.table_rows:,}行" if has_stats else '行数不明'
+        print(f"\n{emoji} [{idx}] {proposal.table} ({rows}) score={proposal.score:,}")
+        print(f"   → {proposal.to_sql()}")
+        print(f"   使用箇所: {', '.join(sorted(proposal.functions))}")
+
+    print("\n" + "=" * 80)
+    print("✅ 解析完了")
+    print("=" * 80 + "\n")
+
+
+def write_sql(path: Path, proposals: List[Proposal]):
+    lines = [
+        "-- ========================================",
+        "-- インデックスアドバイザーによる提案（要レビュー）",
+        "-- ========================================",
+        "",
+    ]
+    for proposal in proposals:
+        lines.append(f"-- {proposal.status}: {', '.join(sorted(proposal.functions))}")
+        lines.append(proposal.to_sql())
+        lines.append("")
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    print(f"✅ 提案SQLを保存しました: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='マイグレーションSQLの静的インデックスアドバイザー')
+    parser.add_argument('--dir', action='append', type=Path,
+                        help='解析するマイグレーションディレクトリ（複数指定可）')
+    parser.add_argument('--stats', type=Path, help='テーブル行数のスナップショットJSON')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（ライブ統計を取得）')
+    parser.add_argument('--dump-stats', type=Path, help='取得した統計をJSONに保存')
+    parser.add_argument('--sql', type=Path, help='提案インデックスをSQLファイルに出力')
+    args = parser.parse_args()
+
+    files = list_migration_files(args.dir or MIGRATION_DIRS)
+    if not files:
+        print("❌ マイグレーションファイルが見つかりません")
+        sys.exit(1)
+
+    catalog = SchemaCatalog()
+    catalog.load(files)
+
+    table_rows: Dict[str, int] = {}
+    if args.dsn:
+        print("📡 データベースからテーブル統計を取得中...")
+        table_rows = fetch_live_stats(args.dsn)
+    elif args.stats:
+        table_rows = load_stats_snapshot(args.stats)
+    if args.dump_stats and table_rows:
+        args.dump_stats.write_text(json.dumps(table_rows, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"✅ 統計スナップショットを保存しました: {args.dump_stats}")
+
+    analyzer = FunctionAnalyzer(catalog)
+    advisor = IndexAdvisor(catalog, table_rows)
+    advisor.evaluate_all([usage for function, (body, source) in sorted(catalog.functions.items())
+                          for usage in analyzer.analyze(function, strip_comments(body))])
+
+    print_report(catalog, advisor, len(catalog.functions), bool(table_rows))
+    if args.sql:
+        write_sql(args.sql, advisor.ranked())
+
+
+if __name__ == '__main__':
+    main()
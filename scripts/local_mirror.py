@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+公式ルート関連テーブルのローカルSQLiteミラー
+
+確認系スクリプトが毎回APIから同じデータを取り直さなくて済むように、
+areas / official_routes / route_pins / official_route_points / route_spots を
+.cache/mirror.sqlite3 に複製します。2回目以降は前回の水位（updated_at、なければ created_at）
+以降に変わった行だけを取得して upsert します。
+
+- GEOGRAPHY 列は元の値（16進EWKB）に加えて、Pointなら <列>_lat / <列>_lon も保存
+- --spatialite を付けると mod_spatialite を読み込み、<列>_geom のジオメトリ列も作成
+- 水位では削除を検出できないため、--prune で全IDを照合してローカルから消す
+
+使い方:
+  python3 scripts/local_mirror.py                       # 増分同期
+  python3 scripts/local_mirror.py --full                # 水位を無視して取り直す
+  python3 scripts/local_mirror.py --table route_pins --prune
+  sqlite3 .cache/mirror.sqlite3 "SELECT name, start_location_lat FROM official_routes"
+
+他スクリプトから:
+  conn = open_mirror()
+  conn.execute("SELECT area_id, COUNT(*) FROM official_routes GROUP BY area_id")
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from geo_utils import linestring_ewkt, parse_linestring, parse_point
+from ops_env import PROJECT_ROOT, create_service_client
+
+MIRROR_PATH = PROJECT_ROOT / '.cache' / 'mirror.sqlite3'
+
+# PostgRESTの1レスポンスあたりの既定上限
+PAGE_SIZE = 1000
+
+
+@dataclass
+class MirrorSpec:
+    table: str
+    point_columns: List[str] = field(default_factory=list)
+    line_columns: List[str] = field(default_factory=list)
+    # 先頭から順に、存在する列を水位に使う
+    watermark_candidates: List[str] = field(default_factory=lambda: ['updated_at', 'created_at'])
+
+
+MIRROR_TABLES = [
+    MirrorSpec('areas', point_columns=['center_location']),
+    MirrorSpec('official_routes', point_columns=['start_location', 'end_location'], line_columns=['route_line']),
+    MirrorSpec('route_pins', point_columns=['location']),
+    MirrorSpec('official_route_points', point_columns=['location']),
+    MirrorSpec('route_spots', point_columns=['location']),
+]
+
+# 追加時にインデックスを張る列（ルート・エリア単位の絞り込み用）
+INDEXED_COLUMNS = ['area_id', 'route_id', 'pin_id']
+
+
+@dataclass
+class MirrorStats:
+    table: str
+    fetched: int = 0
+    pruned: int = 0
+    requests: int = 0
+    total: int = 0
+    watermark: Optional[str] = None
+    duration_ms: float = 0.0
+
+
+def open_mirror(path: Path = MIRROR_PATH) -> sqlite3.Connection:
+    """ミラーを読み取り用に開く（行は sqlite3.Row で返る）"""
+    if not path.exists():
+        print(f"❌ エラー: ミラーがありません: {path}")
+        print("💡 先に python3 scripts/local_mirror.py を実行してください")
+        sys.exit(1)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _sqlite_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class LocalMirror:
+    def __init__(self, client, conn: sqlite3.Connection, spatialite: bool = False, page_size: int = PAGE_SIZE):
+        self.client = client
+        self.conn = conn
+        self.spatialite = spatialite
+        self.page_size = page_size
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS mirror_watermarks (
+              table_name TEXT PRIMARY KEY,
+              watermark_column TEXT NOT NULL,
+              watermark TEXT,
+              synced_at TEXT NOT NULL
+            )
+        """)
+        if spatialite:
+            self._load_spatialite()
+
+    def _load_spatialite(self):
+        try:
+            self.conn.enable_load_extension(True)
+            self.conn.load_extension('mod_spatialite')
+        except (AttributeError, sqlite3.OperationalError) as e:
+            print(f"❌ mod_spatialite を読み込めません: {e}")
+            print("以下のコマンドでインストールしてください:")
+            print("  brew install libspatialite   # macOS")
+            print("  apt install libsqlite3-mod-spatialite   # Debian/Ubuntu")
+            sys.exit(1)
+        if not self.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'spatial_ref_sys'").fetchone()[0]:
+            self.conn.execute("SELECT InitSpatialMetadata(1)")
+
+    def sync(self, spec: MirrorSpec, full: bool = False, prune: bool = False) -> MirrorStats:
+        stats = MirrorStats(spec.table)
+        started = time.perf_counter()
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{spec.table}" (id TEXT PRIMARY KEY)')
+
+        state = self.conn.execute(
+            "SELECT watermark_column, watermark FROM mirror_watermarks WHERE table_name = ?", (spec.table,)
+        ).fetchone()
+        if state and not full:
+            watermark_column, watermark = state
+        else:
+            watermark_column, watermark = self._detect_watermark_column(spec, stats), None
+        if watermark_column == 'id':
+            # 時刻列がないテーブルは毎回全件取得する
+            watermark = None
+
+        new_watermark = watermark
+        offset = 0
+        while True:
+            query = self.client.table(spec.table).select('*')
+            if watermark is not None:
+                # 同じ時刻の行を取りこぼさないよう境界を含めて取得する（upsertなので重複しても無害）
+                query = query.gte(watermark_column, watermark)
+            response = (query.order(watermark_column).order('id')
+                        .range(offset, offset + self.page_size - 1)
+                        .execute())
+            stats.requests += 1
+            page = response.data or []
+            if page:
+                self._upsert(spec, page)
+                page_max = max((row.get(watermark_column) or '') for row in page)
+                new_watermark = max(new_watermark or '', page_max) or None
+            stats.fetched += len(page)
+            offset += len(page)
+            if len(page) < self.page_size:
+                break
+
+        if prune:
+            stats.pruned = self._prune(spec, stats)
+
+        self.conn.execute(
+            """
+            INSERT INTO mirror_watermarks (table_name, watermark_column, watermark, synced_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (table_name) DO UPDATE
+              SET watermark_column = excluded.watermark_column,
+                  watermark = excluded.watermark,
+                  synced_at = excluded.synced_at
+            """,
+            (spec.table, watermark_column, new_watermark, datetime.now(timezone.utc).isoformat()),
+        )
+        self.conn.commit()
+
+        stats.watermark = new_watermark
+        stats.total = self.conn.execute(f'SELECT COUNT(*) FROM "{spec.table}"').fetchone()[0]
+        stats.duration_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def _detect_watermark_column(self, spec: MirrorSpec, stats: MirrorStats) -> str:
+        """本番とマイグレーションで列がずれていることがあるため、実際の行から水位列を選ぶ"""
+        response = self.client.table(spec.table).select('*').limit(1).execute()
+        stats.requests += 1
+        sample = response.data[0] if response.data else {}
+        for column in spec.watermark_candidates:
+            if column in sample:
+                return column
+        return 'id'
+
+    def _ensure_table(self, spec: MirrorSpec, rows: List[Dict[str, Any]]) -> List[str]:
+        """テーブルを作成し、初めて見る列を追加して、書き込む列の一覧を返す"""
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{spec.table}" (id TEXT PRIMARY KEY)')
+        existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{spec.table}")')}
+
+        columns: List[str] = []
+        for row in rows:
+            for key in row:
+                if key not in columns:
+                    columns.append(key)
+        for column in spec.point_columns:
+            if column in columns:
+                columns += [f'{column}_lat', f'{column}_lon']
+
+        for column in columns:
+            if column not in existing:
+                self.conn.execute(f'ALTER TABLE "{spec.table}" ADD COLUMN "{column}"')
+                existing.add(column)
+                if column in INDEXED_COLUMNS:
+                    self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{spec.table}_{column}_idx" '
+                                      f'ON "{spec.table}" ("{column}")')
+
+        if self.spatialite:
+            for column, geom_type in ([(c, 'POINT') for c in spec.point_columns] +
+                                      [(c, 'LINESTRING') for c in spec.line_columns]):
+                geom_column = f'{column}_geom'
+                if column in columns and geom_column not in existing:
+                    self.conn.execute("SELECT AddGeometryColumn(?, ?, 4326, ?, 'XY')",
+                                      (spec.table, geom_column, geom_type))
+                    self.conn.execute("SELECT CreateSpatialIndex(?, ?)", (spec.table, geom_column))
+        return columns
+
+    def _upsert(self, spec: MirrorSpec, rows: List[Dict[str, Any]]):
+        columns = self._ensure_table(spec, rows)
+        records = []
+        for row in rows:
+            row = dict(row)
+            for column in spec.point_columns:
+                if column in row:
+                    point = parse_point(row[column])
+                    row[f'{column}_lat'], row[f'{column}_lon'] = point if point else (None, None)
+            records.append([_sqlite_value(row.get(column)) for column in columns])
+
+        quoted = ', '.join(f'"{c}"' for c in columns)
+        updates = ', '.join(f'"{c}" = excluded."{c}"' for c in columns if c != 'id')
+        self.conn.executemany(
+            f'INSERT INTO "{spec.table}" ({quoted}) VALUES ({", ".join("?" for _ in columns)}) '
+            f'ON CONFLICT (id) DO UPDATE SET {updates}',
+            records,
+        )
+
+        if self.spatialite:
+            self._update_geometries(spec, rows)
+
+    def _update_geometries(self, spec: MirrorSpec, rows: List[Dict[str, Any]]):
+        for column in spec.point_columns:
+            self.conn.executemany(
+                f'UPDATE "{spec.table}" SET "{column}_geom" = MakePoint(?, ?, 4326) WHERE id = ?',
+                [(p[1], p[0], row['id']) for row in rows if (p := parse_point(row.get(column)))],
+            )
+        for column in spec.line_columns:
+            self.conn.executemany(
+                f'UPDATE "{spec.table}" SET "{column}_geom" = GeomFromText(?, 4326) WHERE id = ?',
+                [(linestring_ewkt(points).split(';', 1)[1], row['id'])
+                 for row in rows if len(points := parse_linestring(row.get(column))) >= 2],
+            )
+
+    def _prune(self, spec: MirrorSpec, stats: MirrorStats) -> int:
+        """リモートに存在しないIDをローカルから削除する"""
+        remote_ids: List[str] = []
+        while True:
+            response = (self.client.table(spec.table).select('id').order('id')
+                        .range(len(remote_ids), len(remote_ids) + self.page_size - 1)
+                        .execute())
+            stats.requests += 1
+            page = response.data or []
+            remote_ids.extend(row['id'] for row in page)
+            if len(page) < self.page_size:
+                break
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS mirror_remote_ids (id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM mirror_remote_ids")
+        self.conn.executemany("INSERT OR IGNORE INTO mirror_remote_ids (id) VALUES (?)", [(i,) for i in remote_ids])
+        cursor = self.conn.execute(
+            f'DELETE FROM "{spec.table}" WHERE id NOT IN (SELECT id FROM mirror_remote_ids)'
+        )
+        return cursor.rowcount
+
+
+def sync_mirror(client=None, path: Path = MIRROR_PATH, tables: Optional[List[str]] = None,
+                full: bool = False, prune: bool = False, spatialite: bool = False,
+                page_size: int = PAGE_SIZE) -> List[MirrorStats]:
+    """ミラーを増分同期する（他スクリプトから読み取り前に呼ぶ用）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        mirror = LocalMirror(client or create_service_client(), conn, spatialite, page_size)
+        specs = [s for s in MIRROR_TABLES if not tables or s.table in tables]
+        return [mirror.sync(spec, full, prune) for spec in specs]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Supabaseテーブルのローカルミラー（SQLite）')
+    parser.add_argument('--db', type=Path, default=MIRROR_PATH, help='ミラーのSQLiteファイル')
+    parser.add_argument('--table', action='append', choices=[s.table for s in MIRROR_TABLES],
+                        help='対象テーブルを限定（複数指定可）')
+    parser.add_argument('--full', action='store_true', help='水位を無視して全行取り直す')
+    parser.add_argument('--prune', action='store_true', help='リモートで削除された行をローカルからも消す')
+    parser.add_argument('--spatialite', action='store_true', help='SpatiaLiteのジオメトリ列も作成')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help='1リクエストで取得する行数')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🪞 ローカルミラー同期: {args.db}{'（全件）' if args.full else ''}")
+    print("=" * 60)
+    try:
+        results = sync_mirror(None, args.db, args.table, args.full, args.prune, args.spatialite, args.page_size)
+    except Exception as e:
+        print(f"❌ エラーが発生しました: {e}")
+        sys.exit(1)
+
+    for stats in results:
+        pruned = f" / 削除 {stats.pruned}件" if args.prune else ''
+        print(f"  {stats.table}: 取得 {stats.fetched}行{pruned} / 合計 {stats.total}行 "
+              f"({stats.requests}リクエスト, {stats.duration_ms:.0f}ms) 水位 {stats.watermark or '-'}")
+
+
+if __name__ == '__main__':
+    main()
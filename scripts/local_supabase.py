@@ -0,0 +1,695 @@
+#!/usr/bin/env python3
+"""
+オフラインテスト用の PostgREST / Auth 代替サーバー（プロセス内）
+
+スクリプトはすべて本番プロジェクト（jkpenklhrlbctebkpvax.supabase.co）か .env の URL に
+つながるため、オフラインでは試すこともベンチマークすることもできません。
+このサーバーはスクリプトが使う範囲の API をメモリ上のテーブルで再現します。
+
+PostgREST（/rest/v1）:
+  - GET / HEAD  select（列・別名 alias:col・キャスト col::text）、フィルタ
+                （eq / neq / gt / gte / lt / lte / like / ilike / is / in、not. 否定）、
+                order、limit / offset、Range ヘッダー、Prefer: count=exact（Content-Range）、
+                Accept: application/vnd.pgrst.object+json（1件）
+  - POST        オブジェクトまたは配列の挿入、Prefer: return=representation、
+                resolution=merge-duplicates（on_conflict、既定 id）での upsert
+  - PATCH       フィルタに一致する行の更新
+  - DELETE      フィルタに一致する行の削除
+  - POST /rpc/<関数名>  register_rpc() で登録した Python 関数
+Auth（/auth/v1）:
+  - POST /admin/users、GET /admin/users?page=&per_page=、PUT / DELETE /admin/users/<id>
+  - POST /token?grant_type=password / refresh_token
+
+テーブルはスキーマなし（最初の挿入で作られ、id がなければ UUID、created_at がなければ現在時刻を入れる）。
+--seed-mirror で .cache/mirror.sqlite3（local_mirror.py）の公式ルート関連テーブルを、
+--seed-json で <ディレクトリ>/<テーブル名>.json（行の配列）を読み込んで起動できます。
+
+ベンチマーク用に、応答前の遅延（--latency-ms / --jitter-ms、--seed で再現可能）、
+同時実行数の上限（超えたら 429 + Retry-After）、一定割合の 503 を注入できます。
+RLS は再現しません（apikey が anon / service のどちらかであることだけ確認します）。
+
+使い方:
+  python3 scripts/local_supabase.py --port 54399 --seed-mirror --latency-ms 20
+  SUPABASE_URL=http://127.0.0.1:54399 SUPABASE_SERVICE_ROLE_KEY=local-service-key \\
+    python3 scripts/user_provisioning.py --count 200
+
+  # テストやベンチマークのコードから
+  from local_supabase import LocalSupabase
+  with LocalSupabase(latency_ms=5) as server:
+      server.store.insert('official_routes', [{'id': '...', 'name': 'テスト'}])
+      requests.get(f"{server.url}/rest/v1/official_routes?select=id,name", headers=server.service_headers)
+"""
+
+import argparse
+import json
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+ANON_KEY = 'local-anon-key'
+SERVICE_KEY = 'local-service-key'
+TOKEN_TTL_SECONDS = 3600
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+OPERATORS = {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is', 'in'}
+
+Row = Dict[str, Any]
+
+
+class ApiError(Exception):
+    """PostgREST / GoTrue 形式のエラー応答"""
+
+    def __init__(self, status: int, message: str, code: str = 'PGRST000'):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+    def body(self) -> Dict[str, Any]:
+        return {'code': self.code, 'message': str(self), 'details': None, 'hint': None}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ------------------------------------------------------------
+# テーブル
+# ------------------------------------------------------------
+
+class TableStore:
+    """テーブル名 → {id: 行}（挿入順を保つ）"""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, Row]] = {}
+        self.lock = threading.RLock()
+
+    def rows(self, table: str) -> List[Row]:
+        with self.lock:
+            return list(self.tables.get(table, {}).values())
+
+    def insert(self, table: str, rows: List[Row], upsert: bool = False, on_conflict: str = 'id') -> List[Row]:
+        inserted = []
+        with self.lock:
+            target = self.tables.setdefault(table, {})
+            keys = [c.strip() for c in on_conflict.split(',')]
+            for row in rows:
+                if not isinstance(row, dict):
+                    raise ApiError(400, '行はJSONオブジェクトで指定してください', 'PGRST102')
+                row = dict(row)
+                row.setdefault('id', str(uuid.uuid4()))
+                row.setdefault('created_at', now_iso())
+                existing = self._find_conflict(target, row, keys)
+                if existing is not None:
+                    if not upsert:
+                        raise ApiError(409, f'duplicate key value violates unique constraint "{table}_pkey"', '23505')
+                    existing.update({k: v for k, v in row.items() if k != 'id'})
+                    inserted.append(dict(existing))
+                    continue
+                target[str(row['id'])] = row
+                inserted.append(dict(row))
+        return inserted
+
+    @staticmethod
+    def _find_conflict(target: Dict[str, Row], row: Row, keys: List[str]) -> Optional[Row]:
+        if keys == ['id']:
+            return target.get(str(row['id']))
+        values = [row.get(k) for k in keys]
+        return next((r for r in target.values() if [r.get(k) for k in keys] == values), None)
+
+    def select(self, table: str, filters: List['Filter']) -> List[Row]:
+        with self.lock:
+            target = self.tables.get(table, {})
+            # id=eq.<値> は辞書から直接引く
+            for f in filters:
+                if f.column == 'id' and f.operator == 'eq' and not f.negate:
+                    row = target.get(f.value)
+                    candidates = [row] if row is not None else []
+                    break
+            else:
+                candidates = list(target.values())
+            return [dict(r) for r in candidates if all(f.matches(r) for f in filters)]
+
+    def update(self, table: str, filters: List['Filter'], values: Row) -> List[Row]:
+        with self.lock:
+            target = self.tables.get(table, {})
+            updated = []
+            for row in target.values():
+                if all(f.matches(row) for f in filters):
+                    row.update(values)
+                    updated.append(dict(row))
+            return updated
+
+    def delete(self, table: str, filters: List['Filter']) -> List[Row]:
+        with self.lock:
+            target = self.tables.get(table, {})
+            removed = self.select(table, filters)
+            for row in removed:
+                target.pop(str(row['id']), None)
+            return removed
+
+
+# ------------------------------------------------------------
+# PostgREST のクエリ
+# ------------------------------------------------------------
+
+def _coerce(value: str, sample: Any) -> Any:
+    """フィルタの文字列を行の値の型に合わせる"""
+    if isinstance(sample, bool):
+        return value.lower() == 'true'
+    if isinstance(sample, (int, float)):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _split_list(text: str) -> List[str]:
+    """in.(a,b,"c,d") の括弧の中を分割する"""
+    items, current, quoted = [], '', False
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ',' and not quoted:
+            items.append(current)
+            current = ''
+        else:
+            current += ch
+    if current or items:
+        items.append(current)
+    return items
+
+
+def _like(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile('^' + re.escape(pattern).replace(r'\*', '.*').replace('%', '.*') + '$', flags | re.DOTALL)
+
+
+@dataclass
+class Filter:
+    column: str
+    operator: str
+    value: Any
+    negate: bool = False
+
+    @classmethod
+    def parse(cls, column: str, expression: str) -> 'Filter':
+        negate = expression.startswith('not.')
+        if negate:
+            expression = expression[4:]
+        operator, _, value = expression.partition('.')
+        if operator not in OPERATORS:
+            raise ApiError(400, f'未対応の演算子です: {operator}', 'PGRST100')
+        if operator == 'in':
+            if not (value.startswith('(') and value.endswith(')')):
+                raise ApiError(400, f'in の値は (a,b) の形式で指定してください: {value}', 'PGRST100')
+            value = _split_list(value[1:-1])
+        return cls(column, operator, value, negate)
+
+    def matches(self, row: Row) -> bool:
+        return self._test(row.get(self.column)) != self.negate
+
+    def _test(self, actual: Any) -> bool:
+        op, value = self.operator, self.value
+        if op == 'is':
+            expected = {'null': None, 'true': True, 'false': False}.get(value.lower(), value)
+            return actual is expected if expected in (None, True, False) else actual == expected
+        if actual is None:
+            return False
+        if op == 'in':
+            return any(_coerce(v, actual) == actual or str(actual) == v for v in value)
+        if op in ('like', 'ilike'):
+            return bool(_like(value, re.IGNORECASE if op == 'ilike' else 0).match(str(actual)))
+        expected = _coerce(value, actual)
+        if op == 'eq':
+            return actual == expected or str(actual) == value
+        if op == 'neq':
+            return not (actual == expected or str(actual) == value)
+        try:
+            return {'gt': actual > expected, 'gte': actual >= expected,
+                    'lt': actual < expected, 'lte': actual <= expected}[op]
+        except TypeError:
+            return False
+
+
+@dataclass
+class RestQuery:
+    table: str
+    select: List[Tuple[str, str]] = field(default_factory=list)  # (出力名, 列名)。空なら全列
+    filters: List[Filter] = field(default_factory=list)
+    order: List[Tuple[str, bool, Optional[bool]]] = field(default_factory=list)  # (列, 降順, NULLを先に)
+    limit: Optional[int] = None
+    offset: int = 0
+    on_conflict: str = 'id'
+
+    @classmethod
+    def parse(cls, table: str, query: str) -> 'RestQuery':
+        parsed = cls(table)
+        for key, value in parse_qsl(query, keep_blank_values=True):
+            if key == 'select':
+                parsed.select = cls._parse_select(value)
+            elif key == 'order':
+                parsed.order = cls._parse_order(value)
+            elif key == 'limit':
+                parsed.limit = int(value)
+            elif key == 'offset':
+                parsed.offset = int(value)
+            elif key == 'on_conflict':
+                parsed.on_conflict = value
+            elif key in ('or', 'and'):
+                raise ApiError(400, f'{key}= フィルタには対応していません', 'PGRST100')
+            elif key not in RESERVED_PARAMS:
+                parsed.filters.append(Filter.parse(key, value))
+        return parsed
+
+    @staticmethod
+    def _parse_select(value: str) -> List[Tuple[str, str]]:
+        columns = []
+        for item in (s.strip() for s in value.split(',')):
+            if not item or item == '*':
+                continue
+            if '(' in item:
+                raise ApiError(400, f'埋め込み（{item}）には対応していません', 'PGRST100')
+            item = item.split('::')[0]
+            alias, _, column = item.partition(':') if ':' in item else ('', '', item)
+            columns.append((alias or column, column))
+        return columns
+
+    @staticmethod
+    def _parse_order(value: str) -> List[Tuple[str, bool, Optional[bool]]]:
+        order = []
+        for item in value.split(','):
+            parts = item.strip().split('.')
+            descending = 'desc' in parts[1:]
+            nulls_first = True if 'nullsfirst' in parts[1:] else False if 'nullslast' in parts[1:] else None
+            order.append((parts[0], descending, nulls_first))
+        return order
+
+    def apply_range(self, header: Optional[str]):
+        match = re.match(r'^\s*(\d+)-(\d*)\s*$', header or '')
+        if match:
+            self.offset = int(match.group(1))
+            if match.group(2):
+                self.limit = int(match.group(2)) - self.offset + 1
+
+    def sort(self, rows: List[Row]) -> List[Row]:
+        for column, descending, nulls_first in reversed(self.order):
+            # PostgreSQL の既定は ASC → NULLS LAST、DESC → NULLS FIRST
+            first = descending if nulls_first is None else nulls_first
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: (str(type(r[column])), r[column]), reverse=descending)
+            rows = missing + present if first else present + missing
+        return rows
+
+    def project(self, row: Row) -> Row:
+        if not self.select:
+            return row
+        return {name: row.get(column) for name, column in self.select}
+
+
+# ------------------------------------------------------------
+# Auth
+# ------------------------------------------------------------
+
+class AuthStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users: Dict[str, Row] = {}
+        self.passwords: Dict[str, str] = {}
+        self.access_tokens: Dict[str, Tuple[str, float]] = {}
+        self.refresh_tokens: Dict[str, str] = {}
+
+    def by_email(self, email: str) -> Optional[Row]:
+        return next((u for u in self.users.values() if u['email'] == email.lower()), None)
+
+    def create(self, body: Row) -> Row:
+        email = (body.get('email') or '').strip().lower()
+        if not email:
+            raise ApiError(400, 'email is required', 'validation_failed')
+        with self.lock:
+            if self.by_email(email):
+                raise ApiError(422, 'A user with this email address has already been registered', 'email_exists')
+            created = now_iso()
+            user = {
+                'id': str(body.get('id') or uuid.uuid4()), 'aud': 'authenticated', 'role': 'authenticated',
+                'email': email, 'email_confirmed_at': created if body.get('email_confirm') else None,
+                'app_metadata': {'provider': 'email', 'providers': ['email']},
+                'user_metadata': body.get('user_metadata') or {}, 'created_at': created, 'updated_at': created,
+            }
+            self.users[user['id']] = user
+            self.passwords[user['id']] = body.get('password') or ''
+            return dict(user)
+
+    def update(self, user_id: str, body: Row) -> Row:
+        with self.lock:
+            user = self.users.get(user_id)
+            if user is None:
+                raise ApiError(404, 'User not found', 'user_not_found')
+            if 'password' in body:
+                self.passwords[user_id] = body['password']
+            if body.get('email_confirm') and not user['email_confirmed_at']:
+                user['email_confirmed_at'] = now_iso()
+            if 'user_metadata' in body:
+                user['user_metadata'] = body['user_metadata']
+            user['updated_at'] = now_iso()
+            return dict(user)
+
+    def remove(self, user_id: str):
+        with self.lock:
+            if self.users.pop(user_id, None) is None:
+                raise ApiError(404, 'User not found', 'user_not_found')
+            self.passwords.pop(user_id, None)
+
+    def session(self, user_id: str) -> Row:
+        access, refresh = secrets.token_urlsafe(24), secrets.token_urlsafe(24)
+        expires_at = int(time.time()) + TOKEN_TTL_SECONDS
+        with self.lock:
+            self.access_tokens[access] = (user_id, expires_at)
+            self.refresh_tokens[refresh] = user_id
+            user = dict(self.users[user_id])
+        return {'access_token': access, 'token_type': 'bearer', 'expires_in': TOKEN_TTL_SECONDS,
+                'expires_at': expires_at, 'refresh_token': refresh, 'user': user}
+
+    def password_grant(self, body: Row) -> Row:
+        user = self.by_email(body.get('email') or '')
+        if user is None or self.passwords.get(user['id']) != body.get('password'):
+            raise ApiError(400, 'Invalid login credentials', 'invalid_credentials')
+        return self.session(user['id'])
+
+    def refresh_grant(self, body: Row) -> Row:
+        with self.lock:
+            user_id = self.refresh_tokens.pop(body.get('refresh_token') or '', None)
+        if user_id is None or user_id not in self.users:
+            raise ApiError(400, 'Invalid Refresh Token: Refresh Token Not Found', 'refresh_token_not_found')
+        return self.session(user_id)
+
+
+# ------------------------------------------------------------
+# サーバー
+# ------------------------------------------------------------
+
+@dataclass
+class Response:
+    status: int
+    body: Any = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class LocalSupabase:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 max_concurrency: Optional[int] = None, error_rate: float = 0.0, seed: int = 0,
+                 anon_key: str = ANON_KEY, service_key: str = SERVICE_KEY, verbose: bool = False):
+        self.store = TableStore()
+        self.auth = AuthStore()
+        self.rpcs: Dict[str, Callable[['LocalSupabase', Row], Any]] = {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.max_concurrency = max_concurrency
+        self.error_rate = error_rate
+        self.anon_key = anon_key
+        self.service_key = service_key
+        self.verbose = verbose
+        self.requests = 0
+        self.rejected = 0
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._in_flight = 0
+        self._flight_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def service_headers(self) -> Dict[str, str]:
+        return {'apikey': self.service_key, 'Authorization': f"Bearer {self.service_key}",
+                'Content-Type': 'application/json'}
+
+    def register_rpc(self, name: str, func: Callable[['LocalSupabase', Row], Any]):
+        """POST /rest/v1/rpc/<name> の処理を登録する（引数はサーバーとJSONボディ）"""
+        self.rpcs[name] = func
+
+    def start(self) -> 'LocalSupabase':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'LocalSupabase':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------------- 読み込み ----------------
+
+    def seed_json(self, directory: Path) -> Dict[str, int]:
+        counts = {}
+        for path in sorted(directory.glob('*.json')):
+            rows = json.loads(path.read_text(encoding='utf-8'))
+            counts[path.stem] = len(self.store.insert(path.stem, rows if isinstance(rows, list) else [rows], upsert=True))
+        return counts
+
+    def seed_mirror(self) -> Dict[str, int]:
+        """local_mirror.py のミラーから読み込む（_lat / _lon / _geom の派生列は除く）"""
+        from local_mirror import MIRROR_TABLES, open_mirror
+
+        db = open_mirror()
+        counts = {}
+        for spec in MIRROR_TABLES:
+            if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (spec.table,)).fetchone():
+                continue
+            derived = {f"{c}_{suffix}" for c in spec.point_columns for suffix in ('lat', 'lon', 'geom')}
+            derived |= {f"{c}_geom" for c in spec.line_columns}
+            rows = []
+            for record in db.execute(f'SELECT * FROM "{spec.table}"'):
+                row = {k: record[k] for k in record.keys() if k not in derived}
+                for key, value in row.items():
+                    if isinstance(value, str) and value[:1] in '[{':
+                        try:
+                            row[key] = json.loads(value)
+                        except ValueError:
+                            pass
+                rows.append(row)
+            counts[spec.table] = len(self.store.insert(spec.table, rows, upsert=True))
+        return counts
+
+    # ---------------- 処理 ----------------
+
+    def _delay(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return
+        with self._rng_lock:
+            delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        time.sleep(max(0.0, delay) / 1000)
+
+    def _inject_failure(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+    def handle(self, method: str, target: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        with self._flight_lock:
+            self.requests += 1
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                self.rejected += 1
+                return Response(429, {'message': 'Too Many Requests'}, {'Retry-After': '1'})
+            self._in_flight += 1
+        try:
+            self._delay()
+            if self._inject_failure():
+                return Response(503, {'message': 'Service Unavailable'}, {'Retry-After': '1'})
+            apikey = headers.get('apikey') or headers.get('authorization', '').replace('Bearer ', '')
+            if apikey not in (self.anon_key, self.service_key):
+                raise ApiError(401, 'Invalid API key', '401')
+            payload = json.loads(body) if body else None
+            if path.startswith('/auth/v1/'):
+                return self._auth(method, path[len('/auth/v1'):], parts.query, headers, payload)
+            if path.startswith('/rest/v1/rpc/'):
+                return self._rpc(method, path[len('/rest/v1/rpc/'):], payload)
+            if path.startswith('/rest/v1/'):
+                return self._rest(method, path[len('/rest/v1/'):], parts.query, headers, payload)
+            raise ApiError(404, f'Not Found: {path}', 'PGRST125')
+        except ApiError as e:
+            return Response(e.status, e.body())
+        except (ValueError, TypeError) as e:
+            return Response(400, ApiError(400, f'リクエストを解釈できません: {e}', 'PGRST102').body())
+        finally:
+            with self._flight_lock:
+                self._in_flight -= 1
+
+    def _rest(self, method: str, table: str, query: str, headers: Dict[str, str], payload: Any) -> Response:
+        prefer = headers.get('prefer', '')
+        q = RestQuery.parse(table, query)
+        representation = 'return=representation' in prefer
+
+        if method in ('GET', 'HEAD'):
+            q.apply_range(headers.get('range'))
+            rows = q.sort(self.store.select(table, q.filters))
+            total = len(rows)
+            end = total if q.limit is None else min(total, q.offset + q.limit)
+            page = [q.project(r) for r in rows[q.offset:end]]
+            counted = 'count=' in prefer
+            content_range = f"{q.offset}-{q.offset + len(page) - 1}" if page else '*'
+            response_headers = {'Content-Range': f"{content_range}/{total if counted else '*'}"}
+            if 'application/vnd.pgrst.object+json' in headers.get('accept', ''):
+                if len(page) != 1:
+                    raise ApiError(406, f'JSON object requested, multiple (or no) rows returned ({len(page)})', 'PGRST116')
+                return Response(200, page[0], response_headers)
+            partial = counted and (q.offset > 0 or end < total)
+            return Response(206 if partial else 200, page, response_headers)
+
+        if method == 'POST':
+            rows = payload if isinstance(payload, list) else [payload]
+            upsert = 'resolution=merge-duplicates' in prefer
+            inserted = self.store.insert(table, rows, upsert=upsert, on_conflict=q.on_conflict)
+            return Response(201, [q.project(r) for r in inserted] if representation else None)
+
+        if method == 'PATCH':
+            if not isinstance(payload, dict):
+                raise ApiError(400, '更新内容はJSONオブジェクトで指定してください', 'PGRST102')
+            updated = self.store.update(table, q.filters, payload)
+            return Response(200, [q.project(r) for r in updated]) if representation else Response(204)
+
+        if method == 'DELETE':
+            removed = self.store.delete(table, q.filters)
+            return Response(200, [q.project(r) for r in removed]) if representation else Response(204)
+
+        raise ApiError(405, f'{method} には対応していません', 'PGRST117')
+
+    def _rpc(self, method: str, name: str, payload: Any) -> Response:
+        func = self.rpcs.get(name)
+        if func is None:
+            raise ApiError(404, f'Could not find the function public.{name} in the schema cache', 'PGRST202')
+        if method not in ('GET', 'POST'):
+            raise ApiError(405, f'{method} には対応していません', 'PGRST117')
+        return Response(200, func(self, payload or {}))
+
+    def _auth(self, method: str, path: str, query: str, headers: Dict[str, str], payload: Any) -> Response:
+        params = dict(parse_qsl(query))
+        if path == '/token' and method == 'POST':
+            grant = params.get('grant_type')
+            if grant == 'password':
+                return Response(200, self.auth.password_grant(payload or {}))
+            if grant == 'refresh_token':
+                return Response(200, self.auth.refresh_grant(payload or {}))
+            raise ApiError(400, f'unsupported grant_type: {grant}', 'validation_failed')
+
+        if path.startswith('/admin/users'):
+            if headers.get('authorization', '') != f"Bearer {self.service_key}":
+                raise ApiError(403, 'User not allowed', 'not_admin')
+            user_id = path[len('/admin/users/'):] if path.startswith('/admin/users/') else ''
+            if not user_id and method == 'POST':
+                return Response(200, self.auth.create(payload or {}))
+            if not user_id and method == 'GET':
+                page, per_page = int(params.get('page', 1)), int(params.get('per_page', 50))
+                users = list(self.auth.users.values())
+                return Response(200, {'users': users[(page - 1) * per_page:page * per_page], 'aud': 'authenticated'},
+                                {'X-Total-Count': str(len(users))})
+            if user_id and method == 'GET':
+                user = self.auth.users.get(user_id)
+                if user is None:
+                    raise ApiError(404, 'User not found', 'user_not_found')
+                return Response(200, user)
+            if user_id and method == 'PUT':
+                return Response(200, self.auth.update(user_id, payload or {}))
+            if user_id and method == 'DELETE':
+                self.auth.remove(user_id)
+                return Response(200, {})
+        raise ApiError(404, f'Not Found: /auth/v1{path}', 'not_found')
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else None
+                headers = {k.lower(): v for k, v in self.headers.items()}
+                response = server.handle(self.command, self.path, headers, body)
+                data = b'' if response.body is None else json.dumps(response.body, ensure_ascii=False).encode('utf-8')
+                self.send_response(response.status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in response.headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(data)
+
+            do_GET = do_HEAD = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                if server.verbose:
+                    super().log_message(format, *args)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='オフラインテスト用の PostgREST / Auth 代替サーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス')
+    parser.add_argument('--port', type=int, default=54399, help='待ち受けるポート')
+    parser.add_argument('--seed-mirror', action='store_true', help='ローカルミラーの公式ルート関連テーブルを読み込む')
+    parser.add_argument('--seed-json', type=Path, help='<テーブル名>.json を読み込むディレクトリ')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='応答前に入れる遅延（ミリ秒）')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='遅延のゆらぎ（±ミリ秒）')
+    parser.add_argument('--max-concurrency', type=int, help='同時に処理するリクエスト数の上限（超えたら429）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 を返す割合（0〜1）')
+    parser.add_argument('--seed', type=int, default=0, help='遅延・エラー注入の乱数シード')
+    parser.add_argument('--verbose', action='store_true', help='リクエストごとにログを出す')
+    args = parser.parse_args()
+
+    server = LocalSupabase(args.host, args.port, args.latency_ms, args.jitter_ms, args.max_concurrency,
+                           args.error_rate, args.seed, verbose=args.verbose)
+    print("=" * 60)
+    print("🧪 ローカル Supabase 代替サーバー")
+    print("=" * 60)
+    if args.seed_mirror:
+        for table, count in server.seed_mirror().items():
+            print(f"   📥 {table}: {count}行（ミラー）")
+    if args.seed_json:
+        if not args.seed_json.is_dir():
+            print(f"❌ ディレクトリが見つかりません: {args.seed_json}")
+            sys.exit(1)
+        for table, count in server.seed_json(args.seed_json).items():
+            print(f"   📥 {table}: {count}行（JSON）")
+
+    print(f"\n✅ {server.url} で待ち受けています（Ctrl+C で終了）")
+    print(f"   SUPABASE_URL={server.url}")
+    print(f"   SUPABASE_ANON_KEY={server.anon_key}")
+    print(f"   SUPABASE_SERVICE_ROLE_KEY={server.service_key}")
+    try:
+        server.start()
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"\n⏹️  停止しました（リクエスト {server.requests}件, 429 {server.rejected}件）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+散歩記録と公式ルートのバッチ・マップマッチング
+
+自由散歩（routes / route_points）がどの公式ルートを歩いたものかは記録されておらず、
+ナビエンジン（lib/nav/route_nav_engine.dart）の完走判定
+（25m区画カバレッジ ≥ 80% かつ ゴール50m圏）も端末上でしか動いていません。
+
+このスクリプトは前回の水位以降に作成された散歩をチャンクごとに読み込み、
+  1. 公式ルートの外接矩形（+ 判定幅）と散歩の外接矩形の重なりで候補ルートを絞り込み
+  2. ルートを25m区画に分け、区画の中心から散歩の線分までの距離を numpy でまとめて計算
+  3. 判定幅以内に散歩の線分がある区画の割合をカバレッジとし、ゴールまでの最短距離と合わせて完走を判定
+した結果を walk_route_matches に保存し、結果が変わったルートの official_routes.total_walks を
+route_walks（ナビで歩いた記録）と完走と判定した散歩の合計で更新します（017_walk_route_matches.sql の適用が必要）。
+ルートを横切っただけ・一部が重なっただけの散歩は total_walks に数えません。
+完走数・完走率は official_route_walk_stats ビューで見ます。
+削除された散歩の結果は、実行のたびに最初に消します（--rebuild でも残っている散歩しか判定し直さないため）。
+
+精度が accuracy_gate_m を超える点は、ナビエンジンと同じくカバレッジにだけ使い、ゴール判定には使いません。
+ただしナビエンジンはその点をルートに射影して区画を塗りますが、ここではどのルートを歩いたかわからない
+自由散歩が対象なので、判定幅以内にある場合だけ塗り、前後の点とは線でつなぎません。
+歩行速度（interp_max_speed_mps）を超える点間も線でつながず点としてだけ扱います
+（車移動やGPSの飛びでカバレッジを埋めない）。閾値は nav_params の有効行から読みます。
+
+使い方:
+  python3 scripts/match_walks_to_routes.py --dry-run
+  python3 scripts/match_walks_to_routes.py                     # 前回以降の散歩を判定
+  python3 scripts/match_walks_to_routes.py --rebuild           # ルート形状を変えたときに全件やり直す
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import math
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from geo_utils import EARTH_RADIUS_M, parse_linestring
+from ops_env import connect, resolve_dsn
+from reconcile_counters import CounterReconciler, counter_spec
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ numpyモジュールがインストールされていません")
+    print("以下のコマンドでインストールしてください:")
+    print("  pip3 install numpy")
+    sys.exit(1)
+
+ZERO_UUID = '00000000-0000-0000-0000-000000000000'
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+TOTAL_WALKS = counter_spec('official_routes.total_walks')
+
+
+@dataclass
+class WalkSource:
+    """散歩記録のテーブルと、その経路ポイントのテーブル"""
+    table: str
+    points_table: str
+    time_columns: List[str]  # 歩いた日時（先に見つかった列）
+
+    @property
+    def watermark_job(self) -> str:
+        return f"route_match:{self.table}"
+
+
+WALK_SOURCES = [
+    WalkSource('routes', 'route_points', ['started_at', 'walked_at']),
+    WalkSource('daily_walks', 'daily_walk_points', ['walked_at', 'started_at']),
+]
+
+
+@dataclass
+class MatchParams:
+    """NavParams（route_nav_engine.dart）と同じ既定値"""
+    cell_m: float = 25.0
+    corridor_m: float = 50.0  # off_route_m
+    accuracy_gate_m: float = 35.0
+    complete_coverage: float = 0.80
+    goal_radius_m: float = 50.0
+    interp_max_speed_mps: float = 3.0
+    min_coverage: float = 0.30  # これ未満の候補は保存しない
+    version: Optional[int] = None
+
+
+@dataclass
+class RouteGeometry:
+    id: str
+    label: str
+    total_m: float
+    cos_lat: float
+    cells: 'np.ndarray'  # 区画中心（ローカル平面 m）
+    bbox: Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+    goal: Tuple[float, float]
+
+
+@dataclass
+class WalkMatch:
+    walk_id: str
+    route_id: str
+    coverage: float
+    goal_distance_m: Optional[float]
+    is_completed: bool
+    walked_at: object
+
+
+@dataclass
+class MatchStats:
+    source: WalkSource
+    walks: int = 0
+    points: int = 0
+    candidates: int = 0
+    matches: int = 0
+    completed: int = 0
+    chunks: int = 0
+    routes_updated: int = 0
+    duration_ms: float = 0.0
+    per_route: Dict[str, List[int]] = field(default_factory=lambda: defaultdict(lambda: [0, 0]))
+
+
+def load_nav_params(conn, params: MatchParams) -> MatchParams:
+    """nav_params の有効行で閾値を上書き（テーブルがなければ既定値のまま）"""
+    exists = conn.execute("SELECT to_regclass('public.nav_params') IS NOT NULL").fetchone()[0]
+    if not exists:
+        return params
+    cursor = conn.execute(
+        "SELECT * FROM nav_params WHERE is_active ORDER BY version DESC LIMIT 1"
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return params
+    values = dict(zip([d.name for d in cursor.description], row))
+    for attr, column in (('corridor_m', 'off_route_m'), ('accuracy_gate_m', 'accuracy_gate_m'),
+                         ('complete_coverage', 'complete_coverage'), ('goal_radius_m', 'goal_radius_m'),
+                         ('interp_max_speed_mps', 'interp_max_speed_mps')):
+        if values.get(column) is not None:
+            setattr(params, attr, float(values[column]))
+    params.version = values.get('version')
+    return params
+
+
+def _local_xy(lat: 'np.ndarray', lon: 'np.ndarray', cos_lat: float) -> 'np.ndarray':
+    """緯度経度をルートごとの正距円筒図法の平面（m）に変換"""
+    return np.column_stack([lon * METERS_PER_DEGREE * cos_lat, lat * METERS_PER_DEGREE])
+
+
+def build_route(route_id: str, label: str, line: List[Tuple[float, float]],
+                params: MatchParams) -> Optional[RouteGeometry]:
+    if len(line) < 2:
+        return None
+    lat = np.array([p[0] for p in line])
+    lon = np.array([p[1] for p in line])
+    cos_lat = math.cos(math.radians(float(lat.mean())))
+    xy = _local_xy(lat, lon, cos_lat)
+    cumulative = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))])
+    total = float(cumulative[-1])
+    if total <= 0:
+        return None
+    # CoverageGrid と同じ区画数（ceil(total / 25m)、最低1）
+    n_cells = max(1, math.ceil(total / params.cell_m))
+    centers = np.minimum((np.arange(n_cells) + 0.5) * params.cell_m, total)
+    cells = np.column_stack([np.interp(centers, cumulative, xy[:, 0]), np.interp(centers, cumulative, xy[:, 1])])
+    bbox = (float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max()))
+    return RouteGeometry(route_id, label, total, cos_lat, cells, bbox, line[-1])
+
+
+def point_segment_distances(points: 'np.ndarray', a: 'np.ndarray', b: 'np.ndarray') -> 'np.ndarray':
+    """各点から最も近い線分までの距離（points: P×2, a/b: S×2 → P）"""
+    ab = b - a
+    length2 = np.maximum((ab ** 2).sum(axis=1), 1e-12)
+    best = np.full(len(points), np.inf)
+    # P×S の行列をブロックに分けてメモリを抑える
+    block = max(1, 2_000_000 // max(len(a), 1))
+    for start in range(0, len(points), block):
+        p = points[start:start + block, None, :]
+        t = np.clip(((p - a) * ab).sum(axis=2) / length2, 0.0, 1.0)
+        nearest = a + t[..., None] * ab
+        best[start:start + block] = np.sqrt(((p - nearest) ** 2).sum(axis=2)).min(axis=1)
+    return best
+
+
+class WalkMatcher:
+    def __init__(self, conn, params: MatchParams, chunk_size: int, dry_run: bool, verbose: bool):
+        self.conn = conn
+        self.params = params
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.routes: List[RouteGeometry] = []
+        self._bboxes = None
+        self._counters = CounterReconciler(conn, chunk_size, dry_run, lock_timeout_ms=0, verbose=False)
+
+    # ---- 公式ルート -------------------------------------------------------
+
+    def load_routes(self) -> int:
+        columns = self._columns('official_routes')
+        label = 'name' if 'name' in columns else 'title'
+        active = "WHERE COALESCE(is_active, TRUE)" if 'is_active' in columns else ""
+        line_column = "route_line" if 'route_line' in columns else "NULL"
+        rows = self.conn.execute(
+            f"SELECT id, {label}, {line_column} FROM official_routes {active} ORDER BY id"
+        ).fetchall()
+
+        fallback = self._route_points([str(r[0]) for r in rows if not r[2]])
+        for route_id, name, route_line in rows:
+            line = parse_linestring(route_line) if route_line else fallback.get(str(route_id), [])
+            route = build_route(str(route_id), name, line, self.params)
+            if route is not None:
+                self.routes.append(route)
+
+        margin = self.params.corridor_m / METERS_PER_DEGREE
+        self._bboxes = np.array([
+            (r.bbox[0] - margin, r.bbox[1] - margin / r.cos_lat,
+             r.bbox[2] + margin, r.bbox[3] + margin / r.cos_lat)
+            for r in self.routes
+        ]).reshape(-1, 4)
+        return len(self.routes)
+
+    def _route_points(self, route_ids: List[str]) -> Dict[str, List[Tuple[float, float]]]:
+        """route_line が未設定のルートは official_route_points を順番につなぐ"""
+        columns = self._columns('official_route_points')
+        order = next((c for c in ('point_order', 'sequence_number') if c in columns), None)
+        if not route_ids or order is None:
+            return {}
+        lines: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+        for route_id, lat, lon in self.conn.execute(
+            f"""
+            SELECT route_id, ST_Y(location::geometry), ST_X(location::geometry)
+            FROM official_route_points WHERE route_id = ANY(%s::uuid[])
+            ORDER BY route_id, {order}
+            """,
+            (route_ids,),
+        ).fetchall():
+            lines[str(route_id)].append((float(lat), float(lon)))
+        return lines
+
+    def _columns(self, table: str) -> set:
+        return {row[0] for row in self.conn.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = 'public' AND table_name = %s",
+            (table,),
+        ).fetchall()}
+
+    # ---- 散歩 -------------------------------------------------------------
+
+    def resolve(self, source: WalkSource) -> Optional[Dict[str, str]]:
+        walk_columns = self._columns(source.table)
+        point_columns = self._columns(source.points_table)
+        when = next((c for c in source.time_columns if c in walk_columns), None)
+        if not when or 'created_at' not in walk_columns or \
+                not {'route_id', 'latitude', 'longitude', 'sequence_number'} <= point_columns:
+            return None
+        return {
+            'when': when,
+            'accuracy': 'p.accuracy' if 'accuracy' in point_columns else 'NULL',
+            'timestamp': 'EXTRACT(EPOCH FROM p.timestamp)' if 'timestamp' in point_columns else 'NULL',
+        }
+
+    def run(self, source: WalkSource, columns: Dict[str, str], rebuild: bool, lag_seconds: int) -> MatchStats:
+        stats = MatchStats(source)
+        started = time.perf_counter()
+        if not self.dry_run:
+            with self.conn.transaction():
+                removed = self._remove_deleted_walks(source)
+                stats.routes_updated += self._refresh_total_walks(removed)
+        since, upper = self.conn.execute(
+            """
+            SELECT
+              COALESCE((SELECT last_created_at FROM maintenance_watermarks WHERE job_name = %s AND NOT %s),
+                       '-infinity'::timestamptz),
+              NOW() - make_interval(secs => %s)
+            """,
+            (source.watermark_job, rebuild, lag_seconds),
+        ).fetchone()
+        cursor = (since, ZERO_UUID)
+
+        while True:
+            walks = self.conn.execute(
+                f"""
+                SELECT id, created_at, {columns['when']} FROM {source.table}
+                WHERE (created_at, id) > (%s, %s::uuid) AND created_at <= %s
+                ORDER BY created_at, id LIMIT %s
+                """,
+                (*cursor, upper, self.chunk_size),
+            ).fetchall()
+            if not walks:
+                break
+            points = self._walk_points(source, columns, [str(w[0]) for w in walks])
+            matches = []
+            for walk_id, _, walked_at in walks:
+                walk_points = points.get(str(walk_id))
+                if walk_points is None:
+                    continue
+                stats.points += len(walk_points)
+                found, n_candidates = self.match_walk(str(walk_id), walk_points, walked_at)
+                stats.candidates += n_candidates
+                matches.extend(found)
+
+            if not self.dry_run:
+                with self.conn.transaction():
+                    changed = self._store(source, [str(w[0]) for w in walks], matches)
+                    stats.routes_updated += self._refresh_total_walks(changed)
+                    self._save_watermark(source, walks[-1][1])
+
+            cursor = (walks[-1][1], str(walks[-1][0]))
+            stats.chunks += 1
+            stats.walks += len(walks)
+            stats.matches += len(matches)
+            for m in matches:
+                stats.completed += m.is_completed
+                stats.per_route[m.route_id][0] += 1
+                stats.per_route[m.route_id][1] += m.is_completed
+                if self.dry_run or self.verbose:
+                    goal = f"{m.goal_distance_m:.0f}m" if m.goal_distance_m is not None else '-'
+                    print(f"   {'🔍' if self.dry_run else '🗺️ '} {m.walk_id} → {self._label(m.route_id)}: "
+                          f"カバレッジ {m.coverage:.0%} / ゴール {goal}{' ✅完走' if m.is_completed else ''}")
+            if len(walks) < self.chunk_size:
+                break
+
+        if not self.dry_run:
+            # 最後まで処理できたら上限まで進める（散歩が無い期間を毎回走査しない）
+            with self.conn.transaction():
+                self._save_watermark(source, upper)
+        stats.duration_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def _walk_points(self, source: WalkSource, columns: Dict[str, str], walk_ids: List[str]) -> Dict[str, 'np.ndarray']:
+        """散歩ごとの (lat, lon, accuracy, epoch秒) 配列"""
+        rows = self.conn.execute(
+            f"""
+            SELECT p.route_id, p.latitude, p.longitude, {columns['accuracy']}, {columns['timestamp']}
+            FROM {source.points_table} p
+            WHERE p.route_id = ANY(%s::uuid[])
+            ORDER BY p.route_id, p.sequence_number
+            """,
+            (walk_ids,),
+        ).fetchall()
+        if not rows:
+            return {}
+        ids = np.array([str(r[0]) for r in rows], dtype=object)
+        values = np.array([r[1:] for r in rows], dtype=float)
+        starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+        bounds = np.append(starts, len(rows))
+        return {ids[b]: values[b:e] for b, e in zip(bounds[:-1], bounds[1:])}
+
+    def match_walk(self, walk_id: str, values: 'np.ndarray', walked_at) -> Tuple[List[WalkMatch], int]:
+        p = self.params
+        accuracy = values[:, 2]
+        is_good = np.isnan(accuracy) | (accuracy <= p.accuracy_gate_m)
+        if len(values) == 0 or not len(self.routes):
+            return [], 0
+        # 精度の良い点を先に並べ、線分は精度の良い点どうしでだけ作る
+        good, poor = values[is_good], values[~is_good]
+        lat, lon = np.concatenate([good[:, 0], poor[:, 0]]), np.concatenate([good[:, 1], poor[:, 1]])
+        ts = good[:, 3]
+
+        # 外接矩形の重なりで候補ルートを絞る
+        b = self._bboxes
+        overlap = (b[:, 0] <= lat.max()) & (b[:, 2] >= lat.min()) & (b[:, 1] <= lon.max()) & (b[:, 3] >= lon.min())
+        candidates = np.flatnonzero(overlap)
+
+        # 歩行速度を超える点間は線分にしない（始点だけの長さ0の線分として残す）。精度の悪い点も長さ0
+        n_good = len(good)
+        seg_a = np.arange(len(lat))
+        seg_b = seg_a.copy()
+        seg_b[:max(n_good - 1, 0)] += 1
+        if n_good > 1:
+            glat, glon = lat[:n_good], lon[:n_good]
+            step = np.hypot((glat[1:] - glat[:-1]) * METERS_PER_DEGREE,
+                            (glon[1:] - glon[:-1]) * METERS_PER_DEGREE * math.cos(math.radians(float(glat[0]))))
+            dt = ts[1:] - ts[:-1]
+            too_fast = ~np.isnan(dt) & ((dt <= 0) | (step / np.where(dt > 0, dt, 1) > p.interp_max_speed_mps))
+            seg_b[:n_good - 1][too_fast & (step > p.cell_m)] = seg_a[:n_good - 1][too_fast & (step > p.cell_m)]
+
+        matches = []
+        for idx in candidates:
+            route = self.routes[idx]
+            xy = _local_xy(lat, lon, route.cos_lat)
+            near = point_segment_distances(route.cells, xy[seg_a], xy[seg_b]) <= p.corridor_m
+            coverage = float(near.mean())
+            if coverage < p.min_coverage:
+                continue
+            goal_distance = None
+            if n_good:
+                goal_xy = _local_xy(np.array([route.goal[0]]), np.array([route.goal[1]]), route.cos_lat)[0]
+                goal_distance = round(float(np.hypot(*(xy[:n_good] - goal_xy).T).min()), 1)
+            completed = (coverage >= p.complete_coverage and goal_distance is not None
+                         and goal_distance <= p.goal_radius_m)
+            matches.append(WalkMatch(walk_id, route.id, round(coverage, 4), goal_distance, completed, walked_at))
+        return matches, len(candidates)
+
+    def _store(self, source: WalkSource, walk_ids: List[str], matches: List[WalkMatch]) -> Set[str]:
+        """チャンクの散歩の既存結果を消してから入れ直す（再実行しても同じ結果になる）
+
+        消した結果・入れた結果のルートID（total_walks を数え直すルート）を返す。
+        """
+        deleted = self.conn.execute(
+            "DELETE FROM walk_route_matches WHERE walk_table = %s AND walk_id = ANY(%s::uuid[]) RETURNING route_id",
+            (source.table, walk_ids),
+        ).fetchall()
+        changed = {str(row[0]) for row in deleted} | {m.route_id for m in matches}
+        if not matches:
+            return changed
+        self.conn.execute(
+            """
+            INSERT INTO walk_route_matches
+              (walk_id, route_id, walk_table, coverage, goal_distance_m, is_completed, walked_at, params_version)
+            SELECT d.walk_id, d.route_id, %s, d.coverage, d.goal_distance_m, d.is_completed, d.walked_at, %s
+            FROM UNNEST(%s::uuid[], %s::uuid[], %s::numeric[], %s::numeric[], %s::boolean[], %s::timestamptz[])
+                 AS d(walk_id, route_id, coverage, goal_distance_m, is_completed, walked_at)
+            """,
+            (
+                source.table, self.params.version,
+                [m.walk_id for m in matches], [m.route_id for m in matches],
+                [m.coverage for m in matches], [m.goal_distance_m for m in matches],
+                [m.is_completed for m in matches], [m.walked_at for m in matches],
+            ),
+        )
+        return changed
+
+    def _remove_deleted_walks(self, source: WalkSource) -> Set[str]:
+        """もう存在しない散歩の結果を消し、そのルートIDを返す（walk_id には外部キーがない）"""
+        rows = self.conn.execute(
+            f"""
+            DELETE FROM walk_route_matches m
+            WHERE m.walk_table = %s AND NOT EXISTS (SELECT 1 FROM {source.table} w WHERE w.id = m.walk_id)
+            RETURNING m.route_id
+            """,
+            (source.table,),
+        ).fetchall()
+        return {str(row[0]) for row in rows}
+
+    def _refresh_total_walks(self, route_ids: Set[str]) -> int:
+        """total_walks を route_walks と完走した散歩の件数で数え直す（reconcile_counters.py の定義をそのまま使う）"""
+        return self._counters.recount(TOTAL_WALKS, sorted(route_ids))
+
+    def _save_watermark(self, source: WalkSource, last_created_at):
+        self.conn.execute(
+            """
+            INSERT INTO maintenance_watermarks (job_name, last_created_at, updated_at)
+            VALUES (%s, %s, NOW())
+            ON CONFLICT (job_name)
+              DO UPDATE SET last_created_at = EXCLUDED.last_created_at, updated_at = EXCLUDED.updated_at
+            """,
+            (source.watermark_job, last_created_at),
+        )
+
+    def _label(self, route_id: str) -> str:
+        return next((r.label for r in self.routes if r.id == route_id), route_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='散歩記録と公式ルートのバッチ・マップマッチング')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--dry-run', action='store_true', help='判定結果を表示するだけで保存しない')
+    parser.add_argument('--chunk-size', type=int, default=200, help='1回に読み込む散歩数')
+    parser.add_argument('--only', action='append', choices=[s.table for s in WALK_SOURCES],
+                        help='対象の散歩テーブルを限定（複数指定可）')
+    parser.add_argument('--min-coverage', type=float, default=0.30, help='これ未満のカバレッジは保存しない')
+    parser.add_argument('--corridor', type=float, help='ルートからの判定幅（m、既定は nav_params の off_route_m）')
+    parser.add_argument('--lag-seconds', type=int, default=600, help='経路ポイントの書き込み待ち（秒）')
+    parser.add_argument('--rebuild', action='store_true', help='水位を無視して全散歩を判定し直す')
+    parser.add_argument('--verbose', action='store_true', help='保存時もマッチした散歩を表示')
+    args = parser.parse_args()
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    conn = connect(dsn)
+    params = load_nav_params(conn, MatchParams(min_coverage=args.min_coverage))
+    if args.corridor is not None:
+        params.corridor_m = args.corridor
+    matcher = WalkMatcher(conn, params, args.chunk_size, args.dry_run, args.verbose)
+
+    print("=" * 80)
+    print(f"🗺️  散歩と公式ルートのマッチング{'（ドライラン）' if args.dry_run else ''}")
+    print("=" * 80)
+    print(f"   判定幅 {params.corridor_m:g}m / 区画 {params.cell_m:g}m / 完走 カバレッジ{params.complete_coverage:.0%} "
+          f"+ ゴール{params.goal_radius_m:g}m圏 (nav_params version {params.version or '既定値'})")
+
+    results = []
+    try:
+        if not conn.execute("SELECT to_regclass('public.walk_route_matches') IS NOT NULL").fetchone()[0]:
+            print("❌ walk_route_matches がありません（017_walk_route_matches.sql を適用してください）")
+            sys.exit(1)
+        print(f"\n📍 公式ルート {matcher.load_routes()}件を読み込みました")
+        for source in WALK_SOURCES:
+            if args.only and source.table not in args.only:
+                continue
+            columns = matcher.resolve(source)
+            if columns is None:
+                print(f"\n⏭️  {source.table}: テーブルまたはカラムが存在しないためスキップ")
+                continue
+            print(f"\n📊 {source.table} ← {source.points_table}")
+            results.append(matcher.run(source, columns, args.rebuild, args.lag_seconds))
+    except KeyboardInterrupt:
+        print("\n⏹️  中断しました。再実行すると保存済みの水位から再開します")
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 80)
+    print("📋 結果")
+    print("=" * 80)
+    for stats in results:
+        print(f"  {stats.source.table}: 散歩 {stats.walks}件 ({stats.points}点) / 候補 {stats.candidates}組 / "
+              f"マッチ {stats.matches}件 / 完走 {stats.completed}件 / total_walks更新 {stats.routes_updated}ルート "
+              f"({stats.chunks}チャンク, {stats.duration_ms / 1000:.2f}秒)")
+        top = sorted(stats.per_route.items(), key=lambda kv: -kv[1][0])[:10]
+        for route_id, (matched, completed) in top:
+            print(f"     {matcher._label(route_id)}: {matched}件（完走 {completed}件）")
+    if args.dry_run and any(s.matches for s in results):
+        print("\n💡 --dry-run を外して実行すると結果を保存します")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+チェックサム台帳つきトランザクショナル・マイグレーションランナー
+
+supabase_migrations/ のSQLファイルをPostgreSQLに直接接続して適用します。
+- $$ 関数本文・文字列リテラル・コメントを考慮したステートメント分割
+- ファイルごとにトランザクションで実行（失敗時はロールバック）。CONCURRENTLY等を含むファイルは
+  トランザクション外で実行するため、失敗しても成功したステートメントの変更は残る
+- schema_migration_ledger テーブルにチェックサムを記録し、未変更ファイルはスキップ
+- 006_ / 008_ / 010_ のような重複番号があってもファイル名順で決定的に並べる
+- ステートメントごとの実行時間を表示
+
+使い方:
+  python3 scripts/migration_runner.py                      # 未適用・変更ファイルを適用
+  python3 scripts/migration_runner.py --dry-run            # 適用予定を表示のみ
+  python3 scripts/migration_runner.py --baseline           # 既存DBの現状を台帳に記録（実行しない）
+  python3 scripts/migration_runner.py supabase_migrations/013_favorite_routes.sql
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+    例: postgresql://postgres:<password>@db.<project-ref>.supabase.co:5432/postgres
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ops_env import connect, resolve_dsn
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MIGRATION_DIR = PROJECT_ROOT / 'supabase_migrations'
+LEDGER_TABLE = 'public.schema_migration_ledger'
+
+LEDGER_DDL = f"""
+CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+  filename TEXT PRIMARY KEY,
+  checksum TEXT NOT NULL,
+  statements INTEGER NOT NULL,
+  duration_ms INTEGER NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+# トランザクション内で実行できないステートメント
+NON_TRANSACTIONAL = re.compile(
+    r'\b(CREATE|DROP)\s+INDEX\s+CONCURRENTLY\b|\bVACUUM\b|\bALTER\s+TYPE\s+\S+\s+ADD\s+VALUE\b',
+    re.IGNORECASE)
+
+
+# ============================================================
+# ファイルの並び順とステートメント分割
+# ============================================================
+
+def migration_sort_key(path: Path) -> Tuple[int, int, str, str]:
+    """番号付きファイルを番号順（同番号はファイル名順）、番号なしファイルを名前順で並べるキー"""
+    match = re.match(r'^(\d+)_', path.name)
+    if match:
+        return (0, int(match.group(1)), path.name, str(path))
+    return (1, 0, path.name, str(path))
+
+
+def discover_migrations(directory: Path, include_unnumbered: bool = False) -> List[Path]:
+    files = [p for p in directory.glob('*.sql') if include_unnumbered or re.match(r'^\d+_', p.name)]
+    return sorted(files, key=migration_sort_key)
+
+
+def split_statements(sql: str) -> List[str]:
+    """SQLをステートメント単位に分割
+
+    セミコロンで区切るが、以下の内側は区切らない:
+      - '文字列' / "識別子"
+      - $$ ... $$ / $tag$ ... $tag$ （関数本文）
+      - -- 行コメント / /* ブロックコメント */
+    """
+    statements = []
+    start = 0
+    i = 0
+    n = len(sql)
+    has_code = False
+
+    while i < n:
+        ch = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end + 1
+            continue
+        if sql.startswith('/*', i):
+            depth = 1
+            i += 2
+            while i < n and depth:
+                if sql.startswith('/*', i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith('*/', i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+            continue
+        if ch in ("'", '"'):
+            has_code = True
+            i += 1
+            while i < n:
+                if sql[i] == ch:
+                    if i + 1 < n and sql[i + 1] == ch:
+                        i += 2  # '' / "" エスケープ
+                        continue
+                    break
+                i += 1
+            i += 1
+            continue
+        if ch == '$':
+            tag = re.match(r'\$([A-Za-z_]\w*)?\$', sql[i:])
+            if tag and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] == '_')):
+                has_code = True
+                end = sql.find(tag.group(0), i + len(tag.group(0)))
+                i = n if end == -1 else end + len(tag.group(0))
+                continue
+        if ch == ';':
+            if has_code:
+                statements.append(sql[start:i].strip())
+            start = i + 1
+            has_code = False
+            i += 1
+            continue
+        if not ch.isspace():
+            has_code = True
+        i += 1
+
+    if has_code and sql[start:].strip():
+        statements.append(sql[start:].strip())
+    return statements
+
+
+def file_checksum(content: str) -> str:
+    normalized = content.replace('\r\n', '\n')
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def summarize(statement: str, width: int = 70) -> str:
+    """ログ表示用にステートメント先頭のコード行を1行にまとめる"""
+    lines = [line.strip() for line in statement.splitlines()]
+    code = ' '.join(line for line in lines if line and not line.startswith('--'))
+    return code if len(code) <= width else code[:width - 1] + '…'
+
+
+# ============================================================
+# 実行
+# ============================================================
+
+@dataclass
+class Migration:
+    path: Path
+    key: str
+    checksum: str
+    statements: List[str]
+    status: str = 'pending'  # 'new' / 'changed' / 'unchanged'
+
+
+@dataclass
+class StatementTiming:
+    index: int
+    summary: str
+    duration_ms: float
+
+
+@dataclass
+class ApplyResult:
+    migration: Migration
+    timings: List[StatementTiming] = field(default_factory=list)
+    error: Optional[str] = None
+    transactional: bool = True
+
+    @property
+    def duration_ms(self) -> float:
+        return sum(t.duration_ms for t in self.timings)
+
+
+class MigrationRunner:
+    def __init__(self, dsn: str):
+        self.conn = connect(dsn)
+
+    def close(self):
+        self.conn.close()
+
+    def ensure_ledger(self):
+        self.conn.execute(LEDGER_DDL)
+
+    def applied_checksums(self) -> Dict[str, str]:
+        rows = self.conn.execute(f"SELECT filename, checksum FROM {LEDGER_TABLE}").fetchall()
+        return {filename: checksum for filename, checksum in rows}
+
+    def record(self, migration: Migration, duration_ms: float):
+        self.conn.execute(
+            f"""
+            INSERT INTO {LEDGER_TABLE} (filename, checksum, statements, duration_ms, applied_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            ON CONFLICT (filename) DO UPDATE
+              SET checksum = EXCLUDED.checksum,
+                  statements = EXCLUDED.statements,
+                  duration_ms = EXCLUDED.duration_ms,
+                  applied_at = EXCLUDED.applied_at
+            """,
+            (migration.key, migration.checksum, len(migration.statements), int(duration_ms)),
+        )
+
+    def apply(self, migration: Migration) -> ApplyResult:
+        result = ApplyResult(migration)
+        transactional = result.transactional = not any(NON_TRANSACTIONAL.search(s) for s in migration.statements)
+        if not transactional:
+            print("   ⚠️  CONCURRENTLY等を含むためトランザクション外で実行します")
+
+        try:
+            if transactional:
+                with self.conn.transaction():
+                    self._execute_all(migration, result)
+                    self.record(migration, result.duration_ms)
+            else:
+                self._execute_all(migration, result)
+                self.record(migration, result.duration_ms)
+        except Exception as e:
+            result.error = str(e).strip()
+        return result
+
+    def _execute_all(self, migration: Migration, result: ApplyResult):
+        for idx, statement in enumerate(migration.statements, 1):
+            started = time.perf_counter()
+            self.conn.execute(statement)
+            elapsed = (time.perf_counter() - started) * 1000
+            timing = StatementTiming(idx, summarize(statement), elapsed)
+            result.timings.append(timing)
+            print(f"   ✅ [{idx}/{len(migration.statements)}] {elapsed:8.1f}ms  {timing.summary}")
+
+
+def build_migrations(paths: List[Path]) -> List[Migration]:
+    migrations = []
+    for path in paths:
+        content = path.read_text(encoding='utf-8')
+        try:
+            key = str(path.resolve().relative_to(PROJECT_ROOT))
+        except ValueError:
+            key = str(path.resolve())
+        migrations.append(Migration(path, key, file_checksum(content), split_statements(content)))
+    return migrations
+
+
+def classify(migrations: List[Migration], applied: Dict[str, str]):
+    for migration in migrations:
+        previous = applied.get(migration.key)
+        if previous is None:
+            migration.status = 'new'
+        elif previous != migration.checksum:
+            migration.status = 'changed'
+        else:
+            migration.status = 'unchanged'
+
+
+def print_plan(migrations: List[Migration]):
+    labels = {'new': '🆕 新規', 'changed': '✏️  変更', 'unchanged': '⏭️  未変更', 'pending': '❔ 未確認'}
+    print("📋 マイグレーション一覧（適用順）")
+    print("-" * 80)
+    for migration in migrations:
+        print(f"  {labels[migration.status]}  {migration.key}  ({len(migration.statements)}ステートメント)")
+    print()
+
+
+def print_summary(results: List[ApplyResult], skipped: int, wall_ms: float):
+    print("\n" + "=" * 80)
+    print("📊 マイグレーション結果")
+    print("=" * 80)
+    for result in results:
+        status = '❌' if result.error else '✅'
+        print(f"{status} {result.migration.key}: {len(result.timings)}ステートメント / {result.duration_ms:.1f}ms")
+        if result.error and result.transactional:
+            print(f"   → ロールバックしました: {result.error[:200]}")
+        elif result.error:
+            print(f"   → トランザクション外のため、成功した{len(result.timings)}ステートメントの変更は残っています: "
+                  f"{result.error[:200]}")
+
+    slowest = sorted((t for r in results for t in r.timings), key=lambda t: -t.duration_ms)[:5]
+    if slowest:
+        print("\n🐢 遅いステートメント上位:")
+        for timing in slowest:
+            print(f"   {timing.duration_ms:8.1f}ms  {timing.summary}")
+
+    applied = sum(1 for r in results if not r.error)
+    failed = sum(1 for r in results if r.error)
+    print(f"\n適用: {applied}件 / 失敗: {failed}件 / スキップ: {skipped}件 / 合計 {wall_ms / 1000:.2f}秒")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='チェックサム台帳つきマイグレーションランナー')
+    parser.add_argument('files', nargs='*', type=Path, help='適用するSQLファイル（省略時はディレクトリ全体）')
+    parser.add_argument('--dir', type=Path, default=DEFAULT_MIGRATION_DIR, help='マイグレーションディレクトリ')
+    parser.add_argument('--include-unnumbered', action='store_true',
+                        help='番号のないSQLファイル（complete_schema_with_social.sql等）も対象にする')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--dry-run', action='store_true', help='適用予定を表示して終了')
+    parser.add_argument('--baseline', action='store_true', help='実行せずにチェックサムだけ台帳に記録')
+    parser.add_argument('--force', action='store_true', help='未変更のファイルも再適用')
+    args = parser.parse_args()
+
+    paths = sorted(args.files, key=migration_sort_key) if args.files else \
+        discover_migrations(args.dir, args.include_unnumbered)
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        for path in missing:
+            print(f"❌ SQLファイルが見つかりません: {path}")
+        sys.exit(1)
+    migrations = build_migrations(paths)
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        if args.dry_run:
+            print("⚠️  DATABASE_URLが未設定のため台帳と照合せずに表示します\n")
+            print_plan(migrations)
+            return
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        print("💡 .envファイルに以下を設定してください:")
+        print("   DATABASE_URL=postgresql://postgres:<password>@db.<project-ref>.supabase.co:5432/postgres")
+        sys.exit(1)
+
+    runner = MigrationRunner(dsn)
+    try:
+        runner.ensure_ledger()
+        classify(migrations, runner.applied_checksums())
+        print_plan(migrations)
+
+        targets = [m for m in migrations if args.force or m.status != 'unchanged']
+        skipped = len(migrations) - len(targets)
+        if args.dry_run:
+            print(f"💡 適用予定: {len(targets)}件 / スキップ: {skipped}件")
+            return
+        if args.baseline:
+            for migration in targets:
+                runner.record(migration, 0)
+            print(f"✅ {len(targets)}件を台帳に記録しました（SQLは実行していません）")
+            return
+
+        wall_started = time.perf_counter()
+        results = []
+        for migration in targets:
+            print(f"\n🚀 {migration.key} ({len(migration.statements)}ステートメント)")
+            result = runner.apply(migration)
+            results.append(result)
+            if result.error:
+                print(f"   ❌ エラー: {result.error[:200]}")
+                break
+        print_summary(results, skipped, (time.perf_counter() - wall_started) * 1000)
+        if any(r.error for r in results):
+            sys.exit(1)
+    finally:
+        runner.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+エリアごとのオフラインパック生成
+
+箱根の谷あいなど電波の弱い場所でも使えるように、エリアごとに
+公式ルート（間引いた経路）・route_spots・人気ピン・縮小済みサムネイルを
+1つのZIPパックにまとめます。アプリはエリアを一度ダウンロードすれば手元で読めます。
+
+パックの中身（コンテンツアドレス方式）:
+  manifest.json          … {"format": 1, "area_id", "area_name", "version", "routes": [
+                               {"id", "name", "object": "<sha256>", "thumbnail": "<sha256>" or null}],
+                             "objects": {"<sha256>": {"path": "objects/<sha256>.json", "bytes": ...}}}
+  objects/<sha256>.json  … ルート1本分（経路・スポット・ピン）
+  objects/<sha256>.webp  … サムネイル（幅 --thumb-width px）
+
+- version は manifest の内容ハッシュ。内容が変わらなければパックは書き直さない
+- オブジェクトは build/offline/objects/ に共有キャッシュされ、変わったルートだけ作り直す
+- サムネイルは URL ごとに一度だけダウンロード・縮小する（--no-thumbnails で省略）
+- 入力は local_mirror.py のミラー（実行時に増分同期）
+
+出力:
+  build/offline/<area_id>/pack-<version>.zip
+  build/offline/<area_id>/latest.json   … {"version", "file", "bytes", "sha256"}
+
+使い方:
+  python3 scripts/offline_packs.py                     # 全エリア
+  python3 scripts/offline_packs.py --area 箱根 --pins-per-route 10
+  python3 scripts/offline_packs.py --offline --no-thumbnails
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from areas import HAKONE_PARENT_AREA_ID, resolve_area_ids
+from csv_to_sql import AREA_MAP
+from geo_utils import parse_linestring, parse_point
+from local_mirror import open_mirror, sync_mirror
+from ops_env import PROJECT_ROOT
+from route_vector_tiles import simplify
+
+DEFAULT_OUT = PROJECT_ROOT / 'build' / 'offline'
+PACK_FORMAT = 1
+# 経路の間引き許容誤差（度）。約5m
+SIMPLIFY_DEGREES = 5 / 111_320
+
+ROUTE_FIELDS = ['id', 'area_id', 'name', 'description', 'distance_meters', 'estimated_minutes',
+                'elevation_gain_meters', 'difficulty_level', 'pet_info', 'total_pins', 'thumbnail_url']
+SPOT_FIELDS = ['id', 'spot_order', 'spot_type', 'name', 'description', 'distance_from_start',
+               'estimated_time_from_start', 'facility_type', 'pet_friendly', 'opening_hours',
+               'is_optional', 'tips', 'category', 'photo_url']
+PIN_FIELDS = ['id', 'pin_type', 'title', 'comment', 'description', 'likes_count', 'created_at']
+
+
+@dataclass
+class PackResult:
+    area_name: str
+    area_id: str
+    routes: int
+    version: str
+    written: bool
+    bytes: int
+
+
+def canonical_bytes(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _json_field(value):
+    """ミラーではJSON列が文字列で入っているので戻す"""
+    if isinstance(value, str) and value[:1] in ('{', '['):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    return value
+
+
+def _columns(db, table: str) -> set:
+    return {row[1] for row in db.execute(f'PRAGMA table_info("{table}")')}
+
+
+def _rows(db, table: str, where: str, params, order: str) -> List[Dict[str, Any]]:
+    try:
+        return [dict(row) for row in db.execute(f'SELECT * FROM "{table}" WHERE {where} ORDER BY {order}', params)]
+    except sqlite3.OperationalError:
+        # テーブル未同期、または本番に列がない場合
+        return []
+
+
+class PackBuilder:
+    def __init__(self, db, out_dir: Path, pins_per_route: int, thumbnails: bool,
+                 thumb_width: int, download_workers: int):
+        self.db = db
+        self.out_dir = out_dir
+        self.objects_dir = out_dir / 'objects'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.pins_per_route = pins_per_route
+        self.thumbnails = thumbnails
+        self.thumb_width = thumb_width
+        self.download_workers = download_workers
+        self.thumb_index_path = out_dir / 'thumbnails.json'
+        try:
+            self.thumb_index: Dict[str, str] = json.loads(self.thumb_index_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.thumb_index = {}
+        self.pin_order = ('likes_count DESC, created_at DESC' if 'likes_count' in _columns(db, 'route_pins')
+                          else 'created_at DESC')
+
+    # ---------------- オブジェクト ----------------
+
+    def _put(self, data: bytes, suffix: str) -> Dict[str, Any]:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.objects_dir / f"{digest}{suffix}"
+        if not path.exists():
+            tmp = path.with_name(path.name + '.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return {'hash': digest, 'path': f"objects/{digest}{suffix}", 'bytes': len(data)}
+
+    def route_object(self, route: Dict[str, Any]) -> Dict[str, Any]:
+        points = parse_linestring(route.get('route_line'))
+        if len(points) < 2:
+            points = [(r['location_lat'], r['location_lon']) for r in _rows(
+                self.db, 'official_route_points', 'route_id = ? AND location_lat IS NOT NULL',
+                (route['id'],), 'point_order')]
+        line = [[round(lat, 6), round(lon, 6)] for lat, lon in simplify(points, SIMPLIFY_DEGREES)]
+
+        spots = []
+        for spot in _rows(self.db, 'route_spots', 'route_id = ?', (route['id'],),
+                          'distance_from_start IS NULL, distance_from_start, spot_order'):
+            item = {k: _json_field(spot[k]) for k in SPOT_FIELDS if spot.get(k) is not None}
+            point = parse_point(spot.get('location'))
+            if point:
+                item['location'] = [round(point[0], 6), round(point[1], 6)]
+            spots.append(item)
+
+        pins = []
+        for pin in _rows(self.db, 'route_pins', 'route_id = ?', (route['id'],), self.pin_order)[:self.pins_per_route]:
+            item = {k: pin[k] for k in PIN_FIELDS if pin.get(k) is not None}
+            if pin.get('location_lat') is not None:
+                item['location'] = [round(pin['location_lat'], 6), round(pin['location_lon'], 6)]
+            pins.append(item)
+
+        body = {k: _json_field(route[k]) for k in ROUTE_FIELDS if route.get(k) is not None}
+        for column in ('start_location', 'end_location'):
+            point = parse_point(route.get(column))
+            if point:
+                body[column] = [round(point[0], 6), round(point[1], 6)]
+        body.update({'line': line, 'spots': spots, 'pins': pins})
+        return self._put(canonical_bytes(body), '.json')
+
+    # ---------------- サムネイル ----------------
+
+    def prepare_thumbnails(self, urls: List[str]) -> int:
+        """未処理のURLだけダウンロード・縮小する（戻り値は新規に処理した件数）"""
+        def key(url: str) -> str:
+            return f"{self.thumb_width}:{url}"
+
+        pending = sorted({u for u in urls if u and key(u) not in self.thumb_index})
+        if not self.thumbnails or not pending:
+            return 0
+
+        from image_derivatives import Image, ImageOps
+
+        def fetch(url: str) -> Optional[bytes]:
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    original = Image.open(io.BytesIO(response.read()))
+                image = ImageOps.exif_transpose(original).convert('RGB')
+                if image.width > self.thumb_width:
+                    image = image.resize((self.thumb_width, round(image.height * self.thumb_width / image.width)),
+                                         Image.LANCZOS)
+                buffer = io.BytesIO()
+                image.save(buffer, format='WEBP', quality=75, method=6)
+                return buffer.getvalue()
+            except Exception as e:
+                print(f"  ⚠️  サムネイル取得失敗: {url} ({e})")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+            for url, data in zip(pending, pool.map(fetch, pending)):
+                if data is not None:
+                    self.thumb_index[key(url)] = self._put(data, '.webp')['hash']
+        self.thumb_index_path.write_text(json.dumps(self.thumb_index, ensure_ascii=False, indent=0),
+                                         encoding='utf-8')
+        return len(pending)
+
+    def thumbnail_object(self, url: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not self.thumbnails or not url:
+            return None
+        digest = self.thumb_index.get(f"{self.thumb_width}:{url}")
+        if not digest:
+            return None
+        path = self.objects_dir / f"{digest}.webp"
+        return {'hash': digest, 'path': f"objects/{digest}.webp", 'bytes': path.stat().st_size} if path.exists() else None
+
+    # ---------------- パック ----------------
+
+    def build(self, area_name: str, area_id: str) -> Optional[PackResult]:
+        routes = _rows(self.db, 'official_routes', 'area_id = ?', (area_id,), 'name')
+        if 'is_active' in _columns(self.db, 'official_routes'):
+            routes = [r for r in routes if r.get('is_active') in (None, 1)]
+        if not routes:
+            return None
+
+        self.prepare_thumbnails([r.get('thumbnail_url') for r in routes])
+
+        objects: Dict[str, Dict[str, Any]] = {}
+        entries = []
+        for route in routes:
+            obj = self.route_object(route)
+            objects[obj['hash']] = {'path': obj['path'], 'bytes': obj['bytes']}
+            thumb = self.thumbnail_object(route.get('thumbnail_url'))
+            if thumb:
+                objects[thumb['hash']] = {'path': thumb['path'], 'bytes': thumb['bytes']}
+            entries.append({'id': route['id'], 'name': route.get('name'), 'object': obj['hash'],
+                            'thumbnail': thumb['hash'] if thumb else None})
+
+        content = {'format': PACK_FORMAT, 'area_id': area_id, 'area_name': area_name,
+                   'routes': entries, 'objects': dict(sorted(objects.items()))}
+        version = hashlib.sha256(canonical_bytes(content)).hexdigest()[:16]
+        manifest = {**content, 'version': version}
+
+        area_dir = self.out_dir / area_id
+        latest_path = area_dir / 'latest.json'
+        pack_path = area_dir / f"pack-{version}.zip"
+        if pack_path.exists() and latest_path.exists():
+            return PackResult(area_name, area_id, len(routes), version, False, pack_path.stat().st_size)
+
+        area_dir.mkdir(parents=True, exist_ok=True)
+        tmp = pack_path.with_name(pack_path.name + '.tmp')
+        with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+            zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=1))
+            for digest, info in manifest['objects'].items():
+                # WebPは圧縮済みなのでそのまま格納
+                compress = zipfile.ZIP_STORED if info['path'].endswith('.webp') else zipfile.ZIP_DEFLATED
+                zf.write(self.out_dir / info['path'], info['path'], compress_type=compress)
+        os.replace(tmp, pack_path)
+
+        for old in area_dir.glob('pack-*.zip'):
+            if old != pack_path:
+                old.unlink()
+        size = pack_path.stat().st_size
+        latest_path.write_text(json.dumps({
+            'version': version,
+            'file': pack_path.name,
+            'bytes': size,
+            'sha256': hashlib.sha256(pack_path.read_bytes()).hexdigest(),
+        }, indent=2), encoding='utf-8')
+        return PackResult(area_name, area_id, len(routes), version, True, size)
+
+
+def target_areas(only: Optional[List[str]]) -> Dict[str, str]:
+    """エリア名 → area_id（AREA_MAP の全エリアと、箱根の親エリア）"""
+    areas = {'箱根': HAKONE_PARENT_AREA_ID, **AREA_MAP}
+    if not only:
+        return areas
+    wanted = {area_id for key in only for area_id in resolve_area_ids(key)}
+    return {name: area_id for name, area_id in areas.items() if area_id in wanted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='エリアごとのオフラインパック生成')
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help='出力ディレクトリ')
+    parser.add_argument('--area', action='append', help='対象エリア（エリア名・「箱根」・area_id、複数指定可）')
+    parser.add_argument('--pins-per-route', type=int, default=20, help='ルートごとに含める人気ピンの数')
+    parser.add_argument('--thumb-width', type=int, default=320, help='サムネイルの幅（px）')
+    parser.add_argument('--no-thumbnails', action='store_true', help='サムネイルを含めない')
+    parser.add_argument('--download-workers', type=int, default=8, help='サムネイル取得の並列数')
+    parser.add_argument('--offline', action='store_true', help='ミラーを同期せずに手元のデータで生成')
+    args = parser.parse_args()
+
+    try:
+        areas = target_areas(args.area)
+    except KeyError as e:
+        print(f"❌ エラー: {e}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    if not args.offline:
+        sync_mirror(tables=['official_routes', 'official_route_points', 'route_pins', 'route_spots'],
+                    prune=True)
+    builder = PackBuilder(open_mirror(), args.out, args.pins_per_route, not args.no_thumbnails,
+                          args.thumb_width, args.download_workers)
+
+    print("=" * 60)
+    print(f"📦 オフラインパック生成（{len(areas)}エリア）")
+    print("=" * 60)
+    written = 0
+    for name, area_id in areas.items():
+        result = builder.build(name, area_id)
+        if result is None:
+            continue
+        mark = '✅' if result.written else '⏭️ '
+        state = '更新' if result.written else '変更なし'
+        print(f"  {mark} {name}: {result.routes}ルート / {result.bytes / 1024:.1f}KB / v{result.version}（{state}）")
+        written += result.written
+    print(f"\n📊 {written}パックを書き出しました ({time.perf_counter() - started:.1f}秒) → {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+運用スクリプト共通の接続ヘルパー
+
+- load_env(): プロジェクト直下の .env と環境変数から設定を読む
+- resolve_dsn() / connect(): PostgreSQLへの直接接続（psycopg）
+- create_service_client(): Service Role Keyを使ったSupabaseクライアント
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+from ops_metrics import install_from_env
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_env() -> Dict[str, str]:
+    """環境変数を.envファイルから読み込む（既存の環境変数が優先）"""
+    env_path = PROJECT_ROOT / '.env'
+    env_vars = {}
+
+    if env_path.exists():
+        with open(env_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    env_vars[key.strip()] = value.strip().strip('"').strip("'")
+
+    env_vars.update({k: v for k, v in os.environ.items() if k.startswith(('DATABASE_', 'SUPABASE_'))})
+    return env_vars
+
+
+def resolve_dsn(explicit: Optional[str] = None) -> Optional[str]:
+    """--dsn 引数 → DATABASE_URL → SUPABASE_DB_URL の順で接続文字列を決める"""
+    env = load_env()
+    return explicit or env.get('DATABASE_URL') or env.get('SUPABASE_DB_URL')
+
+
+def connect(dsn: str, autocommit: bool = True):
+    """psycopgでPostgreSQLに接続（未インストールならインストール方法を表示して終了）"""
+    try:
+        import psycopg
+    except ImportError:
+        print("❌ psycopgモジュールがインストールされていません")
+        print("以下のコマンドでインストールしてください:")
+        print("  pip3 install 'psycopg[binary]'")
+        sys.exit(1)
+    return psycopg.connect(dsn, autocommit=autocommit)
+
+
+def create_service_client():
+    """SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY でSupabaseクライアントを作成（RLSをバイパス）"""
+    from supabase import create_client
+
+    env = load_env()
+    url = env.get('SUPABASE_URL')
+    key = env.get('SUPABASE_SERVICE_ROLE_KEY')
+    if not url or not key:
+        print("❌ エラー: SUPABASE_URLまたはSUPABASE_SERVICE_ROLE_KEYが設定されていません")
+        print("💡 .envファイルに以下を設定してください:")
+        print("   SUPABASE_URL=your_supabase_url")
+        print("   SUPABASE_SERVICE_ROLE_KEY=your_service_role_key")
+        sys.exit(1)
+    return create_client(url, key)
+
+
+# OPS_METRICS が設定されていれば HTTP / DB の計測を有効にする（scripts/ops_metrics.py）
+install_from_env()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+運用スクリプトのレイテンシ・スループット計測
+
+運用スクリプトは絵文字の進捗を表示するだけで、どこに時間がかかっているかは記録していません。
+このモジュールはスクリプトが行う HTTP 呼び出しと DB ステートメントをすべて横取りし、
+エンドポイント・ステータス・バイト数・レイテンシを記録して、終了時に集計を書き出します。
+
+計測対象:
+  - requests（requests.get / Session.request。Supabase REST・認証API・画像ダウンロード）
+  - httpx（supabase-py クライアント）
+  - urllib（urllib.request.urlopen / urlretrieve。offline_packs・photo_dedup の画像ダウンロード）
+  - psycopg（Cursor.execute / executemany / copy。ops_env.connect() の接続を含む）
+
+集計（build/metrics/<スクリプト名>-<日時>.json と .md）:
+  - エンドポイントごとの件数・エラー数・p50 / p95 / 最大レイテンシ・合計時間・送受信バイト
+    （レイテンシはヘッダー受信まで。Content-Length のないストリーミング応答は読んだ分を後から加算）
+  - フェーズごとの所要時間と、その間の呼び出し数（phase() で区切ったもの。なければスクリプト全体）
+
+エンドポイントは HTTP なら「メソッド + パス（UUID・数値は :id、先頭4階層まで）」、
+SQL なら「先頭の動詞 + 対象テーブル」にまとめます（同じテーブルへの SELECT は1行に集計）。
+
+使い方:
+  # どのスクリプトでも外から包んで計測
+  python3 scripts/ops_metrics.py scripts/fixture_factory.py --users 1000
+  python3 scripts/ops_metrics.py --out /tmp/metrics delete_routes_final.py
+
+  # ops_env を使うスクリプトは環境変数でも有効になる
+  OPS_METRICS=1 python3 scripts/reconcile_counters.py --dry-run
+
+  # スクリプト側でフェーズを区切る
+  from ops_metrics import phase
+  with phase('投入'):
+      ...
+"""
+
+import atexit
+import json
+import os
+import re
+import runpy
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_OUT = Path(__file__).resolve().parent.parent / 'build' / 'metrics'
+
+ID_SEGMENT = re.compile(r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)$', re.IGNORECASE)
+SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|COPY|TABLE)\s+("?[\w.]+"?)', re.IGNORECASE)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def http_endpoint(method: str, url: str) -> str:
+    segments = [':id' if ID_SEGMENT.match(s) else s for s in urlsplit(str(url)).path.split('/') if s]
+    return f"{method.upper()} /{'/'.join(segments[:4])}"
+
+
+def sql_endpoint(query, context=None) -> str:
+    if hasattr(query, 'as_string'):
+        # psycopg.sql.Composed など
+        query = query.as_string(context)
+    text = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+    words = text.split()
+    if not words:
+        return 'SQL'
+    match = SQL_TABLE.search(text)
+    table = match.group(1).strip('"') if match else ''
+    return f"{words[0].upper()} {table}".strip()
+
+
+@dataclass
+class EndpointStats:
+    kind: str
+    endpoint: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    sent: int = 0
+    received: int = 0
+    rows: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'endpoint': self.endpoint,
+            'count': len(self.latencies),
+            'errors': self.errors,
+            'statuses': self.statuses,
+            'p50_ms': round(percentile(self.latencies, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(self.latencies, 0.95) * 1000, 2),
+            'max_ms': round(max(self.latencies, default=0.0) * 1000, 2),
+            'total_s': round(sum(self.latencies), 3),
+            'sent_bytes': self.sent,
+            'received_bytes': self.received,
+            'rows': self.rows,
+        }
+
+
+@dataclass
+class PhaseStats:
+    name: str
+    started: float
+    seconds: float = 0.0
+    calls: int = 0
+    call_seconds: float = 0.0
+
+
+class MetricsRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints: Dict[Tuple[str, str], EndpointStats] = {}
+        self.phases: List[PhaseStats] = []
+        self._stack: List[PhaseStats] = []
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().astimezone()
+        self.script = Path(sys.argv[0]).name if sys.argv and sys.argv[0] else 'python'
+        self.out_dir = DEFAULT_OUT
+
+    def record(self, kind: str, endpoint: str, seconds: float, status: Optional[str] = None, error: bool = False,
+               sent: int = 0, received: int = 0, rows: int = 0):
+        with self.lock:
+            stats = self.endpoints.get((kind, endpoint))
+            if stats is None:
+                stats = self.endpoints[(kind, endpoint)] = EndpointStats(kind, endpoint)
+            stats.latencies.append(seconds)
+            stats.errors += int(error)
+            stats.sent += sent
+            stats.received += received
+            stats.rows += max(0, rows)
+            if status is not None:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            for active in self._stack:
+                active.calls += 1
+                active.call_seconds += seconds
+
+    def add_received(self, kind: str, endpoint: str, received: int):
+        """記録済みの呼び出しに、後から読んだ本文のバイト数を足す（ストリーミング応答用）"""
+        with self.lock:
+            stats = self.endpoints.get((kind, endpoint))
+            if stats is not None:
+                stats.received += received
+
+    @contextmanager
+    def phase(self, name: str):
+        stats = PhaseStats(name, time.perf_counter())
+        with self.lock:
+            self.phases.append(stats)
+            self._stack.append(stats)
+        try:
+            yield stats
+        finally:
+            with self.lock:
+                stats.seconds = time.perf_counter() - stats.started
+                self._stack.remove(stats)
+
+    def report(self) -> Dict:
+        with self.lock:
+            endpoints = sorted((s.summary() for s in self.endpoints.values()), key=lambda s: -s['total_s'])
+            phases = [{'name': p.name, 'seconds': round(p.seconds or time.perf_counter() - p.started, 3),
+                       'calls': p.calls, 'call_seconds': round(p.call_seconds, 3)} for p in self.phases]
+        return {
+            'script': self.script,
+            'argv': sys.argv[1:],
+            'started_at': self.started_at.isoformat(),
+            'wall_seconds': round(time.perf_counter() - self.started, 3),
+            'phases': phases,
+            'endpoints': endpoints,
+        }
+
+    def write(self) -> Optional[Path]:
+        report = self.report()
+        if not report['endpoints'] and not report['phases']:
+            return None
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{Path(self.script).stem}-{self.started_at.strftime('%Y%m%d-%H%M%S')}"
+        json_path = self.out_dir / f"{stem}.json"
+        json_path.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding='utf-8')
+        (self.out_dir / f"{stem}.md").write_text(render_markdown(report), encoding='utf-8')
+        return json_path
+
+
+def _bytes(n: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def render_markdown(report: Dict) -> str:
+    lines = [
+        f"# {report['script']} の計測結果",
+        '',
+        f"- 開始: {report['started_at']}",
+        f"- 実行時間: {report['wall_seconds']:.2f}秒",
+        f"- 引数: `{' '.join(report['argv'])}`" if report['argv'] else '- 引数: なし',
+        '',
+    ]
+    if report['phases']:
+        lines += ['## フェーズ', '', '| フェーズ | 秒 | 呼び出し | 呼び出し合計秒 |', '|---|---:|---:|---:|']
+        lines += [f"| {p['name']} | {p['seconds']:.2f} | {p['calls']} | {p['call_seconds']:.2f} |"
+                  for p in report['phases']]
+        lines.append('')
+    if report['endpoints']:
+        lines += ['## エンドポイント（合計時間の長い順）', '',
+                  '| 種別 | エンドポイント | 件数 | エラー | p50 ms | p95 ms | 最大 ms | 合計秒 | 送信 | 受信 | 行数 |',
+                  '|---|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|']
+        lines += [f"| {e['kind']} | `{e['endpoint']}` | {e['count']} | {e['errors']} | {e['p50_ms']:.1f} | "
+                  f"{e['p95_ms']:.1f} | {e['max_ms']:.1f} | {e['total_s']:.2f} | {_bytes(e['sent_bytes'])} | "
+                  f"{_bytes(e['received_bytes'])} | {e['rows']} |" for e in report['endpoints']]
+        lines.append('')
+    return '\n'.join(lines)
+
+
+METRICS = MetricsRecorder()
+_installed = False
+
+
+def phase(name: str):
+    """計測のフェーズを区切る（計測が無効でも使ってよい）"""
+    return METRICS.phase(name)
+
+
+# ------------------------------------------------------------
+# 横取り
+# ------------------------------------------------------------
+
+def _body_length(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return 0
+
+
+def _patch_requests():
+    try:
+        import requests
+    except ImportError:
+        return
+    original = requests.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        endpoint = http_endpoint(method, url)
+        try:
+            response = original(self, method, url, *args, **kwargs)
+        except Exception:
+            METRICS.record('http', endpoint, time.perf_counter() - started, 'exception', error=True)
+            raise
+        received = response.headers.get('Content-Length')
+        if received is None and not kwargs.get('stream'):
+            received = len(response.content)
+        METRICS.record('http', endpoint, time.perf_counter() - started, str(response.status_code),
+                       error=response.status_code >= 400, sent=_body_length(response.request.body),
+                       received=int(received or 0))
+        if received is None:
+            # stream=True で長さが分からない応答は、iter_content（.content / iter_lines も経由する）で数える
+            _count_iter_content(response, endpoint)
+        return response
+
+    requests.Session.request = request
+
+
+def _count_iter_content(response, endpoint: str):
+    original = response.iter_content
+
+    def iter_content(*args, **kwargs):
+        for chunk in original(*args, **kwargs):
+            METRICS.add_received('http', endpoint, len(chunk.encode() if isinstance(chunk, str) else chunk))
+            yield chunk
+
+    response.iter_content = iter_content
+
+
+def _patch_httpx():
+    try:
+        import httpx
+    except ImportError:
+        return
+    original = httpx.Client.send
+
+    def send(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        endpoint = http_endpoint(request.method, str(request.url))
+        try:
+            response = original(self, request, *args, **kwargs)
+        except Exception:
+            METRICS.record('http', endpoint, time.perf_counter() - started, 'exception', error=True)
+            raise
+        received = response.headers.get('Content-Length')
+        METRICS.record('http', endpoint, time.perf_counter() - started, str(response.status_code),
+                       error=response.status_code >= 400,
+                       sent=len(request.content) if request.content else 0,
+                       received=int(received) if received else len(response.content or b''))
+        return response
+
+    httpx.Client.send = send
+
+
+def _patch_urllib():
+    import urllib.error
+    import urllib.request
+    original = urllib.request.OpenerDirector.open
+
+    def open_(self, fullurl, data=None, *args, **kwargs):
+        started = time.perf_counter()
+        if isinstance(fullurl, urllib.request.Request):
+            method, url, body = fullurl.get_method(), fullurl.full_url, data if data is not None else fullurl.data
+        else:
+            method, url, body = 'POST' if data is not None else 'GET', fullurl, data
+        endpoint = http_endpoint(method, url)
+        try:
+            response = original(self, fullurl, data, *args, **kwargs)
+        except urllib.error.HTTPError as e:
+            METRICS.record('http', endpoint, time.perf_counter() - started, str(e.code), error=True,
+                           sent=_body_length(body))
+            raise
+        except Exception:
+            METRICS.record('http', endpoint, time.perf_counter() - started, 'exception', error=True)
+            raise
+        status = getattr(response, 'status', None) or response.getcode()
+        received = response.headers.get('Content-Length') if response.headers else None
+        METRICS.record('http', endpoint, time.perf_counter() - started, str(status) if status else 'ok',
+                       error=bool(status and status >= 400), sent=_body_length(body),
+                       received=int(received or 0))
+        if received is None:
+            # 長さが分からない応答は read()（urlretrieve もこれで読む）で数える
+            _count_read(response, endpoint)
+        return response
+
+    urllib.request.OpenerDirector.open = open_
+
+
+def _count_read(response, endpoint: str):
+    original = response.read
+
+    def read(*args, **kwargs):
+        chunk = original(*args, **kwargs)
+        METRICS.add_received('http', endpoint, len(chunk))
+        return chunk
+
+    response.read = read
+
+
+def _patch_psycopg():
+    try:
+        import psycopg
+    except ImportError:
+        return
+    cursor = psycopg.Cursor
+    original_execute, original_executemany, original_copy = cursor.execute, cursor.executemany, cursor.copy
+
+    def execute(self, query, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = original_execute(self, query, *args, **kwargs)
+        except Exception:
+            METRICS.record('sql', sql_endpoint(query, self), time.perf_counter() - started, 'error', error=True)
+            raise
+        METRICS.record('sql', sql_endpoint(query, self), time.perf_counter() - started, 'ok', rows=self.rowcount)
+        return result
+
+    def executemany(self, query, params_seq, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = original_executemany(self, query, params_seq, *args, **kwargs)
+        except Exception:
+            METRICS.record('sql', sql_endpoint(query, self), time.perf_counter() - started, 'error', error=True)
+            raise
+        METRICS.record('sql', sql_endpoint(query, self), time.perf_counter() - started, 'ok', rows=self.rowcount)
+        return result
+
+    @contextmanager
+    def copy(self, statement, *args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        try:
+            with original_copy(self, statement, *args, **kwargs) as copy_obj:
+                yield copy_obj
+        except Exception:
+            error = True
+            raise
+        finally:
+            METRICS.record('sql', sql_endpoint(statement, self), time.perf_counter() - started,
+                           'error' if error else 'ok', error=error, rows=self.rowcount)
+
+    cursor.execute, cursor.executemany, cursor.copy = execute, executemany, copy
+
+
+def install(out_dir: Optional[Path] = None):
+    """計測を有効にする（何度呼んでも1回だけ）。終了時に集計を書き出す"""
+    global _installed
+    if out_dir:
+        METRICS.out_dir = Path(out_dir)
+    if _installed:
+        return
+    _installed = True
+    _patch_requests()
+    _patch_httpx()
+    _patch_urllib()
+    _patch_psycopg()
+    atexit.register(_write_at_exit)
+
+
+def install_from_env():
+    """環境変数 OPS_METRICS が設定されていれば有効にする（1 / true 以外の値は出力先ディレクトリ）"""
+    value = os.environ.get('OPS_METRICS', '').strip()
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return
+    install(None if value.lower() in ('1', 'true', 'yes') else Path(value))
+
+
+def _write_at_exit():
+    path = METRICS.write()
+    if path:
+        print(f"\n📈 計測結果: {path}（{path.with_suffix('.md').name}）")
+
+
+def main():
+    args = sys.argv[1:]
+    out_dir = None
+    if len(args) >= 2 and args[0] == '--out':
+        out_dir, args = Path(args[1]), args[2:]
+    if not args or args[0] in ('-h', '--help'):
+        print("使い方: python3 scripts/ops_metrics.py [--out DIR] <スクリプト.py> [引数...]")
+        sys.exit(0 if args else 1)
+
+    script = Path(args[0])
+    if not script.exists() and (Path(__file__).parent / script).exists():
+        script = Path(__file__).parent / script
+    if not script.exists():
+        print(f"❌ {args[0]} が見つかりません")
+        sys.exit(1)
+
+    sys.argv = [str(script), *args[1:]]
+    sys.path.insert(0, str(script.resolve().parent))
+    METRICS.script = script.name
+    # スクリプト内の「from ops_metrics import phase」がこのモジュールを使うように
+    sys.modules.setdefault('ops_metrics', sys.modules[__name__])
+    install(out_dir)
+    with phase(script.name):
+        runpy.run_path(str(script), run_name='__main__')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+写真の重複・類似画像検出と URL 付け替えプランの作成
+
+シードデータは同じUnsplash画像を多くの写真で使い回しており、ユーザー投稿にも
+ほぼ同じ写真（再エンコード・リサイズ違い）が含まれます。このスクリプトは
+ローカルに置いた画像ファイルの知覚ハッシュ（dHash 64bit）を計算し、
+BKツリーでハミング距離 --threshold 以内の画像をまとめて、
+各グループで1枚（最大解像度）を残す付け替えプランを出力します。
+
+- 知覚ハッシュが完全一致する写真は1ノードにまとめてからBKツリーに入れる
+- BKツリーの近傍検索で全ペア比較（O(n²)）を避ける
+- 近傍をたどってつながった写真のうち、残す1枚から --threshold 以内のものだけを付け替える
+  （A~B~C と連鎖しただけの C は別グループにするか、related として一覧に載せるだけにする）
+- ハッシュは (パス, サイズ, 更新時刻) をキーに .cache/phash.json に保存し、再実行時は計算しない
+
+使い方:
+  python3 scripts/photo_dedup.py --index photo_index.csv --plan dedup_plan.json
+  python3 scripts/photo_dedup.py --from-db --plan dedup_plan.json --sql dedup_remap.sql
+  python3 scripts/photo_dedup.py --input photos/ --threshold 4
+
+--index のCSV列: table,id,url,path（path はローカルの画像ファイル）
+--from-db は route_pin_photos / photos の URL を取得し、.cache/photos/ にダウンロードして使います。
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from image_derivatives import IMAGE_EXTENSIONS, Image, ImageOps, file_sha256
+from ops_env import PROJECT_ROOT
+
+HASH_CACHE_PATH = PROJECT_ROOT / '.cache' / 'phash.json'
+DOWNLOAD_DIR = PROJECT_ROOT / '.cache' / 'photos'
+
+# テーブル → 写真URL列
+PHOTO_TABLES = {
+    'route_pin_photos': 'photo_url',
+    'photos': 'url',
+}
+
+# PostgREST / PostgreSQL の「テーブルがない」エラーコード（カラム違いなどは止める）
+MISSING_TABLE_CODES = ('42P01', 'PGRST205')
+
+PAGE_SIZE = 1000
+
+
+@dataclass
+class PhotoRecord:
+    table: str
+    id: str
+    url: str
+    path: str
+    sha256: str = ''
+    phash: int = 0
+    width: int = 0
+    height: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class DedupCluster:
+    survivor: PhotoRecord
+    duplicates: List[Tuple[PhotoRecord, int]] = field(default_factory=list)
+    # 近傍の連鎖でつながっただけで、survivor からは threshold より遠い写真（付け替えない）
+    related: List[Tuple[PhotoRecord, int]] = field(default_factory=list)
+
+
+def dhash(path: str, size: int = 8) -> Tuple[int, int, int]:
+    """差分ハッシュ（隣り合う画素の明暗の並び）と元画像のサイズを返す"""
+    with Image.open(path) as original:
+        width, height = original.size
+        image = ImageOps.exif_transpose(original).convert('L').resize((size + 1, size), Image.LANCZOS)
+        pixels = list(image.getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value, width, height
+
+
+def hash_file(path: str) -> Optional[Dict]:
+    """ワーカープロセスで実行。読めない画像は None（1枚の失敗で全体を止めない）"""
+    try:
+        sha256 = file_sha256(Path(path))
+        phash, width, height = dhash(path)
+    except Exception:
+        return None
+    return {'sha256': sha256, 'phash': phash, 'width': width, 'height': height}
+
+
+class BKTree:
+    """ハミング距離のBKツリー（三角不等式で探索範囲を絞る）"""
+
+    def __init__(self):
+        self.root: Optional[list] = None  # [value, {distance: child}]
+
+    def add(self, value: int):
+        if self.root is None:
+            self.root = [value, {}]
+            return
+        node = self.root
+        while True:
+            distance = bin(node[0] ^ value).count('1')
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> Iterator[Tuple[int, int]]:
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = bin(node_value ^ value).count('1')
+            if distance <= radius:
+                yield node_value, distance
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def load_index(path: Path) -> List[PhotoRecord]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [PhotoRecord(row['table'], row['id'], row.get('url', ''), row['path']) for row in csv.DictReader(f)]
+
+
+def scan_directory(directory: Path) -> List[PhotoRecord]:
+    return [PhotoRecord('file', p.relative_to(directory).as_posix(), '', str(p))
+            for p in sorted(directory.rglob('*')) if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS]
+
+
+def fetch_db_records(download_workers: int) -> List[PhotoRecord]:
+    """DBの写真URLを取得し、URLごとに1回だけダウンロードする"""
+    from ops_env import create_service_client
+
+    client = create_service_client()
+    records: List[PhotoRecord] = []
+    for table, column in PHOTO_TABLES.items():
+        offset = 0
+        while True:
+            try:
+                response = (client.table(table).select(f'id, {column}').order('id')
+                            .range(offset, offset + PAGE_SIZE - 1).execute())
+            except Exception as e:
+                if getattr(e, 'code', None) not in MISSING_TABLE_CODES:
+                    raise
+                print(f"⏭️  {table}: テーブルがないためスキップ ({e})")
+                break
+            page = response.data or []
+            for row in page:
+                url = row.get(column)
+                if url:
+                    name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+                    suffix = Path(url.split('?')[0]).suffix.lower()
+                    path = DOWNLOAD_DIR / (name + (suffix if suffix in IMAGE_EXTENSIONS else '.jpg'))
+                    records.append(PhotoRecord(table, row['id'], url, str(path)))
+            offset += len(page)
+            if len(page) < PAGE_SIZE:
+                break
+
+    DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    pending = {r.path: r.url for r in records if not Path(r.path).exists()}
+
+    def download(item):
+        path, url = item
+        tmp = path + '.tmp'
+        urllib.request.urlretrieve(url, tmp)
+        os.replace(tmp, path)
+
+    if pending:
+        print(f"⬇️  {len(pending)}件の画像をダウンロードします")
+        with ThreadPoolExecutor(max_workers=download_workers) as pool:
+            for (path, url), error in zip(pending.items(), pool.map(_safe(download), pending.items())):
+                if error:
+                    print(f"  ⚠️  {url}: {error}")
+    return [r for r in records if Path(r.path).exists()]
+
+
+def _safe(fn):
+    def wrapper(item):
+        try:
+            fn(item)
+            return None
+        except Exception as e:
+            return e
+    return wrapper
+
+
+def compute_hashes(records: List[PhotoRecord], workers: int) -> Tuple[List[PhotoRecord], int]:
+    """未計算のファイルだけプロセスプールでハッシュする（ハッシュできた写真と計算した件数を返す）"""
+    try:
+        cache = json.loads(HASH_CACHE_PATH.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+
+    # ファイルの同一性は (パス, サイズ, 更新時刻) で見て、変わっていなければSHA-256も再計算しない
+    def stat_key(path: str) -> str:
+        st = os.stat(path)
+        return f"{path}:{st.st_size}:{int(st.st_mtime)}"
+
+    by_path = {r.path: r for r in records}
+    todo = [p for p in by_path if stat_key(p) not in cache]
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, result in zip(todo, pool.map(hash_file, todo, chunksize=32)):
+                if result is None:
+                    print(f"  ⚠️  画像を読み込めません: {path}")
+                    continue
+                cache[stat_key(path)] = result
+
+    hashed = []
+    for record in records:
+        entry = cache.get(stat_key(record.path))
+        if entry is None:
+            continue
+        record.sha256, record.phash = entry['sha256'], entry['phash']
+        record.width, record.height = entry['width'], entry['height']
+        record.bytes = os.path.getsize(record.path)
+        hashed.append(record)
+
+    HASH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    HASH_CACHE_PATH.write_text(json.dumps(cache), encoding='utf-8')
+    return hashed, len(todo)
+
+
+def cluster(records: List[PhotoRecord], threshold: int) -> List[DedupCluster]:
+    # 知覚ハッシュが同じ写真をまとめ、異なるハッシュ値だけをツリーに入れる
+    by_phash: Dict[int, List[PhotoRecord]] = {}
+    for record in records:
+        by_phash.setdefault(record.phash, []).append(record)
+
+    tree = BKTree()
+    for value in by_phash:
+        tree.add(value)
+
+    groups = UnionFind()
+    for value in by_phash:
+        groups.find(value)
+        for neighbor, _ in tree.search(value, threshold):
+            groups.union(value, neighbor)
+
+    members: Dict[int, List[PhotoRecord]] = {}
+    for value, group in by_phash.items():
+        members.setdefault(groups.find(value), []).extend(group)
+
+    clusters = []
+    for group in members.values():
+        if len(group) >= 2:
+            clusters.extend(split_by_survivor(group, threshold))
+    return sorted(clusters, key=lambda c: -len(c.duplicates))
+
+
+def split_by_survivor(group: List[PhotoRecord], threshold: int) -> List[DedupCluster]:
+    """つながった写真を、残す1枚から threshold 以内のまとまりに分ける
+
+    近傍の連鎖（単連結）だけでまとめると、A~B~C の C が A から遠くても A に付け替えられてしまう。
+    最良の1枚を残し、そこから threshold 以内を重複とし、残りで同じことを繰り返す。
+    どのまとまりにも入らなかった写真は最初のまとまりの related に載せる。
+    """
+    def distance(a: PhotoRecord, b: PhotoRecord) -> int:
+        return bin(a.phash ^ b.phash).count('1')
+
+    clusters: List[DedupCluster] = []
+    leftovers: List[PhotoRecord] = []
+    remaining = sorted(group, key=lambda r: (r.width * r.height, -r.bytes, r.table, r.id), reverse=True)
+    while remaining:
+        survivor, *rest = remaining
+        duplicates = [(r, distance(r, survivor)) for r in rest if distance(r, survivor) <= threshold]
+        remaining = [r for r in rest if distance(r, survivor) > threshold]
+        if duplicates:
+            clusters.append(DedupCluster(survivor, sorted(duplicates, key=lambda d: (d[1], d[0].id))))
+        else:
+            leftovers.append(survivor)
+    if clusters and leftovers:
+        main = clusters[0]
+        main.related = sorted(((r, distance(r, main.survivor)) for r in leftovers), key=lambda d: (d[1], d[0].id))
+    return clusters
+
+
+def write_plan(path: Path, clusters: List[DedupCluster], threshold: int):
+    plan = {
+        'threshold': threshold,
+        'clusters': [
+            {
+                'survivor': asdict(c.survivor) | {'phash': f"{c.survivor.phash:016x}"},
+                'duplicates': [asdict(r) | {'phash': f"{r.phash:016x}", 'distance': d} for r, d in c.duplicates],
+                'related': [asdict(r) | {'phash': f"{r.phash:016x}", 'distance': d} for r, d in c.related],
+            }
+            for c in clusters
+        ],
+    }
+    path.write_text(json.dumps(plan, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def write_sql(path: Path, clusters: List[DedupCluster]):
+    """重複側の写真URLを残す1枚のURLに付け替えるSQL（テーブル・URLごとに1文。related は含めない）"""
+    lines = ["-- photo_dedup.py が生成した写真URLの付け替え", "BEGIN;"]
+    for c in clusters:
+        if not c.survivor.url:
+            continue
+        by_table: Dict[str, List[str]] = {}
+        for record, _ in c.duplicates:
+            if record.table in PHOTO_TABLES and record.url != c.survivor.url:
+                by_table.setdefault(record.table, []).append(record.id)
+        url = c.survivor.url.replace("'", "''")
+        for table, ids in by_table.items():
+            id_list = ', '.join(f"'{i}'" for i in ids)
+            lines.append(f"UPDATE {table} SET {PHOTO_TABLES[table]} = '{url}' WHERE id IN ({id_list});")
+    lines.append("COMMIT;")
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='写真の重複・類似画像検出')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--index', type=Path, help='table,id,url,path のCSV')
+    source.add_argument('--input', type=Path, help='画像ディレクトリ（DBと紐付けずに検出だけ行う）')
+    source.add_argument('--from-db', action='store_true', help='DBの写真URLを取得してダウンロード')
+    parser.add_argument('--threshold', type=int, default=6, help='同一とみなすハミング距離（0-64、既定: 6）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='ハッシュ計算の並列プロセス数')
+    parser.add_argument('--download-workers', type=int, default=8, help='ダウンロードの並列数')
+    parser.add_argument('--plan', type=Path, help='付け替えプラン（JSON）の出力先')
+    parser.add_argument('--sql', type=Path, help='付け替えSQLの出力先')
+    args = parser.parse_args()
+
+    try:
+        if args.index:
+            records = load_index(args.index)
+        elif args.input:
+            records = scan_directory(args.input)
+        else:
+            records = fetch_db_records(args.download_workers)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"❌ エラー: {e}")
+        sys.exit(1)
+
+    missing = [r for r in records if not Path(r.path).exists()]
+    if missing:
+        print(f"⚠️  ファイルが見つからない写真: {len(missing)}件（スキップ）")
+        records = [r for r in records if Path(r.path).exists()]
+    if not records:
+        print("⚠️  対象の写真がありません")
+        return
+
+    started = time.perf_counter()
+    records, hashed = compute_hashes(records, args.workers)
+    clusters = cluster(records, args.threshold)
+    elapsed = time.perf_counter() - started
+
+    duplicate_count = sum(len(c.duplicates) for c in clusters)
+    related_count = sum(len(c.related) for c in clusters)
+    # 同じファイルを指す重複は保存容量を増やしていないので、別ファイルの分だけ数える
+    reclaimable = 0
+    for c in clusters:
+        files = {r.path: r.bytes for r, _ in c.duplicates if r.path != c.survivor.path}
+        reclaimable += sum(files.values())
+
+    print("=" * 60)
+    print(f"🔍 写真 {len(records)}件（新規ハッシュ {hashed}件, {elapsed:.1f}秒）")
+    print(f"   重複グループ {len(clusters)}件 / 付け替え対象 {duplicate_count}件 / "
+          f"削減可能 {reclaimable / 1e6:.1f}MB")
+    if related_count:
+        print(f"   連鎖でつながっただけの類似写真 {related_count}件（付け替えない・プランの related を確認）")
+    print("=" * 60)
+    for c in clusters[:10]:
+        print(f"  🖼️  {c.survivor.table}/{c.survivor.id} ({c.survivor.width}x{c.survivor.height}) "
+              f"← {len(c.duplicates)}件")
+
+    if args.plan:
+        write_plan(args.plan, clusters, args.threshold)
+        print(f"\n✅ 付け替えプラン: {args.plan}")
+    if args.sql:
+        write_sql(args.sql, clusters)
+        print(f"✅ 付け替えSQL: {args.sql}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+ピンのクラスタータイル生成（ズーム5〜18）
+
+MAPタブ（lib/screens/main/tabs/map_tab.dart）は get_recent_pins / get_route_pins の
+生のピンを受け取り、パンのたびに端末側でクラスタリングしています。
+このスクリプトは全 route_pins を supercluster と同じ方式（高ズームから順に、
+半径 --radius px 以内の点を貪欲にまとめる）で階層的にクラスタリングし、
+ズーム・タイルごとの小さなJSONとして書き出します。地図は表示中のタイルだけを取得すれば
+O(表示クラスター数) で描画できます。
+
+- ピンは local_mirror.py のミラーから読み、実行時に増分同期する
+- クラスタリング結果が前回と同じタイルは書き換えない（manifest.json のハッシュで判定）
+- ピンが無くなったタイルは削除する
+
+出力（--out 既定: build/pin_tiles）:
+  {z}/{x}/{y}.json  … {"z": 12, "x": 3637, "y": 1617,
+                       "c": [[lon, lat, count, pin_id_or_null, expansion_zoom, {pin_type: count}], ...]}
+  manifest.json     … タイルごとのハッシュ・件数と生成時刻
+
+使い方:
+  python3 scripts/pin_cluster_tiles.py
+  python3 scripts/pin_cluster_tiles.py --offline --radius 40 --min-zoom 5 --max-zoom 18
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from local_mirror import open_mirror, sync_mirror
+from ops_env import PROJECT_ROOT
+
+DEFAULT_OUT = PROJECT_ROOT / 'build' / 'pin_tiles'
+TILE_SIZE = 256
+
+
+@dataclass
+class ClusterNode:
+    x: float  # Webメルカトル [0, 1)
+    y: float
+    count: int
+    pin_id: Optional[str] = None
+    types: Counter = field(default_factory=Counter)
+    children: List['ClusterNode'] = field(default_factory=list)
+    expansion_zoom: Optional[int] = None
+
+
+def project(lat: float, lon: float) -> Tuple[float, float]:
+    sin_lat = math.sin(math.radians(max(min(lat, 85.05112878), -85.05112878)))
+    x = lon / 360 + 0.5
+    y = 0.5 - 0.25 * math.log((1 + sin_lat) / (1 - sin_lat)) / math.pi
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    lon = (x - 0.5) * 360
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, lon
+
+
+def load_pins(db) -> List[ClusterNode]:
+    columns = {row[1] for row in db.execute('PRAGMA table_info("route_pins")')}
+    if 'location_lat' not in columns:
+        return []
+    where = "location_lat IS NOT NULL"
+    if 'is_active' in columns:
+        where += " AND COALESCE(is_active, 1) = 1"
+    pin_type = "pin_type" if 'pin_type' in columns else "NULL"
+    rows = db.execute(
+        f"SELECT id, location_lat, location_lon, {pin_type} FROM route_pins WHERE {where} ORDER BY id"
+    ).fetchall()
+    pins = []
+    for pin_id, lat, lon, kind in rows:
+        x, y = project(lat, lon)
+        pins.append(ClusterNode(x, y, 1, pin_id, Counter({kind or 'other': 1})))
+    return pins
+
+
+def cluster_level(nodes: List[ClusterNode], zoom: int, radius_px: float) -> List[ClusterNode]:
+    """1つ上のズームのノードを、このズームで半径 radius_px 以内ごとにまとめる"""
+    r = radius_px / (TILE_SIZE * 2 ** zoom)
+    grid: Dict[Tuple[int, int], List[int]] = {}
+    for idx, node in enumerate(nodes):
+        grid.setdefault((int(node.x / r), int(node.y / r)), []).append(idx)
+
+    visited = [False] * len(nodes)
+    clusters = []
+    r2 = r * r
+    for idx, node in enumerate(nodes):
+        if visited[idx]:
+            continue
+        visited[idx] = True
+        members = [node]
+        cx, cy = int(node.x / r), int(node.y / r)
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for other_idx in grid.get((gx, gy), ()):
+                    if visited[other_idx]:
+                        continue
+                    other = nodes[other_idx]
+                    if (other.x - node.x) ** 2 + (other.y - node.y) ** 2 <= r2:
+                        visited[other_idx] = True
+                        members.append(other)
+
+        if len(members) == 1:
+            # まとまらなかった点はそのまま引き継ぐ（子としてつないで展開ズームを辿れるようにする）
+            clusters.append(ClusterNode(node.x, node.y, node.count, node.pin_id, node.types, [node]))
+            continue
+        count = sum(m.count for m in members)
+        types = Counter()
+        for m in members:
+            types.update(m.types)
+        clusters.append(ClusterNode(
+            sum(m.x * m.count for m in members) / count,
+            sum(m.y * m.count for m in members) / count,
+            count, None, types, members,
+        ))
+    return clusters
+
+
+def expansion_zoom(node: ClusterNode, zoom: int, max_zoom: int) -> int:
+    """このクラスターをタップしたときに、子が2つ以上に分かれる最初のズーム"""
+    while node.count > 1 and len(node.children) == 1 and zoom < max_zoom:
+        node = node.children[0]
+        zoom += 1
+    return min(zoom + 1, max_zoom + 1) if node.count > 1 else zoom
+
+
+def build_levels(pins: List[ClusterNode], min_zoom: int, max_zoom: int,
+                 radius_px: float) -> Dict[int, List[ClusterNode]]:
+    levels: Dict[int, List[ClusterNode]] = {}
+    nodes = pins
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        nodes = cluster_level(nodes, zoom, radius_px)
+        levels[zoom] = nodes
+    for zoom, nodes in levels.items():
+        for node in nodes:
+            node.expansion_zoom = expansion_zoom(node, zoom, max_zoom)
+    return levels
+
+
+def render_tiles(levels: Dict[int, List[ClusterNode]]) -> Dict[str, str]:
+    """タイルパス → JSON文字列（キー順・小数桁を固定してハッシュを安定させる）"""
+    tiles: Dict[Tuple[int, int, int], List] = {}
+    for zoom, nodes in levels.items():
+        scale = 2 ** zoom
+        for node in nodes:
+            key = (zoom, int(node.x * scale), int(node.y * scale))
+            lat, lon = unproject(node.x, node.y)
+            tiles.setdefault(key, []).append([
+                round(lon, 6), round(lat, 6), node.count,
+                node.pin_id if node.count == 1 else None,
+                node.expansion_zoom, dict(sorted(node.types.items())),
+            ])
+
+    rendered = {}
+    for (z, x, y), features in tiles.items():
+        features.sort(key=lambda f: (-f[2], f[0], f[1]))
+        rendered[f"{z}/{x}/{y}.json"] = json.dumps(
+            {'z': z, 'x': x, 'y': y, 'c': features}, ensure_ascii=False, separators=(',', ':'))
+    return rendered
+
+
+def write_tiles(out_dir: Path, rendered: Dict[str, str]) -> Tuple[int, int, int]:
+    """変わったタイルだけ書き、消えたタイルを削除する（書込・変更なし・削除の件数を返す）"""
+    manifest_path = out_dir / 'manifest.json'
+    try:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8')).get('tiles', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous = {}
+
+    written = unchanged = 0
+    tiles = {}
+    for rel_path, body in rendered.items():
+        digest = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        tiles[rel_path] = digest
+        dest = out_dir / rel_path
+        if previous.get(rel_path) == digest and dest.exists():
+            unchanged += 1
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + '.tmp')
+        tmp.write_text(body, encoding='utf-8')
+        os.replace(tmp, dest)
+        written += 1
+
+    removed = 0
+    for rel_path in set(previous) - set(tiles):
+        try:
+            (out_dir / rel_path).unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    manifest_path.write_text(json.dumps({
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'tiles': dict(sorted(tiles.items())),
+    }, indent=0), encoding='utf-8')
+    return written, unchanged, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ピンのクラスタータイル生成')
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help='出力ディレクトリ')
+    parser.add_argument('--min-zoom', type=int, default=5)
+    parser.add_argument('--max-zoom', type=int, default=18)
+    parser.add_argument('--radius', type=float, default=60, help='クラスター半径（px、256pxタイル基準）')
+    parser.add_argument('--offline', action='store_true', help='ミラーを同期せずに手元のデータで生成')
+    args = parser.parse_args()
+
+    if args.min_zoom > args.max_zoom:
+        parser.error('--min-zoom は --max-zoom 以下にしてください')
+
+    started = time.perf_counter()
+    if not args.offline:
+        sync_mirror(tables=['route_pins'], prune=True)
+    pins = load_pins(open_mirror())
+    if not pins:
+        print("⚠️  位置情報のあるピンがありません")
+        sys.exit(1)
+
+    levels = build_levels(pins, args.min_zoom, args.max_zoom, args.radius)
+    rendered = render_tiles(levels)
+    written, unchanged, removed = write_tiles(args.out, rendered)
+
+    print("=" * 60)
+    print(f"📍 ピン {len(pins)}件 → ズーム{args.min_zoom}〜{args.max_zoom} のタイル {len(rendered)}枚 "
+          f"({time.perf_counter() - started:.1f}秒)")
+    print(f"   書込 {written}枚 / 変更なし {unchanged}枚 / 削除 {removed}枚 → {args.out}")
+    for zoom in (args.min_zoom, (args.min_zoom + args.max_zoom) // 2, args.max_zoom):
+        print(f"   z{zoom}: {len(levels[zoom])}クラスター")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
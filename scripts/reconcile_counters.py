@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+非正規化カウンターの整合性チェック・修正スクリプト
+
+official_routes.total_pins / total_walks と route_pins.likes_count / comments_count は
+トリガー（increment_route_pins / decrement_route_pins / increment_pin_likes / decrement_pin_likes 等）
+で更新されていますが、add_hakone_pins.py のようにスクリプトから直接投入したり
+トリガー導入前のデータがあるとずれてしまいます。
+
+このスクリプトは親テーブルを主キー順のチャンクに分け、チャンクごとに子テーブルを
+1回の GROUP BY で集計して、値が異なる行だけを一括UPDATEします。
+チャンクごとに短いトランザクションで処理するため、大きなテーブルでも長時間ロックしません。
+
+使い方:
+  python3 scripts/reconcile_counters.py --dry-run          # 差分だけ表示
+  python3 scripts/reconcile_counters.py                    # 修正を適用
+  python3 scripts/reconcile_counters.py --only route_pins.likes_count --chunk-size 5000
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ops_env import connect, resolve_dsn
+
+
+@dataclass
+class CounterSpec:
+    """親テーブルのカウンター列と、その正しい値を数える子テーブル
+
+    child_tables が複数あるのは、同じカウンターを別々のトリガーが更新しているもの。
+    存在するテーブルをすべて合わせ、distinct_column があれば (child_fk, distinct_column) の重複を1件と数える。
+    child_where はテーブルごとの数える行の条件（例: 完走した散歩だけ）。
+    """
+    table: str
+    column: str
+    child_tables: Tuple[str, ...]
+    child_fk: str
+    label_column: str
+    distinct_column: Optional[str] = None
+    child_where: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.table}.{self.column}"
+
+
+COUNTERS = [
+    CounterSpec('official_routes', 'total_pins', ('route_pins',), 'route_id', 'name'),
+    # route_walks（ナビで歩いた記録）と walk_route_matches（match_walks_to_routes.py で対応付けた自由散歩のうち完走したもの）
+    CounterSpec('official_routes', 'total_walks', ('route_walks', 'walk_route_matches'), 'route_id', 'name',
+                child_where={'walk_route_matches': 'is_completed'}),
+    # pin_likes（004 のトリガー）と route_pin_likes（phase1_pin_likes_system.sql の like_pin / unlike_pin）
+    CounterSpec('route_pins', 'likes_count', ('pin_likes', 'route_pin_likes'), 'pin_id', 'title',
+                distinct_column='user_id'),
+    CounterSpec('route_pins', 'comments_count', ('route_pin_comments',), 'pin_id', 'title'),
+]
+
+
+def counter_spec(key: str) -> CounterSpec:
+    """'official_routes.total_walks' のようなキーから CounterSpec を返す"""
+    return next(c for c in COUNTERS if c.key == key)
+
+
+@dataclass
+class CounterDiff:
+    id: str
+    label: str
+    stored: Optional[int]
+    actual: int
+
+
+@dataclass
+class ReconcileStats:
+    spec: CounterSpec
+    child_tables: List[str]
+    scanned: int = 0
+    drifted: int = 0
+    updated: int = 0
+    chunks: int = 0
+    duration_ms: float = 0.0
+
+
+class CounterReconciler:
+    def __init__(self, conn, chunk_size: int, dry_run: bool, lock_timeout_ms: int, verbose: bool):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.lock_timeout_ms = lock_timeout_ms
+        self.verbose = verbose
+        self._children: Dict[str, List[str]] = {}
+
+    def has_counter(self, spec: CounterSpec) -> bool:
+        row = self.conn.execute(
+            """
+            SELECT EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_schema = 'public' AND table_name = %s AND column_name = %s)
+            """,
+            (spec.table, spec.column),
+        ).fetchone()
+        return bool(row[0])
+
+    def resolve_children(self, spec: CounterSpec) -> List[str]:
+        """spec.child_tables のうち、数えるのに必要なカラムが揃って存在するもの"""
+        needed = [spec.child_fk] + ([spec.distinct_column] if spec.distinct_column else [])
+        rows = self.conn.execute(
+            """
+            SELECT table_name
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = ANY(%s) AND column_name = ANY(%s)
+            GROUP BY table_name
+            HAVING COUNT(DISTINCT column_name) = %s
+            """,
+            (list(spec.child_tables), needed, len(needed)),
+        ).fetchall()
+        found = {row[0] for row in rows}
+        return [t for t in spec.child_tables if t in found]
+
+    def reconcile(self, spec: CounterSpec, child_tables: List[str]) -> ReconcileStats:
+        stats = ReconcileStats(spec, child_tables)
+        started = time.perf_counter()
+        last_id = None
+
+        while True:
+            with self.conn.transaction():
+                self.conn.execute(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}")
+                chunk_ids, last_id = self._lock_chunk(spec, last_id)
+                if not chunk_ids:
+                    break
+                diffs = self._diff_chunk(spec, child_tables, chunk_ids)
+                if diffs and not self.dry_run:
+                    stats.updated += self._apply(spec, diffs)
+
+            stats.chunks += 1
+            stats.scanned += len(chunk_ids)
+            stats.drifted += len(diffs)
+            for diff in (diffs if self.dry_run or self.verbose else []):
+                delta = diff.actual - (diff.stored or 0)
+                print(f"   {'🔍' if self.dry_run else '🔧'} {diff.label} ({diff.id}): "
+                      f"{diff.stored} → {diff.actual} ({delta:+d})")
+            if len(chunk_ids) < self.chunk_size:
+                break
+
+        stats.duration_ms = (time.perf_counter() - started) * 1000
+        return stats
+
+    def recount(self, spec: CounterSpec, ids: List) -> int:
+        """指定した親行だけを数え直す（他のスクリプトが子行を書き換えた直後に呼ぶ）。更新した行数を返す"""
+        if not ids:
+            return 0
+        if spec.key not in self._children:
+            self._children[spec.key] = self.resolve_children(spec)
+        child_tables = self._children[spec.key]
+        if not child_tables:
+            return 0
+        # 文字列のIDのままだと text[] になり uuid と比較できない
+        diffs = self._diff_chunk(spec, child_tables, [uuid.UUID(str(i)) for i in ids])
+        return self._apply(spec, diffs) if diffs and not self.dry_run else 0
+
+    def _lock_chunk(self, spec: CounterSpec, last_id) -> Tuple[List, Optional[str]]:
+        """主キー順に次のチャンクを取得し、行ロックを取る
+
+        ロックを先に取ってから次のステートメント（新しいスナップショット）で数えるので、
+        並行して追加された子行のトリガーはこのトランザクションの後に +1/-1 を適用する。
+        """
+        where = "WHERE id > %s" if last_id is not None else ""
+        params = (last_id, self.chunk_size) if last_id is not None else (self.chunk_size,)
+        lock = "" if self.dry_run else "FOR UPDATE"
+        rows = self.conn.execute(
+            f"SELECT id FROM {spec.table} {where} ORDER BY id LIMIT %s {lock}",
+            params,
+        ).fetchall()
+        ids = [row[0] for row in rows]
+        return ids, (ids[-1] if ids else last_id)
+
+    def _diff_chunk(self, spec: CounterSpec, child_tables: List[str], chunk_ids: List) -> List[CounterDiff]:
+        # distinct_column があれば UNION で (親, ユーザー) の重複を除き、なければ UNION ALL で全行を数える
+        columns = spec.child_fk + (f", {spec.distinct_column}" if spec.distinct_column else "")
+        union = " UNION " if spec.distinct_column else " UNION ALL "
+        children = union.join(
+            f"SELECT {columns} FROM {table} WHERE {spec.child_fk} = ANY(%s)"
+            + (f" AND {spec.child_where[table]}" if table in spec.child_where else "")
+            for table in child_tables
+        )
+        rows = self.conn.execute(
+            f"""
+            WITH children AS ({children}),
+            truth AS (
+              SELECT {spec.child_fk} AS parent_id, COUNT(*)::INT AS actual
+              FROM children
+              GROUP BY {spec.child_fk}
+            )
+            SELECT t.id, t.{spec.label_column}, t.{spec.column}, COALESCE(truth.actual, 0)
+            FROM {spec.table} t
+            LEFT JOIN truth ON truth.parent_id = t.id
+            WHERE t.id = ANY(%s)
+              AND t.{spec.column} IS DISTINCT FROM COALESCE(truth.actual, 0)
+            ORDER BY t.id
+            """,
+            (*([chunk_ids] * len(child_tables)), chunk_ids),
+        ).fetchall()
+        return [CounterDiff(str(r[0]), r[1] or '（名称なし）', r[2], r[3]) for r in rows]
+
+    def _apply(self, spec: CounterSpec, diffs: List[CounterDiff]) -> int:
+        cursor = self.conn.execute(
+            f"""
+            UPDATE {spec.table} AS t
+            SET {spec.column} = d.actual
+            FROM UNNEST(%s::uuid[], %s::int[]) AS d(id, actual)
+            WHERE t.id = d.id
+              AND t.{spec.column} IS DISTINCT FROM d.actual
+            """,
+            ([d.id for d in diffs], [d.actual for d in diffs]),
+        )
+        return cursor.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='非正規化カウンターの整合性チェック・修正')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--dry-run', action='store_true', help='差分を表示するだけで更新しない')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='1トランザクションで処理する親行数')
+    parser.add_argument('--lock-timeout-ms', type=int, default=2000, help='行ロック待ちの上限（ミリ秒）')
+    parser.add_argument('--only', action='append', choices=[c.key for c in COUNTERS],
+                        help='対象カウンターを限定（複数指定可）')
+    parser.add_argument('--verbose', action='store_true', help='適用時も修正した行を表示')
+    args = parser.parse_args()
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    conn = connect(dsn)
+    reconciler = CounterReconciler(conn, args.chunk_size, args.dry_run, args.lock_timeout_ms, args.verbose)
+    specs = [c for c in COUNTERS if not args.only or c.key in args.only]
+
+    print("=" * 80)
+    print(f"🔢 カウンター整合性チェック{'（ドライラン）' if args.dry_run else ''}")
+    print("=" * 80)
+
+    results = []
+    try:
+        for spec in specs:
+            if not reconciler.has_counter(spec):
+                print(f"\n⏭️  {spec.key}: カラムが存在しないためスキップ")
+                continue
+            child_tables = reconciler.resolve_children(spec)
+            if not child_tables:
+                # 数える元がないまま進めると全行を0に書き換えてしまう
+                print(f"\n❌ {spec.key}: {' / '.join(spec.child_tables)} がいずれも存在しないため更新しません")
+                continue
+            counted = f"DISTINCT ({spec.child_fk}, {spec.distinct_column})" if spec.distinct_column else spec.child_fk
+            sources = [f"{t} WHERE {spec.child_where[t]}" if t in spec.child_where else t for t in child_tables]
+            print(f"\n📊 {spec.key} ← COUNT({counted}) FROM {' + '.join(sources)}")
+            results.append(reconciler.reconcile(spec, child_tables))
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 80)
+    print("📋 結果")
+    print("=" * 80)
+    for stats in results:
+        action = f"修正 {stats.updated}件" if not args.dry_run else "未適用"
+        print(f"  {stats.spec.key}: 走査 {stats.scanned}行 / ずれ {stats.drifted}件 / {action} "
+              f"({stats.chunks}チャンク, {stats.duration_ms / 1000:.2f}秒)")
+    if args.dry_run and any(s.drifted for s in results):
+        print("\n💡 --dry-run を外して実行すると修正を適用します")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+人気急上昇ルートのスコア増分更新ジョブ
+
+014_route_trending_scores.sql の refresh_route_trending_scores() を呼び出し、
+前回の水位以降に追加された route_pins / route_walks だけを日次カウンターに加算して
+route_trending_scores のランキングを更新します。get_trending_routes はこの結果を読むだけになります。
+集計済みのピン・散歩の削除や付け替えは、019_route_activity_deletes.sql のトリガーが
+日次カウンターから差し引きます。
+
+使い方:
+  python3 scripts/refresh_trending_routes.py                    # 1回だけ更新
+  python3 scripts/refresh_trending_routes.py --interval 300     # 5分ごとに更新し続ける
+  python3 scripts/refresh_trending_routes.py --half-life 3 --walk-weight 0.5
+  python3 scripts/refresh_trending_routes.py --rebuild          # 日次カウンターを作り直す
+
+pg_cron で動かす場合（SQL Editor）:
+  SELECT cron.schedule('refresh-trending-routes', '*/5 * * * *',
+                       'SELECT refresh_route_trending_scores()');
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from ops_env import connect, resolve_dsn
+
+
+def refresh(conn, args) -> dict:
+    row = conn.execute(
+        "SELECT refresh_route_trending_scores(%s, %s, %s, make_interval(secs => %s), %s)",
+        (args.window_days, args.half_life, args.walk_weight, args.lag_seconds, args.rebuild),
+    ).fetchone()
+    result = row[0]
+    return result if isinstance(result, dict) else json.loads(result)
+
+
+def print_top(conn, limit: int):
+    rows = conn.execute(
+        "SELECT route_name, area_name, recent_pins_count, total_pins FROM get_trending_routes(%s)",
+        (limit,),
+    ).fetchall()
+    print(f"\n🔥 人気急上昇ルート TOP{limit}")
+    print("-" * 60)
+    for idx, (route_name, area_name, recent_pins, total_pins) in enumerate(rows, 1):
+        print(f"  {idx}. {route_name}（{area_name}） 直近ピン {recent_pins} / 累計 {total_pins}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='人気急上昇ルートのスコア増分更新ジョブ')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--window-days', type=int, default=7, help='集計対象の日数（既定: 7）')
+    parser.add_argument('--half-life', type=float, default=0.0, help='時間減衰の半減期（日）。0で減衰なし')
+    parser.add_argument('--walk-weight', type=float, default=0.0, help='散歩1回あたりの重み（ピン1個=1.0）')
+    parser.add_argument('--lag-seconds', type=int, default=60, help='取りこぼし防止の遅延（秒）')
+    parser.add_argument('--rebuild', action='store_true', help='日次カウンターと水位を作り直す')
+    parser.add_argument('--interval', type=int, default=0, help='指定秒ごとに繰り返し実行（0で1回のみ）')
+    parser.add_argument('--show', type=int, default=0, help='更新後にランキング上位N件を表示')
+    args = parser.parse_args()
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    conn = connect(dsn)
+    try:
+        while True:
+            started = time.perf_counter()
+            result = refresh(conn, args)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"✅ {datetime.now():%Y-%m-%d %H:%M:%S} 更新完了 ({elapsed:.1f}ms) "
+                  f"新規ピン {result['new_pins']}件 / 新規散歩 {result['new_walks']}件 / "
+                  f"スコア更新 {result['updated_routes']}ルート / 期限切れ {result['pruned_days']}行")
+            if args.show:
+                print_top(conn, args.show)
+            if not args.interval:
+                break
+            # 作り直しは初回のみ
+            args.rebuild = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n⏹️  停止しました")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
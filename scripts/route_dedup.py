@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+重複ルートの検出（離散フレシェ距離 / ハウスドルフ距離）
+
+ユーザー投稿やエリアごとの add_* スクリプトの再実行で、ほぼ同じ経路の公式ルートが
+できてしまっています（delete_routes_final.py の手書きの KEEP リストはその後始末）。
+このスクリプトはミラーの official_routes の経路から重複候補を絞り込み、
+候補ペアだけで線どうしの距離を計算して、ほぼ同じルートのグループと残す1本を提案します。
+
+候補の絞り込み（全ペア比較 O(n²) を避ける）:
+  - 始点・終点のジオハッシュ（近傍セル込み）が一致する（逆向きに登録されたルートも含む）
+  - 経路が通る --grid-m 四方のグリッドセルの重なり（Jaccard）が --min-overlap 以上
+  - 長さの比が --max-length-ratio 以内
+距離の計算:
+  - 各ルートを最大 --samples 点に等間隔で再サンプリングし、候補ペアごとに
+    離散フレシェ距離（--metric frechet、既定）またはハウスドルフ距離を求める
+  - 始点どうし・終点どうしの距離はフレシェ距離の下限なので、閾値を超えるペアは計算しない
+
+残す1本: 有効 → 散歩数 → ピン数 → 経路線あり → サムネイルあり → 作成が古い 順
+統合するのは残す1本から直接 --threshold 以内のルートだけです。似たルートの連鎖でつながっただけの
+ルートは、その中で改めてグループを作るか、related として一覧に載せるだけにします。
+
+使い方:
+  python3 scripts/route_dedup.py --plan route_dedup_plan.json
+  python3 scripts/route_dedup.py --offline --threshold 40 --metric hausdorff
+  python3 scripts/route_dedup.py --sql route_dedup.sql   # ピン・散歩記録・お気に入りを付け替えて重複側を無効化するSQL
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from geo_utils import EARTH_RADIUS_M, haversine_m, parse_linestring
+from local_mirror import open_mirror, sync_mirror
+
+LatLon = Tuple[float, float]
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+SURVIVOR_COLUMNS = ['name', 'area_id', 'is_active', 'total_walks', 'total_pins', 'thumbnail_url', 'created_at']
+
+# 重複側から残す1本へ付け替える子テーブル（route_id 列）
+CHILD_TABLES = ['route_pins', 'route_walks']
+# UNIQUE(user_id, route_id) があるため、同じユーザーの行を1つに減らしてから付け替えるテーブル
+FAVORITE_TABLES = ['route_favorites', 'favorite_routes']
+
+
+@dataclass
+class RouteShape:
+    id: str
+    props: Dict[str, object]
+    has_line: bool
+    length_m: float
+    samples: List[LatLon]
+    cells: Set[Tuple[int, int]] = field(default_factory=set)
+
+    @property
+    def label(self) -> str:
+        return str(self.props.get('name') or self.id)
+
+    def survivor_key(self) -> Tuple:
+        p = self.props
+        return (
+            bool(p.get('is_active', True)),
+            p.get('total_walks') or 0,
+            p.get('total_pins') or 0,
+            self.has_line,
+            bool(p.get('thumbnail_url')),
+            -_timestamp_rank(p.get('created_at')),  # 作成が古いほど優先
+        )
+
+
+@dataclass
+class RouteCluster:
+    survivor: RouteShape
+    duplicates: List[Tuple[RouteShape, float]]
+    # 連鎖でつながっただけで、survivor から直接 threshold 以内ではないルート（統合しない）
+    related: List[RouteShape] = field(default_factory=list)
+
+
+def _timestamp_rank(value) -> float:
+    if not value:
+        return math.inf
+    digits = ''.join(ch for ch in str(value)[:19] if ch.isdigit())
+    return float(digits or 'inf')
+
+
+# ------------------------------------------------------------
+# 入力
+# ------------------------------------------------------------
+
+def resample(points: List[LatLon], count: int) -> Tuple[List[LatLon], float]:
+    """経路を長さ方向に等間隔な count 点に再サンプリング（全長も返す）"""
+    cumulative = [0.0]
+    for a, b in zip(points, points[1:]):
+        cumulative.append(cumulative[-1] + haversine_m(a, b))
+    total = cumulative[-1]
+    if total <= 0:
+        return [points[0]], 0.0
+    samples = []
+    seg = 0
+    for i in range(count):
+        target = total * i / (count - 1)
+        while seg < len(points) - 2 and cumulative[seg + 1] < target:
+            seg += 1
+        span = cumulative[seg + 1] - cumulative[seg]
+        t = 0.0 if span <= 0 else (target - cumulative[seg]) / span
+        (lat0, lon0), (lat1, lon1) = points[seg], points[seg + 1]
+        samples.append((lat0 + (lat1 - lat0) * t, lon0 + (lon1 - lon0) * t))
+    return samples, total
+
+
+def load_routes(db, sample_count: int) -> List[RouteShape]:
+    route_columns = {row[1] for row in db.execute('PRAGMA table_info("official_routes")')}
+    props = [c for c in SURVIVOR_COLUMNS if c in route_columns]
+    line_column = 'route_line' if 'route_line' in route_columns else 'NULL'
+    rows = db.execute(
+        f"SELECT id, {line_column}, {', '.join(props) or 'NULL'} FROM official_routes ORDER BY id"
+    ).fetchall()
+
+    points_by_route: Dict[str, List[LatLon]] = {}
+    point_columns = {row[1] for row in db.execute('PRAGMA table_info("official_route_points")')}
+    if {'route_id', 'point_order', 'location_lat'} <= point_columns:
+        for route_id, lat, lon in db.execute(
+            "SELECT route_id, location_lat, location_lon FROM official_route_points "
+            "WHERE location_lat IS NOT NULL ORDER BY route_id, point_order"
+        ):
+            points_by_route.setdefault(route_id, []).append((lat, lon))
+
+    routes = []
+    for row in rows:
+        has_line = bool(row[1])
+        latlons = parse_linestring(row[1]) if has_line else points_by_route.get(row[0], [])
+        if len(latlons) < 2:
+            continue
+        samples, length = resample(latlons, sample_count)
+        if length <= 0:
+            continue
+        values = {col: row[2 + i] for i, col in enumerate(props)}
+        routes.append(RouteShape(row[0], values, has_line, length, samples))
+    return routes
+
+
+# ------------------------------------------------------------
+# 候補の絞り込み
+# ------------------------------------------------------------
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_neighbors(lat: float, lon: float, precision: int) -> Set[str]:
+    """自セルと周囲8セルのジオハッシュ（セル境界をまたぐ近い点を取りこぼさない）"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    height, width = 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+    return {
+        geohash(max(min(lat + dy * height, 89.999999), -89.999999), ((lon + dx * width + 180) % 360) - 180, precision)
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+    }
+
+
+def endpoint_pairs(routes: List[RouteShape], precision: int) -> Iterator[Tuple[int, int]]:
+    """始点・終点のジオハッシュが一致するペア（逆向きも含む）"""
+    index: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for idx, route in enumerate(routes):
+        index[(geohash(*route.samples[0], precision), geohash(*route.samples[-1], precision))].append(idx)
+    for idx, route in enumerate(routes):
+        starts = geohash_neighbors(*route.samples[0], precision)
+        ends = geohash_neighbors(*route.samples[-1], precision)
+        for start in starts:
+            for end in ends:
+                for other in [*index.get((start, end), ()), *index.get((end, start), ())]:
+                    if other > idx:
+                        yield idx, other
+
+
+def grid_pairs(routes: List[RouteShape], grid_m: float, min_overlap: float,
+               max_cell_routes: int) -> Iterator[Tuple[int, int]]:
+    """通過するグリッドセルの Jaccard 係数が min_overlap 以上のペア"""
+    cell_deg = grid_m / METERS_PER_DEGREE
+    index: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for idx, route in enumerate(routes):
+        # 経度方向も同じ度数で区切る（東西は少し細いセルになるが、全ルートで同じ格子になる）
+        route.cells = {(int(lat // cell_deg), int(lon // cell_deg)) for lat, lon in route.samples}
+        for cell in route.cells:
+            index[cell].append(idx)
+
+    shared: Dict[Tuple[int, int], int] = defaultdict(int)
+    for members in index.values():
+        if len(members) > max_cell_routes:
+            continue  # 駅前など多数のルートが通るセルは手がかりにならない
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                shared[(a, b)] += 1
+    for (a, b), common in shared.items():
+        union = len(routes[a].cells) + len(routes[b].cells) - common
+        if union and common / union >= min_overlap:
+            yield a, b
+
+
+# ------------------------------------------------------------
+# 距離
+# ------------------------------------------------------------
+
+def _to_xy(points: List[LatLon], origin: LatLon) -> List[Tuple[float, float]]:
+    cos_lat = math.cos(math.radians(origin[0]))
+    return [((lon - origin[1]) * METERS_PER_DEGREE * cos_lat, (lat - origin[0]) * METERS_PER_DEGREE)
+            for lat, lon in points]
+
+
+def discrete_frechet(p: List[Tuple[float, float]], q: List[Tuple[float, float]]) -> float:
+    """離散フレシェ距離（2行だけのDP）"""
+    prev = [math.inf] * len(q)
+    for i, (px, py) in enumerate(p):
+        row = [0.0] * len(q)
+        for j, (qx, qy) in enumerate(q):
+            d = math.hypot(px - qx, py - qy)
+            if i == 0 and j == 0:
+                row[j] = d
+            elif i == 0:
+                row[j] = max(row[j - 1], d)
+            elif j == 0:
+                row[j] = max(prev[0], d)
+            else:
+                row[j] = max(min(prev[j], prev[j - 1], row[j - 1]), d)
+        prev = row
+    return prev[-1]
+
+
+def hausdorff(p: List[Tuple[float, float]], q: List[Tuple[float, float]]) -> float:
+    def directed(a, b):
+        return max(min(math.hypot(ax - bx, ay - by) for bx, by in b) for ax, ay in a)
+    return max(directed(p, q), directed(q, p))
+
+
+def route_distance(a: RouteShape, b: RouteShape, metric: str, threshold: float) -> Optional[float]:
+    """2ルートの距離（向きは近い方）。閾値を超えることが確定したら None"""
+    best = None
+    for q_samples in (b.samples, b.samples[::-1]):
+        if metric == 'frechet':
+            # 始点どうし・終点どうしの距離はフレシェ距離の下限
+            lower = max(haversine_m(a.samples[0], q_samples[0]), haversine_m(a.samples[-1], q_samples[-1]))
+            if lower > threshold:
+                continue
+        origin = a.samples[0]
+        p, q = _to_xy(a.samples, origin), _to_xy(q_samples, origin)
+        d = discrete_frechet(p, q) if metric == 'frechet' else hausdorff(p, q)
+        if d <= threshold and (best is None or d < best):
+            best = d
+        if metric == 'hausdorff':
+            break  # ハウスドルフ距離は向きに依存しない
+    return best
+
+
+# ------------------------------------------------------------
+# クラスタリングと出力
+# ------------------------------------------------------------
+
+def find_clusters(routes: List[RouteShape], edges: Dict[Tuple[int, int], float]) -> List[RouteCluster]:
+    adjacency: Dict[int, List[int]] = defaultdict(list)
+    for a, b in edges:
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+
+    seen: Set[int] = set()
+    clusters = []
+    for start in sorted(adjacency):
+        if start in seen:
+            continue
+        component, stack = [], [start]
+        seen.add(start)
+        while stack:
+            node = stack.pop()
+            component.append(node)
+            for other in adjacency[node]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        clusters.extend(split_by_survivor(routes, edges, component))
+    return sorted(clusters, key=lambda c: (-len(c.duplicates), c.survivor.id))
+
+
+def split_by_survivor(routes: List[RouteShape], edges: Dict[Tuple[int, int], float],
+                      component: List[int]) -> List[RouteCluster]:
+    """つながったルートを、残す1本と直接 threshold 以内のまとまりに分ける
+
+    A~B~C と連鎖しただけの C を A に統合すると、別の道のピンや散歩記録を移してしまう。
+    最良の1本と直接の辺があるものだけを重複とし、残りで同じことを繰り返す。
+    どのまとまりにも入らなかったルートは最初のまとまりの related に載せる。
+    """
+    def distance(a: int, b: int) -> Optional[float]:
+        return edges.get((min(a, b), max(a, b)))
+
+    clusters: List[RouteCluster] = []
+    leftovers: List[int] = []
+    remaining = sorted(component, key=lambda i: (routes[i].survivor_key(), routes[i].id), reverse=True)
+    while remaining:
+        survivor, *rest = remaining
+        duplicates = [(routes[i], distance(i, survivor)) for i in rest if distance(i, survivor) is not None]
+        remaining = [i for i in rest if distance(i, survivor) is None]
+        if duplicates:
+            duplicates.sort(key=lambda d: (d[1], d[0].id))
+            clusters.append(RouteCluster(routes[survivor], duplicates))
+        else:
+            leftovers.append(survivor)
+    if clusters and leftovers:
+        clusters[0].related = sorted((routes[i] for i in leftovers), key=lambda r: r.id)
+    return clusters
+
+
+def _route_json(route: RouteShape) -> Dict[str, object]:
+    return {
+        'id': route.id,
+        'name': route.props.get('name'),
+        'area_id': route.props.get('area_id'),
+        'length_m': round(route.length_m, 1),
+        'is_active': route.props.get('is_active'),
+        'total_walks': route.props.get('total_walks'),
+        'total_pins': route.props.get('total_pins'),
+    }
+
+
+def write_plan(path: Path, clusters: List[RouteCluster], metric: str, threshold: float):
+    plan = {
+        'metric': metric,
+        'threshold_m': threshold,
+        'clusters': [
+            {
+                'survivor': _route_json(c.survivor),
+                'duplicates': [_route_json(r) | {'distance_m': round(d, 1)} for r, d in c.duplicates],
+                'related': [_route_json(r) for r in c.related],
+            }
+            for c in clusters
+        ],
+    }
+    path.write_text(json.dumps(plan, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def write_sql(path: Path, clusters: List[RouteCluster]):
+    """ピン・散歩記録・お気に入りを残す1本に付け替え、重複側を無効化するSQL（ルートの削除はしない）
+
+    お気に入りは UNIQUE(user_id, route_id) のため、同じユーザーの行は残す1本の行（なければ
+    id が最小の行）だけを残して付け替える。テーブルがない環境でも通るよう to_regclass で確かめる。
+    related（連鎖でつながっただけのルート）は含めない。
+    """
+    lines = [
+        "-- route_dedup.py が生成した重複ルートの統合",
+        "-- 適用後に reconcile_counters.py で total_pins / total_walks を再集計してください",
+        "BEGIN;",
+    ]
+    for c in clusters:
+        survivor = f"'{c.survivor.id}'"
+        ids = ', '.join(f"'{r.id}'" for r, _ in c.duplicates)
+        lines.append(f"-- {c.survivor.label} ← {len(c.duplicates)}件")
+        for table in CHILD_TABLES:
+            lines.append(f"UPDATE {table} SET route_id = {survivor} WHERE route_id IN ({ids});")
+        for table in FAVORITE_TABLES:
+            lines += [
+                "DO $$",
+                "BEGIN",
+                f"  IF to_regclass('public.{table}') IS NOT NULL THEN",
+                f"    DELETE FROM {table} f USING {table} s",
+                f"    WHERE f.route_id IN ({ids}) AND s.user_id = f.user_id AND s.id <> f.id",
+                f"      AND (s.route_id = {survivor} OR (s.route_id IN ({ids}) AND s.id < f.id));",
+                f"    UPDATE {table} SET route_id = {survivor} WHERE route_id IN ({ids});",
+                "  END IF;",
+                "END $$;",
+            ]
+        lines.append(f"UPDATE official_routes SET is_active = FALSE WHERE id IN ({ids});")
+    lines.append("COMMIT;")
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重複ルートの検出')
+    parser.add_argument('--metric', choices=['frechet', 'hausdorff'], default='frechet')
+    parser.add_argument('--threshold', type=float, default=60.0, help='同一とみなす距離（m、既定: 60）')
+    parser.add_argument('--samples', type=int, default=48, help='1ルートあたりの再サンプリング点数')
+    parser.add_argument('--geohash-precision', type=int, default=7, help='始点・終点のジオハッシュ桁数（7 ≒ 150m）')
+    parser.add_argument('--grid-m', type=float, default=200.0, help='経路グリッドのセルの大きさ（m）')
+    parser.add_argument('--min-overlap', type=float, default=0.5, help='グリッドセルの Jaccard 係数の下限')
+    parser.add_argument('--max-cell-routes', type=int, default=500, help='これより多くのルートが通るセルは使わない')
+    parser.add_argument('--max-length-ratio', type=float, default=1.5, help='長さの比の上限')
+    parser.add_argument('--plan', type=Path, help='重複グループ（JSON）の出力先')
+    parser.add_argument('--sql', type=Path, help='統合SQLの出力先')
+    parser.add_argument('--offline', action='store_true', help='ミラーを同期せずに手元のデータで検出')
+    args = parser.parse_args()
+
+    if args.samples < 2:
+        parser.error('--samples は2以上にしてください')
+
+    started = time.perf_counter()
+    if not args.offline:
+        # 削除済みのルートを残す1本に選ぶと、統合SQLが外部キー違反になる
+        sync_mirror(tables=['official_routes', 'official_route_points'], prune=True)
+    routes = load_routes(open_mirror(), args.samples)
+    if len(routes) < 2:
+        print("⚠️  比較できるルートがありません")
+        sys.exit(1)
+
+    candidates = set(endpoint_pairs(routes, args.geohash_precision))
+    candidates |= set(grid_pairs(routes, args.grid_m, args.min_overlap, args.max_cell_routes))
+    candidates = {
+        (a, b) for a, b in candidates
+        if max(routes[a].length_m, routes[b].length_m) <= args.max_length_ratio * min(routes[a].length_m, routes[b].length_m)
+    }
+
+    edges: Dict[Tuple[int, int], float] = {}
+    for a, b in sorted(candidates):
+        distance = route_distance(routes[a], routes[b], args.metric, args.threshold)
+        if distance is not None:
+            edges[(a, b)] = distance
+    clusters = find_clusters(routes, edges)
+    elapsed = time.perf_counter() - started
+
+    all_pairs = len(routes) * (len(routes) - 1) // 2
+    print("=" * 60)
+    print(f"🔍 ルート {len(routes)}本 / 候補ペア {len(candidates)}組（全ペアの "
+          f"{len(candidates) / all_pairs:.2%}）/ {args.metric} ≤ {args.threshold:g}m: {len(edges)}組 "
+          f"({elapsed:.1f}秒)")
+    print(f"   重複グループ {len(clusters)}件 / 統合対象 {sum(len(c.duplicates) for c in clusters)}本")
+    print("=" * 60)
+    for c in clusters[:20]:
+        print(f"  🗺️  {c.survivor.label} ({c.survivor.id})")
+        for route, distance in c.duplicates:
+            print(f"      ← {route.label} ({route.id}) {distance:.0f}m")
+        for route in c.related:
+            print(f"      ～ {route.label} ({route.id}) 間接的に類似（統合しない）")
+
+    if args.plan:
+        write_plan(args.plan, clusters, args.metric, args.threshold)
+        print(f"\n✅ 重複グループ: {args.plan}")
+    if args.sql:
+        write_sql(args.sql, clusters)
+        print(f"✅ 統合SQL: {args.sql}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+公式ルートの (area_id, name) → id 解決キャッシュ
+
+ピンや写真の投入スクリプトがルートごとに .eq('name', ...).single() を呼んだり、
+「最新9本」のような推測で ID を決めたりしなくて済むように、指定エリアの
+対応表を1回のクエリでまとめて取得し、ローカルファイルに保存します。
+
+キャッシュは「件数 + 最大 updated_at」の水位で無効化します。ルートの追加・削除・
+更新があると水位が変わり、次回の load() で取り直します（水位の確認は1リクエスト）。
+
+使い方（他スクリプトから）:
+  resolver = RouteResolver(client)
+  resolver.load(resolve_area_ids('箱根'))
+  route_id = resolver.resolve('a1111111-...', '芦ノ湖周遊コース')
+
+使い方（CLI）:
+  python3 scripts/route_resolver.py --area 箱根            # 対応表を表示
+  python3 scripts/route_resolver.py --area 横浜 --refresh  # キャッシュを取り直す
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from areas import area_name, resolve_area_ids
+from ops_env import PROJECT_ROOT, create_service_client
+
+CACHE_PATH = PROJECT_ROOT / '.cache' / 'route_ids.json'
+
+# PostgRESTの1レスポンスあたりの既定上限
+PAGE_SIZE = 1000
+
+
+class RouteNotFoundError(KeyError):
+    pass
+
+
+class RouteResolver:
+    def __init__(self, client, cache_path: Path = CACHE_PATH):
+        self.client = client
+        self.cache_path = cache_path
+        self.routes: Dict[str, Dict[str, str]] = {}
+        self.requests = 0
+        self._loaded_area_ids: List[str] = []
+
+    def load(self, area_ids: List[str], refresh: bool = False) -> 'RouteResolver':
+        """指定エリアの対応表を読み込む（キャッシュの水位が一致すればDBからは取得しない）"""
+        area_ids = sorted(set(area_ids))
+        self._loaded_area_ids = area_ids
+        watermark = self._fetch_watermark(area_ids)
+        cache = self._read_cache()
+        key = ','.join(area_ids)
+        entry = cache.get(key)
+
+        if not refresh and entry and entry.get('watermark') == watermark:
+            self.routes = entry['routes']
+            return self
+
+        self.routes = self._fetch_routes(area_ids)
+        cache[key] = {'watermark': watermark, 'routes': self.routes}
+        self._write_cache(cache)
+        return self
+
+    def resolve(self, area_id: str, name: str) -> str:
+        route_id = self.routes.get(area_id, {}).get(name)
+        if route_id is None:
+            raise RouteNotFoundError(f"{area_name(area_id)} / {name}")
+        return route_id
+
+    def resolve_in(self, area_ids: List[str], name: str) -> str:
+        """複数エリア（例: 箱根の親エリア＋サブエリア）のどこかにある同名ルートを解決"""
+        for area_id in area_ids:
+            route_id = self.routes.get(area_id, {}).get(name)
+            if route_id is not None:
+                return route_id
+        raise RouteNotFoundError(f"{'・'.join(area_name(a) for a in area_ids)} / {name}")
+
+    def by_name(self, area_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """ルート名 → id（area_ids の順に先勝ち）"""
+        mapping: Dict[str, str] = {}
+        for area_id in area_ids or self._loaded_area_ids:
+            for name, route_id in self.routes.get(area_id, {}).items():
+                mapping.setdefault(name, route_id)
+        return mapping
+
+    def _fetch_watermark(self, area_ids: List[str]) -> List:
+        """[件数, 最大updated_at]（JSONに保存して比較するためリストで返す）
+
+        名前の変更なども拾えるのは、021_official_routes_updated_at.sql のトリガーで
+        どの更新でも updated_at が進むため。降順の既定は NULL が先頭なので NULL を最後にする。
+        """
+        response = (self.client.table('official_routes')
+                    .select('updated_at', count='exact')
+                    .in_('area_id', area_ids)
+                    .order('updated_at', desc=True, nullsfirst=False)
+                    .limit(1)
+                    .execute())
+        self.requests += 1
+        latest = response.data[0]['updated_at'] if response.data else None
+        return [response.count or 0, latest]
+
+    def _fetch_routes(self, area_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """同名ルートが複数ある場合は最も古い行を採用する（sync_route_catalog.py と同じ規則）"""
+        rows = []
+        while True:
+            response = (self.client.table('official_routes')
+                        .select('id, area_id, name, created_at')
+                        .in_('area_id', area_ids)
+                        .order('created_at')
+                        .order('id')
+                        .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                        .execute())
+            self.requests += 1
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+
+        routes: Dict[str, Dict[str, str]] = {area_id: {} for area_id in area_ids}
+        for row in rows:
+            routes[row['area_id']].setdefault(row['name'], row['id'])
+        return routes
+
+    def _read_cache(self) -> Dict:
+        try:
+            return json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_cache(self, cache: Dict):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp_path.replace(self.cache_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='公式ルートの名前 → ID 対応表')
+    parser.add_argument('--area', action='append', required=True, help='エリア名・「箱根」・area_id（複数指定可）')
+    parser.add_argument('--refresh', action='store_true', help='キャッシュを無視して取り直す')
+    parser.add_argument('--json', action='store_true', help='ルート名 → id のJSONを出力')
+    args = parser.parse_args()
+
+    try:
+        area_ids = [area_id for area in args.area for area_id in resolve_area_ids(area)]
+    except KeyError as e:
+        print(f"❌ エラー: {e}")
+        sys.exit(1)
+
+    resolver = RouteResolver(create_service_client()).load(area_ids, refresh=args.refresh)
+
+    if args.json:
+        print(json.dumps(resolver.by_name(area_ids), ensure_ascii=False, indent=2))
+        return
+
+    for area_id in area_ids:
+        routes = resolver.routes.get(area_id, {})
+        if not routes:
+            continue
+        print(f"\n🗺️  {area_name(area_id)}（{len(routes)}ルート）")
+        for name, route_id in routes.items():
+            print(f"   {name} → {route_id}")
+    print(f"\n✅ {resolver.requests}リクエストで解決しました（キャッシュ: {resolver.cache_path}）")
+
+
+if __name__ == '__main__':
+    main()
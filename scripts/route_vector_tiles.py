@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+公式ルートのベクトルタイル（MVT）生成
+
+get_all_routes_geojson は全ルートの経路を1つのGeoJSONで返すため、ルートが増えるほど
+MAPタブを開くたびの転送量が増えます。このスクリプトは official_routes.route_line
+（未設定のルートは official_route_points を point_order 順につないだ線）を
+ズームごとに Douglas-Peucker で間引いてタイルに切り分け、Mapbox Vector Tile として
+MBTiles（SQLite）にまとめます。アプリは表示範囲のタイルだけをHTTPキャッシュ付きで取得できます。
+
+- レイヤー "routes": LineString（id, name, area_id, difficulty_level, distance_meters）
+- 間引きの許容誤差はタイル内座標（extent 4096）で --tolerance 単位。低ズームほど粗くなる
+- 入力は local_mirror.py のミラー（実行時に増分同期）
+- PMTilesが必要な場合は `pmtiles convert routes.mbtiles routes.pmtiles` で変換
+
+使い方:
+  python3 scripts/route_vector_tiles.py                         # build/routes.mbtiles
+  python3 scripts/route_vector_tiles.py --min-zoom 8 --max-zoom 16 --out build/routes.mbtiles
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from geo_utils import parse_linestring
+from local_mirror import open_mirror, sync_mirror
+from ops_env import PROJECT_ROOT
+from pin_cluster_tiles import project
+
+DEFAULT_OUT = PROJECT_ROOT / 'build' / 'routes.mbtiles'
+EXTENT = 4096
+BUFFER = 64
+LAYER_NAME = 'routes'
+PROPERTY_COLUMNS = ['name', 'area_id', 'difficulty_level', 'distance_meters']
+
+Point = Tuple[float, float]
+
+
+@dataclass
+class RouteLine:
+    id: str
+    properties: Dict[str, object]
+    points: List[Point]  # Webメルカトル [0, 1)
+
+
+# ------------------------------------------------------------
+# 入力
+# ------------------------------------------------------------
+
+def load_routes(db) -> List[RouteLine]:
+    route_columns = {row[1] for row in db.execute('PRAGMA table_info("official_routes")')}
+    props = [c for c in PROPERTY_COLUMNS if c in route_columns]
+    line_column = 'route_line' if 'route_line' in route_columns else 'NULL'
+    rows = db.execute(
+        f"SELECT id, {line_column}, {', '.join(props) or 'NULL'} FROM official_routes ORDER BY id"
+    ).fetchall()
+
+    # route_line がないルートは経路ポイントから線を作る
+    points_by_route: Dict[str, List[Point]] = {}
+    point_columns = {row[1] for row in db.execute('PRAGMA table_info("official_route_points")')}
+    if {'route_id', 'point_order', 'location_lat'} <= point_columns:
+        for route_id, lat, lon in db.execute(
+            "SELECT route_id, location_lat, location_lon FROM official_route_points "
+            "WHERE location_lat IS NOT NULL ORDER BY route_id, point_order"
+        ):
+            points_by_route.setdefault(route_id, []).append((lat, lon))
+
+    routes = []
+    for row in rows:
+        latlons = parse_linestring(row[1]) if row[1] else points_by_route.get(row[0], [])
+        if len(latlons) < 2:
+            continue
+        properties = {col: row[2 + i] for i, col in enumerate(props) if row[2 + i] is not None}
+        routes.append(RouteLine(row[0], properties, [project(lat, lon) for lat, lon in latlons]))
+    return routes
+
+
+# ------------------------------------------------------------
+# 幾何処理
+# ------------------------------------------------------------
+
+def simplify(points: List[Point], tolerance: float) -> List[Point]:
+    """Douglas-Peucker（再帰なし）。端点は必ず残す"""
+    if len(points) <= 2 or tolerance <= 0:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tol2 = tolerance * tolerance
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        max_d2, index = 0.0, -1
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if seg2 == 0:
+                d2 = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+                d2 = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if d2 > max_d2:
+                max_d2, index = d2, i
+        if max_d2 > tol2:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def clip_segment(p0: Point, p1: Point, xmin: float, ymin: float,
+                 xmax: float, ymax: float) -> Optional[Tuple[Point, Point]]:
+    """Liang-Barsky による線分のクリップ"""
+    x0, y0 = p0
+    dx, dy = p1[0] - x0, p1[1] - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    return (x0 + t0 * dx, y0 + t0 * dy), (x0 + t1 * dx, y0 + t1 * dy)
+
+
+def clip_line(points: List[Point], xmin: float, ymin: float, xmax: float, ymax: float) -> List[List[Point]]:
+    """折れ線を矩形で切り、矩形内に入る部分ごとの折れ線に分ける"""
+    parts: List[List[Point]] = []
+    current: List[Point] = []
+    for p0, p1 in zip(points, points[1:]):
+        clipped = clip_segment(p0, p1, xmin, ymin, xmax, ymax)
+        if clipped is None:
+            if current:
+                parts.append(current)
+                current = []
+            continue
+        a, b = clipped
+        if not current:
+            current = [a]
+        elif current[-1] != a:
+            parts.append(current)
+            current = [a]
+        current.append(b)
+        if b != p1:
+            parts.append(current)
+            current = []
+    if current:
+        parts.append(current)
+    return [part for part in parts if len(part) >= 2]
+
+
+def tiles_for_line(points: List[Point], zoom: int) -> Iterator[Tuple[int, int]]:
+    scale = 2 ** zoom
+    pad = BUFFER / EXTENT
+    xs = [p[0] * scale for p in points]
+    ys = [p[1] * scale for p in points]
+    for tx in range(int(min(xs) - pad), int(max(xs) + pad) + 1):
+        for ty in range(int(min(ys) - pad), int(max(ys) + pad) + 1):
+            if 0 <= tx < scale and 0 <= ty < scale:
+                yield tx, ty
+
+
+# ------------------------------------------------------------
+# MVT（protobuf）エンコード
+# ------------------------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 31)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: List[int]) -> bytes:
+    return _bytes_field(number, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int) and value >= 0:
+        return _field(5, 0) + _varint(value)
+    if isinstance(value, (int, float)):
+        return _field(3, 1) + struct.pack('<d', float(value))
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+
+def encode_line_geometry(parts: List[List[Tuple[int, int]]]) -> List[int]:
+    commands: List[int] = []
+    cx = cy = 0
+    for part in parts:
+        x, y = part[0]
+        commands += [(1 & 0x7) | (1 << 3), _zigzag(x - cx), _zigzag(y - cy)]
+        cx, cy = x, y
+        rest = part[1:]
+        commands.append((2 & 0x7) | (len(rest) << 3))
+        for x, y in rest:
+            commands += [_zigzag(x - cx), _zigzag(y - cy)]
+            cx, cy = x, y
+    return commands
+
+
+def encode_tile(features: List[Tuple[int, Dict[str, object], List[List[Tuple[int, int]]]]]) -> bytes:
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, object], int] = {}
+    encoded_values: List[bytes] = []
+    feature_bytes = b''
+    for feature_id, properties, parts in features:
+        tags: List[int] = []
+        for key, value in properties.items():
+            key_index = keys.setdefault(key, len(keys))
+            value_key = (type(value), value)
+            if value_key not in values:
+                values[value_key] = len(encoded_values)
+                encoded_values.append(_encode_value(value))
+            tags += [key_index, values[value_key]]
+        body = (_field(1, 0) + _varint(feature_id) + _packed(2, tags)
+                + _field(3, 0) + _varint(2)  # GeomType.LINESTRING
+                + _packed(4, encode_line_geometry(parts)))
+        feature_bytes += _bytes_field(2, body)
+
+    layer = (_field(15, 0) + _varint(2)
+             + _bytes_field(1, LAYER_NAME.encode('utf-8'))
+             + feature_bytes
+             + b''.join(_bytes_field(3, k.encode('utf-8')) for k in keys)
+             + b''.join(_bytes_field(4, v) for v in encoded_values)
+             + _field(5, 0) + _varint(EXTENT))
+    return _bytes_field(3, layer)
+
+
+def _quantize(part: List[Point], zoom: int, tx: int, ty: int) -> List[Tuple[int, int]]:
+    scale = 2 ** zoom * EXTENT
+    out: List[Tuple[int, int]] = []
+    for x, y in part:
+        q = (round(x * scale - tx * EXTENT), round(y * scale - ty * EXTENT))
+        if not out or out[-1] != q:
+            out.append(q)
+    return out
+
+
+def build_tiles(routes: List[RouteLine], min_zoom: int, max_zoom: int,
+                tolerance: float) -> Iterator[Tuple[int, int, int, bytes]]:
+    for zoom in range(min_zoom, max_zoom + 1):
+        world = 2 ** zoom * EXTENT
+        tiles: Dict[Tuple[int, int], list] = {}
+        for feature_index, route in enumerate(routes):
+            simplified = simplify(route.points, tolerance / world)
+            for tx, ty in tiles_for_line(simplified, zoom):
+                pad = BUFFER / world
+                xmin, ymin = tx / 2 ** zoom - pad, ty / 2 ** zoom - pad
+                xmax, ymax = (tx + 1) / 2 ** zoom + pad, (ty + 1) / 2 ** zoom + pad
+                parts = [_quantize(part, zoom, tx, ty) for part in clip_line(simplified, xmin, ymin, xmax, ymax)]
+                parts = [part for part in parts if len(part) >= 2]
+                if parts:
+                    properties = {'id': route.id, **route.properties}
+                    tiles.setdefault((tx, ty), []).append((feature_index + 1, properties, parts))
+        for (tx, ty), features in tiles.items():
+            yield zoom, tx, ty, encode_tile(features)
+
+
+# ------------------------------------------------------------
+# MBTiles
+# ------------------------------------------------------------
+
+def write_mbtiles(path: Path, tiles: Iterator[Tuple[int, int, int, bytes]], routes: List[RouteLine],
+                  min_zoom: int, max_zoom: int) -> Tuple[int, int]:
+    """一時ファイルに書いてから置き換える（書き込み中のファイルを配信しない）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    conn.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    count = total_bytes = 0
+    for zoom, tx, ty, data in tiles:
+        blob = gzip.compress(data, mtime=0)
+        # MBTilesの行番号はTMS（南から数える）
+        conn.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)", (zoom, tx, 2 ** zoom - 1 - ty, blob))
+        count += 1
+        total_bytes += len(blob)
+
+    lats, lons = [], []
+    for route in routes:
+        for x, y in route.points:
+            lons.append((x - 0.5) * 360)
+            lats.append(math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y)))))
+    bounds = [min(lons), min(lats), max(lons), max(lats)] if lons else [-180, -85, 180, 85]
+    metadata = {
+        'name': 'wanwalk-routes',
+        'format': 'pbf',
+        'type': 'overlay',
+        'minzoom': str(min_zoom),
+        'maxzoom': str(max_zoom),
+        'bounds': ','.join(f"{v:.6f}" for v in bounds),
+        'center': f"{(bounds[0] + bounds[2]) / 2:.6f},{(bounds[1] + bounds[3]) / 2:.6f},{min_zoom}",
+        'json': json.dumps({'vector_layers': [{
+            'id': LAYER_NAME, 'minzoom': min_zoom, 'maxzoom': max_zoom,
+            'fields': {'id': 'String', 'name': 'String', 'area_id': 'String',
+                       'difficulty_level': 'String', 'distance_meters': 'Number'},
+        }]}),
+    }
+    conn.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+    conn.commit()
+    conn.close()
+    os.replace(tmp, path)
+    return count, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='公式ルートのベクトルタイル（MBTiles）生成')
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help='出力するMBTilesファイル')
+    parser.add_argument('--min-zoom', type=int, default=5)
+    parser.add_argument('--max-zoom', type=int, default=16)
+    parser.add_argument('--tolerance', type=float, default=4.0, help='間引きの許容誤差（タイル内座標、extent 4096）')
+    parser.add_argument('--offline', action='store_true', help='ミラーを同期せずに手元のデータで生成')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if not args.offline:
+        sync_mirror(tables=['official_routes', 'official_route_points'], prune=True)
+    routes = load_routes(open_mirror())
+    if not routes:
+        print("⚠️  経路（route_line / official_route_points）のあるルートがありません")
+        sys.exit(1)
+
+    tiles = build_tiles(routes, args.min_zoom, args.max_zoom, args.tolerance)
+    count, total_bytes = write_mbtiles(args.out, tiles, routes, args.min_zoom, args.max_zoom)
+
+    print("=" * 60)
+    print(f"🗺️  ルート {len(routes)}本 → タイル {count}枚 / {total_bytes / 1024:.1f}KB "
+          f"(z{args.min_zoom}〜z{args.max_zoom}, {time.perf_counter() - started:.1f}秒)")
+    print(f"   {args.out}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
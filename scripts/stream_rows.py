@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+PostgREST の大きな応答を1行ずつ読むストリーミングリーダー
+
+check_routes.py や delete_routes_final.py はテーブル全体の select に response.json() を使うため、
+応答全体のバイト列と、それを変換したPythonオブジェクト全体が同時にメモリに載ります。
+stream_rows() は応答をチャンクごとに受け取りながらJSON配列の要素を順に取り出し、
+行をジェネレーターで返します。ダウンロードが終わる前に処理を始められ、メモリは1ページ分で済みます。
+
+- JSON は ijson がインストールされていればそれを使い、なければ標準の json.JSONDecoder.raw_decode で
+  配列の要素を1つずつ切り出す（チャンクの境界で切れた要素は次のチャンクを待つ）
+- fmt='csv' で Accept: text/csv を使う（値はすべて文字列。空欄は None）
+- PostgREST は1回の応答を max-rows（Supabaseの既定1000行）で打ち切るので、
+  Range ヘッダーで page_size 行ずつ取る。max-rows が page_size より小さいと短いページでも
+  続きがあるため、実際に返った行数（Content-Range の終端）だけ進め、空のページ
+  （または Content-Range の総数に達した時点）で終える
+
+使い方:
+  from stream_rows import stream_rows
+  for route in stream_rows(f"{url}/rest/v1/official_routes", headers, params={'select': 'id,name'}):
+      ...
+
+  # 手元の応答やファイルから
+  for row in iter_json_array(response.iter_content(65536)):
+      ...
+"""
+
+import codecs
+import csv
+import json
+import sys
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import requests
+except ImportError:
+    print("❌ requestsモジュールがインストールされていません")
+    print("以下のコマンドでインストールしてください:")
+    print("  pip3 install requests")
+    sys.exit(1)
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+DEFAULT_PAGE_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+class StreamError(Exception):
+    pass
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """JSON配列のバイト列（チャンクの並び）から要素を1つずつ返す"""
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    raw_decode = json.JSONDecoder().raw_decode
+    buffer, pos = '', 0
+    state = 'start'  # start → first（'[' の直後）/ item（',' の直後）⇄ separator → done
+
+    for chunk in chain(chunks, [None]):
+        final = chunk is None
+        # 読み終えた部分を捨てる（未完成の要素だけ残る）
+        buffer = buffer[pos:] + decode(chunk or b'', final=final)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if state == 'start':
+                if char != '[':
+                    raise StreamError(f"JSON配列ではありません: {buffer[pos:pos + 80]!r}")
+                state, pos = 'first', pos + 1
+            elif state in ('first', 'item'):
+                if char == ']' and state == 'first':
+                    state, pos = 'done', pos + 1
+                    continue
+                try:
+                    value, end = raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # 要素の途中で切れている
+                if (not final and not isinstance(value, (dict, list, str))
+                        and (end == len(buffer) or buffer[end] not in WHITESPACE + ',]')):
+                    break  # 数値・リテラルは続きがあるかもしれない（'1.' や '2e' で切れている場合も）
+                yield value
+                state, pos = 'separator', end
+            elif state == 'separator':
+                if char not in ',]':
+                    raise StreamError(f"配列の区切りが不正です: {buffer[pos:pos + 80]!r}")
+                state, pos = ('item' if char == ',' else 'done'), pos + 1
+            else:
+                raise StreamError(f"配列の後に余分なデータがあります: {buffer[pos:pos + 80]!r}")
+
+    if state != 'done':
+        raise StreamError('JSON配列が途中で終わっています')
+
+
+class _ChunkReader:
+    """チャンクの並びを read() できるようにする（ijson 用）"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+
+    def read(self, size: int = -1) -> bytes:
+        return next(self.chunks, b'')
+
+
+def iter_json_items(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """ijson があれば使い、なければ iter_json_array にフォールバック"""
+    if ijson is None:
+        return iter_json_array(chunks)
+    return ijson.items(_ChunkReader(chunks), 'item', use_float=True)
+
+
+def iter_csv_rows(chunks: Iterable[bytes]) -> Iterator[Dict[str, Optional[str]]]:
+    """PostgREST の text/csv 応答から行を辞書で返す（空欄は None）"""
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+
+    def lines() -> Iterator[str]:
+        pending = ''
+        for chunk in chain(chunks, [None]):
+            pending += decode(chunk or b'', final=chunk is None)
+            *complete, pending = pending.split('\n')
+            for line in complete:
+                yield line + '\n'
+        if pending:
+            yield pending
+
+    reader = csv.reader(lines())
+    header = next(reader, None)
+    if header is None:
+        return
+    for values in reader:
+        yield {column: (value if value != '' else None) for column, value in zip(header, values)}
+
+
+def _parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Content-Range（'0-999/12345'・'0-999/*'・'*/0'）から (終端, 総数) を返す。不明は None"""
+    if not value or '/' not in value:
+        return None, None
+    span, _, total = value.strip().rpartition('/')
+    end = span.partition('-')[2]
+    return (int(end) if end.isdigit() else None), (int(total) if total.isdigit() else None)
+
+
+def stream_rows(url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None,
+                session: Optional['requests.Session'] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                fmt: str = 'json', chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """PostgREST のテーブル（url = .../rest/v1/<テーブル>）を page_size 行ずつ取り、1行ずつ返す
+
+    ページの取得は order を指定しないと順序が保証されないため、params に order がなければ id 順にする。
+    サーバーの max-rows で page_size より短く打ち切られても取りこぼさないよう、空のページが返るまで読む。
+    """
+    params = dict(params or {})
+    params.setdefault('order', 'id')
+    http = session or requests.Session()
+    accept = 'text/csv' if fmt == 'csv' else 'application/json'
+    start = 0
+    while True:
+        page_headers = {**headers, 'Accept': accept, 'Range-Unit': 'items',
+                        'Range': f"{start}-{start + page_size - 1}"}
+        with http.get(url, headers=page_headers, params=params, stream=True, timeout=60) as response:
+            if response.status_code == 416:
+                return  # 範囲が総数を超えた（前のページで読み終えている）
+            if response.status_code not in (200, 206):
+                raise StreamError(f"取得失敗 {response.status_code}: {response.text[:200]}")
+            chunks = response.iter_content(chunk_size)
+            rows = iter_csv_rows(chunks) if fmt == 'csv' else iter_json_items(chunks)
+            count = 0
+            for row in rows:
+                count += 1
+                yield row
+            range_end, total = _parse_content_range(response.headers.get('Content-Range'))
+        if count == 0:
+            return
+        if range_end is not None and range_end != start + count - 1:
+            raise StreamError(f"Content-Range {start}-{range_end} と受信した{count}行が一致しません")
+        start += count
+        if total is not None and start >= total:
+            return
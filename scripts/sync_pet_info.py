@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+pet_info（愛犬家向け情報）の差分同期スクリプト
+
+任意のエリアについて、あるべき pet_info を JSON またはルート作成CSV から読み込み、
+現在の official_routes.pet_info と正規化JSONのハッシュで比較して、
+変わった行の pet_info だけを UPDATE します（apply_official_route_updates RPC でまとめて送る）。
+
+使い方:
+  python3 scripts/sync_pet_info.py --json pet_info.json --dry-run
+  python3 scripts/sync_pet_info.py --csv docs/route_template.csv --area 箱根・芦ノ湖
+  python3 scripts/sync_pet_info.py --json pet_info.json --batch-size 100
+
+JSONの形式（キーはエリア名・「箱根」・area_idのいずれか）:
+  {
+    "箱根": {
+      "芦ノ湖周遊コース": {"parking": "...", "surface": "...", ...}
+    },
+    "鎌倉": { ... }
+  }
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from areas import area_name, resolve_area_ids
+from csv_to_sql import build_pet_info
+from ops_env import create_service_client
+
+
+@dataclass
+class PetInfoTarget:
+    """同期対象: エリア（複数area_idのまとまり）ごとの ルート名 → pet_info"""
+    label: str
+    area_ids: List[str]
+    pet_info_by_name: Dict[str, Dict[str, Any]]
+
+
+@dataclass
+class SyncResult:
+    written: int = 0
+    skipped: int = 0
+    missing: List[str] = field(default_factory=list)
+    unmanaged: List[str] = field(default_factory=list)
+    requests: int = 0
+
+
+def canonical_hash(value: Optional[Dict[str, Any]]) -> str:
+    """キー順・空白に依存しないJSONのハッシュ"""
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def load_json_targets(path: Path) -> List[PetInfoTarget]:
+    data = json.loads(path.read_text(encoding='utf-8'))
+    return [PetInfoTarget(area, resolve_area_ids(area), routes) for area, routes in data.items()]
+
+
+def load_csv_targets(path: Path) -> List[PetInfoTarget]:
+    """ルート作成CSV（docs/route_template.csv 形式）から pet_info を読み込む"""
+    by_area: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for idx, row in enumerate(csv.DictReader(f), start=1):
+            area = row.get('エリア', '').strip()
+            name = row.get('ルート名', '').strip()
+            if not area or not name:
+                print(f"⚠️  警告: 行{idx} - エリアまたはルート名が空です（スキップ）")
+                continue
+            by_area.setdefault(area, {})[name] = build_pet_info(row)
+    return [PetInfoTarget(area, resolve_area_ids(area), routes) for area, routes in by_area.items()]
+
+
+def fetch_current(client, area_ids: List[str]) -> List[Dict[str, Any]]:
+    """対象エリアの全ルートを1回のクエリで取得"""
+    response = client.table('official_routes').select('*').in_('area_id', area_ids).execute()
+    return response.data or []
+
+
+def update_official_routes(client, changes: List[Tuple[str, Dict[str, Any]]], batch_size: int = 200) -> int:
+    """(id, 変わった列) を apply_official_route_updates RPC で batch_size 行ずつ UPDATE する。送ったリクエスト数を返す
+
+    RPC は要素ごとに含まれる列だけを書く（022_apply_official_route_updates.sql）ので、
+    トリガーが更新した total_pins / total_walks などを取得時点の値に戻さないまま、1回の UPDATE にまとまる。
+    """
+    requests = 0
+    for start in range(0, len(changes), batch_size):
+        batch = changes[start:start + batch_size]
+        client.rpc('apply_official_route_updates',
+                   {'p_rows': [{'id': row_id, **values} for row_id, values in batch]}).execute()
+        requests += 1
+    return requests
+
+
+def sync_pet_info(client, targets: List[PetInfoTarget], batch_size: int = 200,
+                  dry_run: bool = False) -> SyncResult:
+    """pet_info を差分同期する（変わった行の pet_info 列だけを更新する）"""
+    result = SyncResult()
+    all_area_ids = sorted({area_id for t in targets for area_id in t.area_ids})
+    current_rows = fetch_current(client, all_area_ids)
+    result.requests += 1
+
+    rows_by_key = {(row['area_id'], row['name']): row for row in current_rows}
+    changed_rows = []
+
+    for target in targets:
+        managed_names = set(target.pet_info_by_name)
+        for name, desired in target.pet_info_by_name.items():
+            row = next((rows_by_key[(a, name)] for a in target.area_ids if (a, name) in rows_by_key), None)
+            if row is None:
+                result.missing.append(f"{target.label} / {name}")
+                continue
+            if canonical_hash(row.get('pet_info')) == canonical_hash(desired):
+                result.skipped += 1
+                continue
+            changed_rows.append((row['id'], {'pet_info': desired}))
+            print(f"  ✏️  {area_name(row['area_id'])} / {name}")
+
+        for row in current_rows:
+            if row['area_id'] in target.area_ids and row['name'] not in managed_names:
+                result.unmanaged.append(f"{area_name(row['area_id'])} / {row['name']}")
+
+    if not dry_run:
+        result.requests += update_official_routes(client, changed_rows, batch_size)
+    result.written = len(changed_rows)
+
+    return result
+
+
+def print_result(result: SyncResult, dry_run: bool):
+    print("\n" + "=" * 60)
+    verb = '更新予定' if dry_run else '更新'
+    print(f"📊 完了: {result.written}件{verb} / {result.skipped}件変更なし（スキップ） / "
+          f"{result.requests}リクエスト")
+    if result.missing:
+        print(f"\n⚠️  DBに見つからないルート: {len(result.missing)}件")
+        for label in result.missing:
+            print(f"   - {label}")
+    if result.unmanaged:
+        print(f"\n💡 pet_infoが定義されていないルート: {len(result.unmanaged)}件")
+        for label in result.unmanaged:
+            print(f"   - {label}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='pet_info の差分同期')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--json', type=Path, help='エリア → ルート名 → pet_info のJSON')
+    source.add_argument('--csv', type=Path, help='ルート作成CSV（docs/route_template.csv 形式）')
+    parser.add_argument('--area', action='append', help='対象エリアを限定（複数指定可）')
+    parser.add_argument('--batch-size', type=int, default=200, help='1リクエストで更新する行数')
+    parser.add_argument('--dry-run', action='store_true', help='差分を表示するだけで更新しない')
+    args = parser.parse_args()
+
+    try:
+        targets = load_json_targets(args.json) if args.json else load_csv_targets(args.csv)
+        if args.area:
+            wanted = {area_id for area in args.area for area_id in resolve_area_ids(area)}
+            targets = [t for t in targets if wanted & set(t.area_ids)]
+    except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
+        print(f"❌ エラー: {e}")
+        sys.exit(1)
+
+    if not targets:
+        print("⚠️  同期対象がありません")
+        return
+
+    client = create_service_client()
+
+    print(f"🐕 pet_info を同期します（{len(targets)}エリア{'・ドライラン' if args.dry_run else ''}）\n")
+    try:
+        result = sync_pet_info(client, targets, args.batch_size, args.dry_run)
+    except Exception as e:
+        print(f"❌ エラーが発生しました: {e}")
+        sys.exit(1)
+    print_result(result, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+公式ルートカタログの差分同期スクリプト
+
+scripts/route_catalog/<エリア>.json に書かれた「あるべきルート一覧」と
+現在の official_routes を (エリア, name) で突き合わせ、管理対象の列の
+内容ハッシュが変わったものだけを INSERT / UPDATE / DELETE します。
+何度実行しても重複は作られず、全エリアでも数リクエストで終わります。
+
+「箱根」のようなエリアグループは、reassign_hakone_areas.sql でサブエリアへ移したルートも
+同じルートとして扱います（新規追加は area_id に入れ、既存行の area_id は変えない）。
+削除は --prune（またはカタログの "prune": true）のときだけで、過去の重複投入で
+できた同名ルートも通常は一覧に表示するだけです。ピン・散歩記録などの子行がある
+ルートは --prune でも削除せず、route_dedup.py での統合を案内します。
+
+elevation_gain_meters は、elevation_profile.py が経路ポイントから計算した行
+（elevation_profile が NULL でない行）では実測値を優先し、カタログの値で戻しません。
+estimated_minutes も同様に、estimate_durations.py が散歩記録の中央値を入れた行
+（duration_source = 'walks'）では更新しません。
+
+UPDATE は supabase_migrations/022_apply_official_route_updates.sql の RPC で、
+変わった列だけをまとめて送ります（事前に適用してください）。
+
+使い方:
+  python3 scripts/sync_route_catalog.py --dry-run              # 全カタログの差分を表示
+  python3 scripts/sync_route_catalog.py --area hakone          # 箱根だけ同期
+  python3 scripts/sync_route_catalog.py --prune                # カタログにないルート・同名の重複も削除
+
+カタログの形式:
+  {
+    "area": "箱根",
+    "area_id": "a1111111-1111-1111-1111-111111111111",
+    "prune": false,
+    "routes": [
+      {"name": "...", "description": "...", "distance_meters": 10000.0,
+       "estimated_minutes": 120, "elevation_gain_meters": 50.0,
+       "difficulty_level": "moderate",
+       "start": [35.2328, 139.0268], "end": [35.2328, 139.0268]}
+    ]
+  }
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from areas import area_name, resolve_area_ids
+from geo_utils import parse_point, point_ewkt
+from ops_env import create_service_client
+from sync_pet_info import canonical_hash, update_official_routes
+
+CATALOG_DIR = Path(__file__).resolve().parent / 'route_catalog'
+
+# PostgRESTの1レスポンスあたりの既定上限
+PAGE_SIZE = 1000
+
+MANAGED_COLUMNS = ['name', 'description', 'distance_meters', 'difficulty_level']
+# カタログに書いたときだけ管理する列
+OPTIONAL_COLUMNS = ['estimated_minutes', 'elevation_gain_meters', 'pet_info']
+# 実測値で上書きされる列 → (実測済みかを表す列, その値)。値が None なら列が NULL でなければ実測済み。
+# 実測済みの行ではカタログの値は新規追加時の初期値としてだけ使い、比較・更新しない
+MEASURED_COLUMNS: Dict[str, Tuple[str, Optional[str]]] = {
+    'elevation_gain_meters': ('elevation_profile', None),   # elevation_profile.py
+    'estimated_minutes': ('duration_source', 'walks'),      # estimate_durations.py --apply-estimate
+}
+COORD_PRECISION = 6
+
+# official_routes を ON DELETE CASCADE なしで参照しているテーブル
+ROUTE_CHILD_TABLES = ['route_pins', 'route_walks', 'official_route_points', 'route_favorites']
+
+
+@dataclass
+class RouteCatalog:
+    slug: str
+    label: str
+    area_id: str             # 新規追加するルートの area_id
+    area_ids: List[str]      # 既存ルートを探すエリア（グループならサブエリアを含む）
+    prune: bool
+    routes: List[Dict[str, Any]]
+
+
+@dataclass
+class SyncPlan:
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Tuple[Dict[str, Any], Dict[str, Any]]] = field(default_factory=list)  # (現在の行, 送る列)
+    deletes: List[Dict[str, Any]] = field(default_factory=list)
+    duplicates: List[Dict[str, Any]] = field(default_factory=list)
+    blocked: List[Tuple[Dict[str, Any], List[str]]] = field(default_factory=list)  # (削除しない行, 子行のあるテーブル)
+    unchanged: int = 0
+
+
+@dataclass
+class CatalogSyncResult:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    requests: int = 0
+
+
+def load_catalog(path: Path) -> RouteCatalog:
+    data = json.loads(path.read_text(encoding='utf-8'))
+    try:
+        area_ids = resolve_area_ids(data['area']) if data.get('area') else []
+    except KeyError:
+        if not data.get('area_id'):
+            raise
+        area_ids = []
+    area_id = data.get('area_id') or area_ids[0]
+    if area_id not in area_ids:
+        area_ids = [area_id] + area_ids
+    names = [route['name'] for route in data['routes']]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"{path.name}: ルート名が重複しています: {', '.join(duplicates)}")
+    return RouteCatalog(path.stem, data.get('area', area_name(area_id)), area_id, area_ids,
+                        bool(data.get('prune', False)), data['routes'])
+
+
+def load_catalogs(directory: Path, only: Optional[List[str]] = None) -> List[RouteCatalog]:
+    catalogs = [load_catalog(path) for path in sorted(directory.glob('*.json'))]
+    if only:
+        wanted = set(only)
+        wanted_ids = set()
+        for key in only:
+            try:
+                wanted_ids.update(resolve_area_ids(key))
+            except KeyError:
+                pass
+        catalogs = [c for c in catalogs
+                    if c.slug in wanted or c.label in wanted or wanted_ids.intersection(c.area_ids)]
+    return catalogs
+
+
+def desired_row(catalog: RouteCatalog, route: Dict[str, Any]) -> Dict[str, Any]:
+    """カタログの1ルートを official_routes の列に変換"""
+    row = {'area_id': catalog.area_id}
+    row.update({col: route.get(col) for col in MANAGED_COLUMNS})
+    row.update({col: route[col] for col in OPTIONAL_COLUMNS if col in route})
+    row['start_location'] = point_ewkt(*route['start'])
+    row['end_location'] = point_ewkt(*route['end'])
+    return row
+
+
+def is_measured(row: Dict[str, Any], column: str) -> bool:
+    """column が実測値（elevation_profile.py などが書いた値）になっているか"""
+    if column not in MEASURED_COLUMNS:
+        return False
+    marker, expected = MEASURED_COLUMNS[column]
+    value = row.get(marker)
+    return value is not None if expected is None else value == expected
+
+
+def _round_point(point) -> Optional[Tuple[float, float]]:
+    if point is None:
+        return None
+    return (round(point[0], COORD_PRECISION), round(point[1], COORD_PRECISION))
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+
+def content_hash(row: Dict[str, Any], optional_columns: List[str]) -> str:
+    """管理対象の列だけを正規化してハッシュする（DB側の行とカタログ側の行を同じ形にそろえる）"""
+    normalized = {col: _number(row.get(col)) for col in MANAGED_COLUMNS}
+    normalized.update({col: _number(row.get(col)) for col in optional_columns})
+    normalized['start'] = _round_point(parse_point(row.get('start_location')))
+    normalized['end'] = _round_point(parse_point(row.get('end_location')))
+    return canonical_hash(normalized)
+
+
+def fetch_current(client, area_ids: List[str]) -> Tuple[List[Dict[str, Any]], int]:
+    """対象エリアの全ルートを取得（1000行を超える場合のみページング）"""
+    rows: List[Dict[str, Any]] = []
+    requests = 0
+    while True:
+        response = (client.table('official_routes').select('*')
+                    .in_('area_id', area_ids)
+                    .order('id')
+                    .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                    .execute())
+        requests += 1
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows, requests
+
+
+def plan_sync(catalogs: List[RouteCatalog], current_rows: List[Dict[str, Any]],
+              prune: bool = False) -> SyncPlan:
+    plan = SyncPlan()
+    by_key: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for row in current_rows:
+        by_key.setdefault((row['area_id'], row['name']), []).append(row)
+
+    for catalog in catalogs:
+        pruning = prune or catalog.prune
+        desired_names = set()
+        for route in catalog.routes:
+            desired = desired_row(catalog, route)
+            desired_names.add(route['name'])
+            existing = sorted((row for area_id in catalog.area_ids
+                               for row in by_key.get((area_id, route['name']), [])),
+                              key=lambda r: r.get('created_at') or '')
+            if not existing:
+                plan.inserts.append(desired)
+                continue
+
+            # 過去の重複投入で同名ルートが複数ある場合は最も古い行を残す
+            survivor, *duplicates = existing
+            plan.duplicates.extend(duplicates)
+            if pruning:
+                plan.deletes.extend(duplicates)
+            optional = [col for col in OPTIONAL_COLUMNS if col in route and not is_measured(survivor, col)]
+            desired = {col: value for col, value in desired.items()
+                       if col not in OPTIONAL_COLUMNS or col in optional}
+            if content_hash(survivor, optional) == content_hash(desired, optional):
+                plan.unchanged += 1
+            else:
+                # カタログが管理する列だけを送る（サブエリアへ移したルートの area_id は変えない）
+                changes = {col: value for col, value in desired.items() if col != 'area_id'}
+                # updated_at は route_resolver.py のキャッシュ水位にも使われる
+                if 'updated_at' in survivor:
+                    changes['updated_at'] = datetime.now(timezone.utc).isoformat()
+                plan.updates.append((survivor, changes))
+
+        if pruning:
+            plan.deletes.extend(row for row in current_rows
+                                if row['area_id'] in catalog.area_ids and row['name'] not in desired_names)
+    return plan
+
+
+def find_child_rows(client, route_ids: List[str]) -> Dict[str, List[str]]:
+    """route_ids のうち、ROUTE_CHILD_TABLES に子行があるもの → そのテーブル名"""
+    found: Dict[str, List[str]] = {}
+    for table in ROUTE_CHILD_TABLES:
+        pending = set(route_ids)
+        while pending:
+            try:
+                response = (client.table(table).select('route_id')
+                            .in_('route_id', sorted(pending)).limit(PAGE_SIZE).execute())
+            except Exception as e:
+                # 未作成のテーブル（route_favorites など）は子行なしとみなす。それ以外は削除を止める
+                if 'does not exist' in str(e) or 'PGRST205' in str(e):
+                    break
+                raise
+            hits = {row['route_id'] for row in response.data or []}
+            if not hits:
+                break
+            for route_id in hits:
+                found.setdefault(route_id, []).append(table)
+            pending -= hits
+    return found
+
+
+def hold_back_referenced(client, plan: SyncPlan):
+    """子行が残っているルートを削除対象から外す（外したものは plan.blocked に記録）"""
+    if not plan.deletes:
+        return
+    referenced = find_child_rows(client, [row['id'] for row in plan.deletes])
+    plan.blocked = [(row, referenced[row['id']]) for row in plan.deletes if row['id'] in referenced]
+    plan.deletes = [row for row in plan.deletes if row['id'] not in referenced]
+
+
+def apply_plan(client, plan: SyncPlan, batch_size: int = 200, dry_run: bool = False) -> CatalogSyncResult:
+    """INSERT → UPDATE → DELETE の順に適用する
+
+    どれもバッチで送る。UPDATE は行ごとに変わりうる列だけを apply_official_route_updates RPC にまとめて渡す
+    （行全体を upsert するとトリガーが更新した total_pins などを取得時点の値に戻してしまう）。
+    """
+    result = CatalogSyncResult(unchanged=plan.unchanged)
+
+    for start in range(0, len(plan.inserts), batch_size):
+        batch = plan.inserts[start:start + batch_size]
+        if not dry_run:
+            client.table('official_routes').insert(batch).execute()
+            result.requests += 1
+        result.inserted += len(batch)
+
+    if not dry_run:
+        result.requests += update_official_routes(client, [(row['id'], changes) for row, changes in plan.updates],
+                                                  batch_size)
+    result.updated = len(plan.updates)
+
+    for start in range(0, len(plan.deletes), batch_size):
+        batch = plan.deletes[start:start + batch_size]
+        if not dry_run:
+            client.table('official_routes').delete().in_('id', [row['id'] for row in batch]).execute()
+            result.requests += 1
+        result.deleted += len(batch)
+
+    return result
+
+
+def sync_catalogs(client, catalogs: List[RouteCatalog], batch_size: int = 200,
+                  dry_run: bool = False, prune: bool = False) -> CatalogSyncResult:
+    area_ids = sorted({area_id for c in catalogs for area_id in c.area_ids})
+    current_rows, fetch_requests = fetch_current(client, area_ids)
+    plan = plan_sync(catalogs, current_rows, prune)
+    # 変更を書き込む前に確かめ、途中で外部キー違反になって半端に同期されるのを防ぐ
+    hold_back_referenced(client, plan)
+    print_plan(plan)
+    result = apply_plan(client, plan, batch_size, dry_run)
+    result.requests += fetch_requests
+    return result
+
+
+def print_plan(plan: SyncPlan):
+    for row in plan.inserts:
+        print(f"  ➕ {area_name(row['area_id'])} / {row['name']}")
+    for row, _ in plan.updates:
+        print(f"  ✏️  {area_name(row['area_id'])} / {row['name']}")
+    for row in plan.deletes:
+        print(f"  🗑️  {area_name(row['area_id'])} / {row['name']} ({row['id']})")
+    for row, tables in plan.blocked:
+        print(f"  ⛔ {area_name(row['area_id'])} / {row['name']} ({row['id']}): "
+              f"{', '.join(tables)} に子行があるため削除しません")
+    handled = {row['id'] for row in plan.deletes} | {row['id'] for row, _ in plan.blocked}
+    kept = [row for row in plan.duplicates if row['id'] not in handled]
+    if kept:
+        print(f"\n⚠️  同名の重複ルート: {len(kept)}件（--prune で削除、子行がある場合は route_dedup.py で統合）")
+        for row in kept:
+            print(f"   - {area_name(row['area_id'])} / {row['name']} ({row['id']})")
+    if plan.blocked:
+        print("💡 子行のあるルートは route_dedup.py で残すルートへ付け替えてから削除してください")
+
+
+def print_result(result: CatalogSyncResult, dry_run: bool):
+    print("\n" + "=" * 60)
+    suffix = '（ドライラン・未適用）' if dry_run else ''
+    print(f"📊 追加 {result.inserted}件 / 更新 {result.updated}件 / 削除 {result.deleted}件 / "
+          f"変更なし {result.unchanged}件 / {result.requests}リクエスト{suffix}")
+    print("=" * 60)
+
+
+def run(catalog_paths: Optional[List[Path]] = None, argv: Optional[List[str]] = None):
+    """CLI本体。add_*_routes.py からはカタログファイルを固定して呼び出す"""
+    parser = argparse.ArgumentParser(description='公式ルートカタログの差分同期')
+    parser.add_argument('--dir', type=Path, default=CATALOG_DIR, help='カタログのディレクトリ')
+    parser.add_argument('--area', action='append', help='対象カタログを限定（ファイル名・エリア名・area_id、複数指定可）')
+    parser.add_argument('--batch-size', type=int, default=200, help='1リクエストで追加・更新・削除する行数')
+    parser.add_argument('--prune', action='store_true', help='カタログにないルートと同名の重複を削除する（子行のあるルートは除く）')
+    parser.add_argument('--dry-run', action='store_true', help='差分を表示するだけで更新しない')
+    args = parser.parse_args(argv)
+
+    try:
+        if catalog_paths:
+            catalogs = [load_catalog(path) for path in catalog_paths]
+        else:
+            catalogs = load_catalogs(args.dir, args.area)
+    except (FileNotFoundError, KeyError, ValueError, json.JSONDecodeError) as e:
+        print(f"❌ エラー: {e}")
+        sys.exit(1)
+
+    if not catalogs:
+        print("⚠️  同期対象のカタログがありません")
+        return
+
+    client = create_service_client()
+
+    total = sum(len(c.routes) for c in catalogs)
+    labels = '・'.join(c.label for c in catalogs)
+    print("=" * 60)
+    print(f"🗺️  ルートカタログ同期: {labels}（{total}ルート{'・ドライラン' if args.dry_run else ''}）")
+    print("=" * 60)
+    try:
+        result = sync_catalogs(client, catalogs, args.batch_size, args.dry_run, args.prune)
+    except Exception as e:
+        print(f"❌ エラーが発生しました: {e}")
+        sys.exit(1)
+    print_result(result, args.dry_run)
+
+
+def main():
+    run()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,30 +3,14 @@
 箱根エリアのルートに愛犬家向け情報（pet_info）を追加するスクリプト
 """
 
-import os
 import sys
-import json
-from supabase import create_client, Client
-from dotenv import load_dotenv
 
-# .envファイルを読み込み
-load_dotenv('/home/user/wanwalk/.env')
+from areas import AREA_GROUPS
+from ops_env import create_service_client
+from sync_pet_info import PetInfoTarget, print_result, sync_pet_info
 
-# Supabase接続（Service Role Keyを使用してRLSをバイパス）
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("❌ エラー: SUPABASE_URLまたはSUPABASE_SERVICE_ROLE_KEYが設定されていません")
-    print("💡 .envファイルに以下を設定してください:")
-    print("   SUPABASE_URL=your_supabase_url")
-    print("   SUPABASE_SERVICE_ROLE_KEY=your_service_role_key")
-    sys.exit(1)
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# 箱根エリアID
-HAKONE_AREA_ID = 'a1111111-1111-1111-1111-111111111111'
+# 箱根エリアID（親エリア＋5サブエリア）
+HAKONE_AREA_IDS = AREA_GROUPS['箱根']
 
 # 各ルートのpet_info設定
 pet_info_data = {
@@ -188,50 +172,19 @@ pet_info_data = {
 
 def main():
     print("🐕 箱根エリアのルートにpet_infoを追加します\n")
-    
-    # 箱根エリアのルートを取得
+
+    dry_run = '--dry-run' in sys.argv[1:]
+    supabase = create_service_client()
+    target = PetInfoTarget('箱根', HAKONE_AREA_IDS, pet_info_data)
+
+    # 現在値と比較し、変わったルートの pet_info 列だけを RPC でまとめて UPDATE
     try:
-        response = supabase.table('official_routes')\
-            .select('id, name, area_id')\
-            .eq('area_id', HAKONE_AREA_ID)\
-            .execute()
-        
-        routes = response.data
-        
-        if not routes:
-            print("❌ 箱根エリアのルートが見つかりません")
-            sys.exit(1)
-        
-        print(f"✅ {len(routes)}本のルートを取得しました\n")
-        
-        # 各ルートにpet_infoを追加
-        updated_count = 0
-        skipped_count = 0
-        
-        for route in routes:
-            route_name = route['name']
-            route_id = route['id']
-            
-            if route_name in pet_info_data:
-                pet_info = pet_info_data[route_name]
-                
-                # pet_infoを更新
-                update_response = supabase.table('official_routes')\
-                    .update({'pet_info': pet_info})\
-                    .eq('id', route_id)\
-                    .execute()
-                
-                print(f"✅ {route_name}: pet_infoを追加しました")
-                updated_count += 1
-            else:
-                print(f"⚠️  {route_name}: pet_infoデータが定義されていません（スキップ）")
-                skipped_count += 1
-        
-        print(f"\n📊 完了: {updated_count}件更新 / {skipped_count}件スキップ")
-        
+        result = sync_pet_info(supabase, [target], dry_run=dry_run)
     except Exception as e:
         print(f"❌ エラーが発生しました: {e}")
         sys.exit(1)
 
+    print_result(result, dry_run)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+負荷テスト用ユーザーの一括準備（トークンキャッシュ付き）
+
+setup_test_data.py の create_test_users() は1人ずつ作成し、422 のたびにログインし直します。
+create_test_data_authenticated.py は毎回対話的にログインします。
+このモジュールは多数のテストユーザーを並列に「作成または検索」し、
+アクセストークン / リフレッシュトークンを有効期限つきでディスクにキャッシュします。
+
+ユーザーごとの処理（上から順に、成功した時点で終わり）:
+  1. キャッシュのトークンが --refresh-margin 秒以上有効 → 通信なし
+  2. リフレッシュトークンで更新（grant_type=refresh_token）
+  3. パスワードでログイン（grant_type=password）
+  4. 管理APIで作成（POST /auth/v1/admin/users）してログイン
+  5. 既に登録済みでパスワードが違う（fixture_factory.py のユーザーなど）→
+     管理APIでIDを引いてパスワードを設定し直してログイン
+
+2回目以降はほとんどのユーザーが 1 で済むので、複数ユーザーの負荷スクリプトが一瞬で起動します。
+キャッシュは .cache/auth_tokens.json（Supabase URL とメールアドレスごと、パスワードは保存しない）。
+
+使い方:
+  python3 scripts/user_provisioning.py --count 200                # loadtest0000@example.com 〜 を準備
+  python3 scripts/user_provisioning.py --count 50 --workers 32 --prefix bench
+  python3 scripts/user_provisioning.py --clear-cache
+
+  # 負荷スクリプトから
+  from user_provisioning import provision_users
+  users = provision_users(50)
+  requests.get(url, headers=users[0].headers)
+
+必要な環境変数（または .env）:
+  SUPABASE_URL: SupabaseプロジェクトURL
+  SUPABASE_SERVICE_ROLE_KEY: Service Role Key（ユーザー作成用）
+  SUPABASE_ANON_KEY: anon key（省略時は Service Role Key を apikey に使う）
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from adaptive_concurrency import AdaptiveLimiter
+from ops_env import PROJECT_ROOT, load_env
+from ops_metrics import phase
+
+try:
+    import requests
+except ImportError:
+    print("❌ requestsモジュールがインストールされていません")
+    print("以下のコマンドでインストールしてください:")
+    print("  pip3 install requests")
+    sys.exit(1)
+
+CACHE_PATH = PROJECT_ROOT / '.cache' / 'auth_tokens.json'
+DEFAULT_PASSWORD = 'test1234'
+
+
+class ProvisionError(Exception):
+    pass
+
+
+@dataclass
+class ProvisionedUser:
+    email: str
+    user_id: str
+    access_token: str
+    refresh_token: str
+    expires_at: float
+    anon_key: str = field(default='', repr=False)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """このユーザーとしてREST APIを呼ぶときのヘッダー"""
+        return {
+            'apikey': self.anon_key,
+            'Authorization': f"Bearer {self.access_token}",
+            'Content-Type': 'application/json',
+        }
+
+    def valid_for(self, seconds: float) -> bool:
+        return self.expires_at - time.time() > seconds
+
+
+CACHE_FIELDS = {'email', 'user_id', 'access_token', 'refresh_token', 'expires_at'}
+
+
+class TokenCache:
+    """Supabase URL + メールアドレス → トークン（ファイルは0600で保存）"""
+
+    def __init__(self, path: Path, base_url: str):
+        self.path = path
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        try:
+            self.entries = json.loads(path.read_text(encoding='utf-8')).get('users', {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            self.entries = {}
+
+    def key(self, email: str) -> str:
+        return f"{self.base_url}|{email.lower()}"
+
+    def get(self, email: str) -> Optional[Dict]:
+        with self.lock:
+            return self.entries.get(self.key(email))
+
+    def put(self, user: ProvisionedUser):
+        entry = {k: v for k, v in asdict(user).items() if k != 'anon_key'}
+        with self.lock:
+            self.entries[self.key(user.email)] = entry
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'users': self.entries}, f, indent=1)
+            tmp.replace(self.path)
+            self.dirty = False
+
+
+@dataclass
+class ProvisionStats:
+    cached: int = 0
+    refreshed: int = 0
+    logged_in: int = 0
+    created: int = 0
+    reset_password: int = 0
+    failed: int = 0
+
+
+class UserProvisioner:
+    def __init__(self, base_url: str, service_key: str, anon_key: str, password: str = DEFAULT_PASSWORD,
+                 workers: int = 16, refresh_margin: float = 300, cache_path: Path = CACHE_PATH):
+        self.base_url = base_url.rstrip('/')
+        self.auth_url = f"{self.base_url}/auth/v1"
+        self.service_key = service_key
+        self.anon_key = anon_key or service_key
+        self.password = password
+        self.workers = workers
+        # 認証APIのレート制限に合わせて並列数を自動調整する（workers は上限）
+        self.limiter = AdaptiveLimiter(initial=min(4, workers), max_limit=workers, report_interval=None,
+                                       label='認証API')
+        self.refresh_margin = refresh_margin
+        self.cache = TokenCache(cache_path, self.base_url)
+        self.stats = ProvisionStats()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._directory: Optional[Dict[str, str]] = None
+        self._directory_lock = threading.Lock()
+
+    # ---------------- HTTP ----------------
+
+    @property
+    def session(self) -> 'requests.Session':
+        """スレッドごとの Session（接続を使い回す）"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, method: str, path: str, service: bool = False, **kwargs) -> 'requests.Response':
+        key = self.service_key if service else self.anon_key
+        headers = {'apikey': key, 'Content-Type': 'application/json'}
+        if service:
+            headers['Authorization'] = f"Bearer {self.service_key}"
+        return self.limiter.call(self.session.request, method, f"{self.auth_url}{path}",
+                                 headers=headers, timeout=30, **kwargs)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
+
+    def _session_user(self, email: str, data: Dict) -> ProvisionedUser:
+        expires_at = data.get('expires_at') or time.time() + float(data.get('expires_in') or 3600)
+        return ProvisionedUser(email, data['user']['id'], data['access_token'], data['refresh_token'],
+                        float(expires_at), self.anon_key)
+
+    # ---------------- 認証 ----------------
+
+    def _refresh(self, email: str, refresh_token: str) -> Optional[ProvisionedUser]:
+        response = self._request('POST', '/token?grant_type=refresh_token', json={'refresh_token': refresh_token})
+        return self._session_user(email, response.json()) if response.status_code == 200 else None
+
+    def _login(self, email: str) -> Optional[ProvisionedUser]:
+        response = self._request('POST', '/token?grant_type=password',
+                                 json={'email': email, 'password': self.password})
+        return self._session_user(email, response.json()) if response.status_code == 200 else None
+
+    def _create(self, email: str) -> bool:
+        """作成できたら True、既に登録済みなら False"""
+        response = self._request('POST', '/admin/users', service=True,
+                                 json={'email': email, 'password': self.password, 'email_confirm': True})
+        if response.status_code in (200, 201):
+            return True
+        if response.status_code == 422 or 'already' in response.text:
+            return False
+        raise ProvisionError(f"ユーザー作成失敗 {response.status_code}: {response.text[:200]}")
+
+    def _lookup_id(self, email: str) -> Optional[str]:
+        """管理APIのユーザー一覧からIDを引く（一覧は1回だけ取得して使い回す）"""
+        with self._directory_lock:
+            if self._directory is None:
+                directory, page = {}, 1
+                while True:
+                    response = self._request('GET', f"/admin/users?page={page}&per_page=1000", service=True)
+                    if response.status_code != 200:
+                        raise ProvisionError(f"ユーザー一覧の取得失敗 {response.status_code}: {response.text[:200]}")
+                    users = response.json().get('users', [])
+                    directory.update({(u.get('email') or '').lower(): u['id'] for u in users})
+                    if len(users) < 1000:
+                        break
+                    page += 1
+                self._directory = directory
+            return self._directory.get(email.lower())
+
+    def _reset_password(self, email: str) -> bool:
+        user_id = self._lookup_id(email)
+        if not user_id:
+            return False
+        response = self._request('PUT', f"/admin/users/{user_id}", service=True,
+                                 json={'password': self.password, 'email_confirm': True})
+        return response.status_code == 200
+
+    def ensure(self, email: str) -> ProvisionedUser:
+        """1人分のトークンを用意する（キャッシュ → リフレッシュ → ログイン → 作成 → パスワード再設定）"""
+        cached = self.cache.get(email)
+        if cached and set(cached) == CACHE_FIELDS:
+            user = ProvisionedUser(anon_key=self.anon_key, **cached)
+            if user.valid_for(self.refresh_margin):
+                self._count('cached')
+                return user
+            refreshed = self._refresh(email, user.refresh_token)
+            if refreshed:
+                self._count('refreshed')
+                self.cache.put(refreshed)
+                return refreshed
+
+        user = self._login(email)
+        if user:
+            self._count('logged_in')
+        elif self._create(email):
+            user = self._login(email)
+            self._count('created')
+        elif self._reset_password(email):
+            user = self._login(email)
+            self._count('reset_password')
+        if user is None:
+            raise ProvisionError(f"{email}: ログインできませんでした")
+        self.cache.put(user)
+        return user
+
+    def provision(self, emails: List[str]) -> Tuple[List[ProvisionedUser], List[Tuple[str, str]]]:
+        """並列に準備する（戻り値は準備できたユーザーと、失敗したメールアドレスと理由）"""
+        def task(email: str):
+            try:
+                return self.ensure(email), None
+            except (ProvisionError, requests.RequestException, KeyError, ValueError) as e:
+                self._count('failed')
+                return None, str(e)
+
+        try:
+            with phase('ユーザー準備'), ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                results = list(pool.map(task, emails))
+        finally:
+            self.cache.save()
+        users = [user for user, _ in results if user]
+        failures = [(email, error) for email, (user, error) in zip(emails, results) if user is None]
+        return users, failures
+
+
+def user_emails(count: int, prefix: str = 'loadtest', domain: str = 'example.com') -> List[str]:
+    return [f"{prefix}{i:04d}@{domain}" for i in range(count)]
+
+
+def create_provisioner(**kwargs) -> UserProvisioner:
+    """環境変数（.env）から UserProvisioner を作る"""
+    env = load_env()
+    url = env.get('SUPABASE_URL')
+    service_key = env.get('SUPABASE_SERVICE_ROLE_KEY')
+    if not url or not service_key:
+        print("❌ エラー: SUPABASE_URLまたはSUPABASE_SERVICE_ROLE_KEYが設定されていません")
+        print("💡 .envファイルに以下を設定してください:")
+        print("   SUPABASE_URL=your_supabase_url")
+        print("   SUPABASE_SERVICE_ROLE_KEY=your_service_role_key")
+        sys.exit(1)
+    return UserProvisioner(url, service_key, env.get('SUPABASE_ANON_KEY') or '', **kwargs)
+
+
+def provision_users(count: int, prefix: str = 'loadtest', domain: str = 'example.com', **kwargs) -> List[ProvisionedUser]:
+    """負荷スクリプト用: count人分のログイン済みユーザーを返す（1人でも失敗したら ProvisionError）"""
+    users, failures = create_provisioner(**kwargs).provision(user_emails(count, prefix, domain))
+    if failures:
+        raise ProvisionError(f"{len(failures)}人の準備に失敗しました（例: {failures[0][0]}: {failures[0][1]}）")
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description='負荷テスト用ユーザーの一括準備')
+    parser.add_argument('--count', type=int, default=10, help='準備するユーザー数')
+    parser.add_argument('--prefix', default='loadtest', help='メールアドレスの接頭辞')
+    parser.add_argument('--domain', default='example.com', help='メールアドレスのドメイン')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='テストユーザーのパスワード')
+    parser.add_argument('--workers', type=int, default=16, help='最大並列数（実際の並列数は応答を見て自動調整）')
+    parser.add_argument('--refresh-margin', type=float, default=300, help='残りがこの秒数未満なら更新する')
+    parser.add_argument('--clear-cache', action='store_true', help='トークンキャッシュを削除して終了')
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        CACHE_PATH.unlink(missing_ok=True)
+        print(f"🗑️  {CACHE_PATH} を削除しました")
+        return
+
+    provisioner = create_provisioner(password=args.password, workers=args.workers,
+                                     refresh_margin=args.refresh_margin)
+    emails = user_emails(args.count, args.prefix, args.domain)
+
+    print("=" * 60)
+    print(f"👥 テストユーザー準備: {len(emails)}人（並列 {args.workers}）")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    users, failures = provisioner.provision(emails)
+    elapsed = time.perf_counter() - started
+
+    for email, error in failures[:10]:
+        print(f"   ❌ {email}: {error}")
+    if len(failures) > 10:
+        print(f"   ...ほか {len(failures) - 10}件")
+
+    s = provisioner.stats
+    print("=" * 60)
+    print(f"✅ {len(users)}/{len(emails)}人 準備完了 ({elapsed:.2f}秒)")
+    print(f"   キャッシュ {s.cached} / リフレッシュ {s.refreshed} / ログイン {s.logged_in} / "
+          f"新規作成 {s.created} / パスワード再設定 {s.reset_password} / 失敗 {s.failed}")
+    if provisioner.limiter.completed:
+        print(f"   {provisioner.limiter.summary()}")
+    print("=" * 60)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+散歩ポイントの人気度ヒートマップ（ラスター）生成
+
+どこがよく歩かれているかの集計はどこにもなく、分析のたびに route_points を全件読み直しています。
+このスクリプトは前回の位置 (created_at, id) 以降に追加されたポイントだけを順に読み、
+Webメルカトルのタイル（256×256セル）単位のカウント配列に加算します。
+
+- 解像度は --zooms のズームごと（既定 11,13,15 ≒ 1セル 60m / 15m / 4m @ 35°N）
+- セルの値は「そのセルを通った散歩の数」（同じ散歩の点はセルごとに1回だけ数える。
+  記録間隔や立ち止まりで値が偏らないようにするため）。チャンクや実行をまたいでも
+  数えないよう、散歩ごとに数えたセルを保存しておく。最後の点から --walk-window 時間
+  より後に同じ散歩の点が届いた場合だけは、そのセルをもう一度数える
+- 精度が --accuracy-gate m を超える点は使わない（ナビエンジンの精度ゲートと同じ35m）
+- カウントは .cache/heatmap/ に npy で保存し、次回はそこに加算する。チャンクごとに
+  新しい世代のファイルへ書き、どの世代を使うかと水位を state.json の置き換え1回で
+  確定するので、途中で止まっても二重に数えない（確定前の世代は次回に捨てる）
+- 出力（--out 既定: build/heatmap）
+    tiles/{z}/{x}/{y}.png   … 地図タブ用のPNGタイル（今回値が変わったタイルだけ書き直す）
+    areas/{area_id}.npz     … エリアごとの切り出し（z{ズーム} の配列と左上セル位置）
+    manifest.json           … 水位・ズーム・エリアの範囲
+
+PNGの濃さは log(1+散歩数) / log(1+--saturation) で固定の尺度にしているので、
+新しいタイルを書いても他のタイルを描き直す必要はありません。
+018_route_points_created_at_index.sql の適用を推奨します。
+
+使い方:
+  python3 scripts/walk_heatmap.py                        # 前回以降のポイントを加算
+  python3 scripts/walk_heatmap.py --rebuild --zooms 12,14,16
+  python3 scripts/walk_heatmap.py --no-png --offline     # エリア配列だけ更新（ミラーは同期しない）
+
+必要な環境変数（または .env）:
+  DATABASE_URL: PostgreSQL接続文字列
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import struct
+import sys
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from geo_utils import parse_linestring, parse_point
+from local_mirror import open_mirror, sync_mirror
+from ops_env import PROJECT_ROOT, connect, resolve_dsn
+from pin_cluster_tiles import project
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ numpyモジュールがインストールされていません")
+    print("以下のコマンドでインストールしてください:")
+    print("  pip3 install numpy")
+    sys.exit(1)
+
+STATE_DIR = PROJECT_ROOT / '.cache' / 'heatmap'
+DEFAULT_OUT = PROJECT_ROOT / 'build' / 'heatmap'
+TILE_CELLS = 256
+ZERO_UUID = '00000000-0000-0000-0000-000000000000'
+# (ズーム, px, py) を1つの int64 にまとめる（ズーム20でも px, py は28ビットに収まる）
+CELL_BITS = 28
+CELL_MASK = (1 << CELL_BITS) - 1
+
+# 散歩ポイントのテーブル（先に見つかったもの）
+POINT_TABLES = ['route_points', 'daily_walk_points']
+
+TileKey = Tuple[int, int, int]
+
+
+@dataclass
+class HeatmapState:
+    table: Optional[str] = None
+    zooms: List[int] = field(default_factory=list)
+    last_created_at: Optional[str] = None
+    last_id: Optional[str] = None
+    points: int = 0
+    generation: int = 0
+    tiles: Dict[str, int] = field(default_factory=dict)  # 'z/x/y' → そのタイルの確定済み世代
+
+    @classmethod
+    def load(cls) -> 'HeatmapState':
+        try:
+            return cls(**json.loads((STATE_DIR / 'state.json').read_text(encoding='utf-8')))
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            return cls()
+
+    def save(self):
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = STATE_DIR / 'state.tmp'
+        tmp.write_text(json.dumps(self.__dict__, indent=2), encoding='utf-8')
+        tmp.replace(STATE_DIR / 'state.json')
+
+
+class TileStore:
+    """ズーム・タイルごとの uint32 カウント配列（変更したタイルだけ新しい世代のファイルに書く）
+
+    どのタイルがどの世代かは state.json（HeatmapState.tiles）が持ち、そこに載っていない
+    世代のファイルは確定前に止まった書き込みとして無視する。
+    """
+
+    def __init__(self, root: Path, generations: Dict[str, int]):
+        self.root = root
+        self.generations: Dict[TileKey, int] = {
+            tuple(int(v) for v in key.split('/')): gen for key, gen in generations.items()
+        }
+        self.tiles: Dict[TileKey, 'np.ndarray'] = {}
+        self.dirty: Set[TileKey] = set()
+
+    def path(self, key: TileKey, generation: int) -> Path:
+        z, x, y = key
+        return self.root / f"z{z}" / f"{x}_{y}.{generation}.npy"
+
+    def has(self, key: TileKey) -> bool:
+        return key in self.generations or key in self.tiles
+
+    def get(self, key: TileKey) -> 'np.ndarray':
+        tile = self.tiles.get(key)
+        if tile is None:
+            generation = self.generations.get(key)
+            if generation is None:
+                tile = np.zeros((TILE_CELLS, TILE_CELLS), dtype=np.uint32)
+            else:
+                tile = np.load(self.path(key, generation))
+            self.tiles[key] = tile
+        return tile
+
+    def add(self, key: TileKey, counts: 'np.ndarray'):
+        self.get(key)[...] += counts.reshape(TILE_CELLS, TILE_CELLS).astype(np.uint32)
+        self.dirty.add(key)
+
+    def flush(self, generation: int) -> List[Path]:
+        """変更したタイルを generation のファイルに書き、確定後に消してよい古いファイルを返す"""
+        replaced = []
+        for key in self.dirty:
+            path = self.path(key, generation)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.stem + '.tmp.npy')
+            np.save(tmp, self.tiles[key])
+            os.replace(tmp, path)
+            previous = self.generations.get(key)
+            if previous is not None and previous != generation:
+                replaced.append(self.path(key, previous))
+            self.generations[key] = generation
+        self.dirty.clear()
+        return replaced
+
+    def manifest(self) -> Dict[str, int]:
+        return {f"{z}/{x}/{y}": gen for (z, x, y), gen in sorted(self.generations.items())}
+
+    def sweep(self):
+        """確定済みの世代に載っていないファイル（前回途中で止まった書き込み）を消す"""
+        current = {self.path(key, gen) for key, gen in self.generations.items()}
+        for path in self.root.glob('z*/*.npy'):
+            if path not in current:
+                path.unlink()
+
+    def keys(self, zoom: int) -> List[TileKey]:
+        return [key for key in self.generations if key[0] == zoom]
+
+
+class WalkCells:
+    """散歩ごとに、すでに数えたセル（ズーム込みの int64）と最後に見た created_at"""
+
+    def __init__(self):
+        self.cells: Dict[str, 'np.ndarray'] = {}
+        self.last_seen: Dict[str, str] = {}
+
+    @staticmethod
+    def path(root: Path, generation: int) -> Path:
+        return root / f"walks.{generation}.npz"
+
+    @classmethod
+    def load(cls, root: Path, generation: int) -> 'WalkCells':
+        seen = cls()
+        path = cls.path(root, generation)
+        if not path.exists():
+            return seen
+        with np.load(path) as data:
+            offsets = data['offsets']
+            for i, (walk, last_seen) in enumerate(zip(data['ids'], data['last_seen'])):
+                seen.cells[str(walk)] = data['cells'][offsets[i]:offsets[i + 1]]
+                seen.last_seen[str(walk)] = str(last_seen)
+        return seen
+
+    def add(self, walk: str, cells: 'np.ndarray', last_seen: str) -> 'np.ndarray':
+        """まだ数えていないセルの位置（bool配列）を返し、数えたことを記録する"""
+        previous = self.cells.get(walk)
+        fresh = np.ones(len(cells), dtype=bool) if previous is None else ~np.isin(cells, previous)
+        self.cells[walk] = cells if previous is None else np.union1d(previous, cells)
+        self.last_seen[walk] = max(last_seen, self.last_seen.get(walk, last_seen))
+        return fresh
+
+    def prune(self, before: str):
+        """最後の点が before より前の散歩を忘れる（もう点は増えないとみなす）"""
+        for walk in [w for w, last in self.last_seen.items() if last < before]:
+            del self.cells[walk], self.last_seen[walk]
+
+    def save(self, root: Path, generation: int):
+        walks = sorted(self.cells)
+        arrays = [self.cells[w] for w in walks]
+        offsets = np.concatenate([[0], np.cumsum([len(a) for a in arrays], dtype=np.int64)]).astype(np.int64)
+        root.mkdir(parents=True, exist_ok=True)
+        tmp = root / f"walks.{generation}.tmp.npz"
+        np.savez(tmp, ids=np.array(walks, dtype=str), last_seen=np.array([self.last_seen[w] for w in walks], dtype=str),
+                 offsets=offsets, cells=np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64))
+        os.replace(tmp, self.path(root, generation))
+
+    @classmethod
+    def sweep(cls, root: Path, generation: int):
+        for path in root.glob('walks.*.npz'):
+            if path != cls.path(root, generation):
+                path.unlink()
+
+
+def accumulate(store: TileStore, seen: WalkCells, walk_ids: 'np.ndarray', lat: 'np.ndarray', lon: 'np.ndarray',
+               zooms: List[int], last_seen: str) -> Set[TileKey]:
+    """ポイントをズームごとのセルに量子化し、(散歩, セル) の重複を除いてタイルに加算
+
+    前のチャンク・前回までの実行で数えた (散歩, セル) は seen で除く。
+    """
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = lon / 360 + 0.5
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - 0.25 * np.log((1 + sin_lat) / (1 - sin_lat)) / math.pi
+    walks, walk_idx = np.unique(walk_ids, return_inverse=True)
+
+    codes = []
+    for zoom in zooms:
+        size = TILE_CELLS << zoom
+        px = np.clip((x * size).astype(np.int64), 0, size - 1)
+        py = np.clip((y * size).astype(np.int64), 0, size - 1)
+        codes.append(np.column_stack([walk_idx, (zoom << (2 * CELL_BITS)) | (px << CELL_BITS) | py]))
+    # 同じ散歩が同じセルに何点あっても1回（散歩順・セル順に並ぶ）
+    pairs = np.unique(np.concatenate(codes), axis=0)
+    fresh = np.empty(len(pairs), dtype=bool)
+    bounds = np.searchsorted(pairs[:, 0], np.arange(len(walks) + 1))
+    for i, walk in enumerate(walks):
+        begin, end = bounds[i], bounds[i + 1]
+        fresh[begin:end] = seen.add(str(walk), pairs[begin:end, 1], last_seen)
+    cells = pairs[fresh, 1]
+
+    touched = set()
+    for zoom in zooms:
+        selected = cells[(cells >> (2 * CELL_BITS)) == zoom]
+        if not len(selected):
+            continue
+        px, py = (selected >> CELL_BITS) & CELL_MASK, selected & CELL_MASK
+        tile_key = (px >> 8) * (1 << zoom) + (py >> 8)
+        local = (py & 255) * TILE_CELLS + (px & 255)
+        order = np.argsort(tile_key, kind='stable')
+        tile_key, local = tile_key[order], local[order]
+        bounds = np.flatnonzero(np.concatenate([[True], tile_key[1:] != tile_key[:-1], [True]]))
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            tx, ty = divmod(int(tile_key[begin]), 1 << zoom)
+            key = (zoom, tx, ty)
+            store.add(key, np.bincount(local[begin:end], minlength=TILE_CELLS * TILE_CELLS))
+            touched.add(key)
+    return touched
+
+
+# ------------------------------------------------------------
+# 取り込み
+# ------------------------------------------------------------
+
+def resolve_table(conn) -> Optional[Tuple[str, bool]]:
+    """ポイントのテーブル名と accuracy 列の有無"""
+    for table in POINT_TABLES:
+        columns = {row[0] for row in conn.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = 'public' AND table_name = %s",
+            (table,),
+        ).fetchall()}
+        if {'route_id', 'latitude', 'longitude', 'created_at'} <= columns:
+            return table, 'accuracy' in columns
+    return None
+
+
+def commit(state: HeatmapState, store: TileStore, seen: WalkCells, cursor: Tuple[str, str], points: int):
+    """新しい世代のタイル・散歩セルを書いてから、state.json の置き換えで水位と一緒に確定する"""
+    generation = state.generation + 1
+    replaced = store.flush(generation)
+    seen.save(STATE_DIR, generation)
+    state.generation, state.tiles = generation, store.manifest()
+    state.last_created_at, state.last_id = cursor
+    state.points += points
+    state.save()
+    # ここから下は確定後の片付け（止まっても次回の sweep で消える）
+    for path in replaced:
+        path.unlink(missing_ok=True)
+    WalkCells.sweep(STATE_DIR, generation)
+
+
+def ingest(conn, state: HeatmapState, store: TileStore, seen: WalkCells, table: str, has_accuracy: bool,
+           accuracy_gate: float, chunk_size: int, lag_seconds: int, walk_window_hours: float) -> Tuple[int, Set[TileKey]]:
+    upper = conn.execute("SELECT NOW() - make_interval(secs => %s)", (lag_seconds,)).fetchone()[0]
+    cursor = (state.last_created_at or '-infinity', state.last_id or ZERO_UUID)
+    accuracy = f"AND (accuracy IS NULL OR accuracy <= {float(accuracy_gate)})" if has_accuracy else ""
+    # 精度で除いた点も含めて (created_at, id) 順に読むので、水位は最後に返った行まで進めてよい
+    total = 0
+    touched: Set[TileKey] = set()
+
+    while True:
+        started = time.perf_counter()
+        rows = conn.execute(
+            f"""
+            SELECT id, created_at, route_id, latitude, longitude FROM {table}
+            WHERE (created_at, id) > (%s::timestamptz, %s::uuid) AND created_at <= %s
+              AND latitude IS NOT NULL AND longitude IS NOT NULL {accuracy}
+            ORDER BY created_at, id LIMIT %s
+            """,
+            (*cursor, upper, chunk_size),
+        ).fetchall()
+        if not rows:
+            break
+        cursor = (rows[-1][1].isoformat(), str(rows[-1][0]))
+        seen_at = rows[-1][1].astimezone(timezone.utc)
+        touched |= accumulate(
+            store,
+            seen,
+            np.array([str(r[2]) for r in rows], dtype=object),
+            np.array([float(r[3]) for r in rows]),
+            np.array([float(r[4]) for r in rows]),
+            state.zooms,
+            seen_at.isoformat(),
+        )
+        seen.prune((seen_at - timedelta(hours=walk_window_hours)).isoformat())
+        # カウント・散歩セル・水位を一緒に確定する（途中で止まっても二重に数えない）
+        commit(state, store, seen, cursor, len(rows))
+        total += len(rows)
+        print(f"   📥 {total:,}点（{len(rows) / max(time.perf_counter() - started, 1e-6):,.0f}行/秒）", end='\r')
+        if len(rows) < chunk_size:
+            break
+    print()
+    return total, touched
+
+
+# ------------------------------------------------------------
+# 出力
+# ------------------------------------------------------------
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(rgba: 'np.ndarray') -> bytes:
+    """RGBA（H×W×4, uint8）をPNGにする"""
+    height, width, _ = rgba.shape
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 9))
+            + _png_chunk(b'IEND', b''))
+
+
+def colorize(counts: 'np.ndarray', saturation: float) -> 'np.ndarray':
+    """散歩数 → 黄（少）〜赤（多）の半透明色"""
+    v = np.clip(np.log1p(counts.astype(np.float64)) / math.log1p(saturation), 0.0, 1.0)
+    rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 1] = (220 * (1 - v)).astype(np.uint8)
+    rgba[..., 2] = 0
+    rgba[..., 3] = np.where(counts > 0, (64 + 191 * v), 0).astype(np.uint8)
+    return rgba
+
+
+def write_png_tiles(store: TileStore, keys: Set[TileKey], out_dir: Path, saturation: float) -> int:
+    for z, x, y in keys:
+        dest = out_dir / 'tiles' / str(z) / str(x) / f"{y}.png"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + '.tmp')
+        tmp.write_bytes(encode_png(colorize(store.get((z, x, y)), saturation)))
+        os.replace(tmp, dest)
+    return len(keys)
+
+
+def area_extents(db, margin_m: float, default_radius_m: float) -> Dict[str, Tuple[float, float, float, float]]:
+    """エリアごとの範囲 (min_lat, min_lon, max_lat, max_lon)。公式ルートの範囲 + 余白、なければ中心から半径"""
+    coords: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+    route_columns = {row[1] for row in db.execute('PRAGMA table_info("official_routes")')}
+    if 'area_id' in route_columns:
+        wanted = [c for c in ('route_line', 'start_location', 'end_location') if c in route_columns]
+        for row in db.execute(f"SELECT area_id, {', '.join(wanted) or 'NULL'} FROM official_routes WHERE area_id IS NOT NULL"):
+            for column, value in zip(wanted, tuple(row)[1:]):
+                if not value:
+                    continue
+                if column == 'route_line':
+                    coords[row[0]].extend(parse_linestring(value))
+                else:
+                    point = parse_point(value)
+                    if point:
+                        coords[row[0]].append(point)
+
+    area_columns = {row[1] for row in db.execute('PRAGMA table_info("areas")')}
+    if 'center_location' in area_columns:
+        for area_id, center in db.execute("SELECT id, center_location FROM areas"):
+            point = parse_point(center) if center else None
+            if point and area_id not in coords:
+                coords[area_id] = [point]
+
+    extents = {}
+    for area_id, points in coords.items():
+        lats, lons = [p[0] for p in points], [p[1] for p in points]
+        margin = margin_m if len(points) > 1 else default_radius_m
+        dlat = margin / 111_320
+        dlon = dlat / max(math.cos(math.radians(sum(lats) / len(lats))), 0.01)
+        extents[area_id] = (min(lats) - dlat, min(lons) - dlon, max(lats) + dlat, max(lons) + dlon)
+    return extents
+
+
+def crop_area(store: TileStore, zoom: int, extent: Tuple[float, float, float, float]) -> Tuple['np.ndarray', int, int]:
+    """範囲を覆うセルをタイルから切り出す（配列と左上セルの全体座標）"""
+    size = TILE_CELLS << zoom
+    x0, y0 = project(extent[2], extent[1])  # 北西
+    x1, y1 = project(extent[0], extent[3])  # 南東
+    px0, py0 = int(x0 * size), int(y0 * size)
+    px1, py1 = min(int(x1 * size), size - 1), min(int(y1 * size), size - 1)
+    grid = np.zeros((py1 - py0 + 1, px1 - px0 + 1), dtype=np.uint32)
+    for tx in range(px0 >> 8, (px1 >> 8) + 1):
+        for ty in range(py0 >> 8, (py1 >> 8) + 1):
+            if not store.has((zoom, tx, ty)):
+                continue
+            tile = store.get((zoom, tx, ty))
+            gx0, gy0 = max(px0, tx << 8), max(py0, ty << 8)
+            gx1, gy1 = min(px1, (tx << 8) + 255), min(py1, (ty << 8) + 255)
+            grid[gy0 - py0:gy1 - py0 + 1, gx0 - px0:gx1 - px0 + 1] = \
+                tile[gy0 - (ty << 8):gy1 - (ty << 8) + 1, gx0 - (tx << 8):gx1 - (tx << 8) + 1]
+    return grid, px0, py0
+
+
+def write_area_grids(store: TileStore, zooms: List[int], extents: Dict[str, Tuple], out_dir: Path) -> Dict[str, Dict]:
+    area_dir = out_dir / 'areas'
+    area_dir.mkdir(parents=True, exist_ok=True)
+    summary = {}
+    for area_id, extent in sorted(extents.items()):
+        arrays, info = {}, {'extent': [round(v, 6) for v in extent], 'zooms': {}}
+        for zoom in zooms:
+            grid, px0, py0 = crop_area(store, zoom, extent)
+            arrays[f"z{zoom}"] = grid
+            arrays[f"z{zoom}_origin"] = np.array([px0, py0], dtype=np.int64)
+            info['zooms'][str(zoom)] = {'shape': list(grid.shape), 'origin': [px0, py0],
+                                        'max': int(grid.max()) if grid.size else 0,
+                                        'cells': int(np.count_nonzero(grid))}
+        tmp = area_dir / f"{area_id}.tmp.npz"
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, area_dir / f"{area_id}.npz")
+        summary[area_id] = info
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='散歩ポイントの人気度ヒートマップ生成')
+    parser.add_argument('--dsn', help='PostgreSQL接続文字列（省略時はDATABASE_URL）')
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT, help='出力ディレクトリ')
+    parser.add_argument('--zooms', default='11,13,15', help='集計するズーム（カンマ区切り）')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='1回に読み込むポイント数')
+    parser.add_argument('--accuracy-gate', type=float, default=35.0, help='これより精度の悪い点は使わない（m）')
+    parser.add_argument('--lag-seconds', type=int, default=300, help='書き込み途中の散歩を避ける遅延（秒）')
+    parser.add_argument('--walk-window', type=float, default=24.0,
+                        help='最後の点からこの時間（時間）は散歩ごとの数えたセルを覚えておく')
+    parser.add_argument('--saturation', type=float, default=50.0, help='PNGで最も濃くなる散歩数')
+    parser.add_argument('--area-margin', type=float, default=1000.0, help='エリア範囲の余白（m）')
+    parser.add_argument('--area-radius', type=float, default=3000.0, help='ルートのないエリアの半径（m）')
+    parser.add_argument('--no-png', action='store_true', help='PNGタイルを書かない')
+    parser.add_argument('--rebuild', action='store_true', help='カウントを捨てて最初から集計')
+    parser.add_argument('--offline', action='store_true', help='ミラーを同期せずにエリア範囲を求める')
+    args = parser.parse_args()
+
+    try:
+        zooms = sorted({int(z) for z in args.zooms.split(',') if z.strip()})
+    except ValueError:
+        parser.error('--zooms は整数のカンマ区切りで指定してください')
+    if not zooms or min(zooms) < 0 or max(zooms) > 20:
+        parser.error('--zooms は 0〜20 の範囲で指定してください')
+
+    state = HeatmapState.load()
+    if args.rebuild or state.zooms != zooms:
+        if state.zooms and state.zooms != zooms and not args.rebuild:
+            print(f"❌ 保存済みのズーム {state.zooms} と異なります。--rebuild を付けて作り直してください")
+            sys.exit(1)
+        shutil.rmtree(STATE_DIR, ignore_errors=True)
+        shutil.rmtree(args.out / 'tiles', ignore_errors=True)
+        state = HeatmapState(zooms=zooms)
+    elif state.last_created_at and not state.generation:
+        print("❌ 保存済みのカウントは古い形式です。--rebuild を付けて作り直してください")
+        sys.exit(1)
+
+    dsn = resolve_dsn(args.dsn)
+    if not dsn:
+        print("❌ エラー: DATABASE_URL環境変数が設定されていません")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"🔥 散歩ヒートマップ（ズーム {', '.join(map(str, zooms))}）")
+    print("=" * 60)
+    started = time.perf_counter()
+    store = TileStore(STATE_DIR, state.tiles)
+    store.sweep()
+    seen = WalkCells.load(STATE_DIR, state.generation)
+    conn = connect(dsn)
+    try:
+        resolved = resolve_table(conn)
+        if resolved is None:
+            print("❌ 散歩ポイントのテーブル（route_points / daily_walk_points）が見つかりません")
+            sys.exit(1)
+        table, has_accuracy = resolved
+        if state.table not in (None, table):
+            print(f"❌ 前回は {state.table} を集計しています。--rebuild を付けて作り直してください")
+            sys.exit(1)
+        state.table = table
+        resume = f"（{state.last_created_at} の次から）" if state.last_created_at else "（初回）"
+        print(f"\n📊 {table}{resume}")
+        added, touched = ingest(conn, state, store, seen, table, has_accuracy, args.accuracy_gate,
+                                args.chunk_size, args.lag_seconds, args.walk_window)
+    except KeyboardInterrupt:
+        print("\n⏹️  中断しました。再実行すると保存済みの位置から再開します")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    if args.rebuild and not args.no_png:
+        touched = {key for zoom in zooms for key in store.keys(zoom)}
+    written = 0 if args.no_png else write_png_tiles(store, touched, args.out, args.saturation)
+
+    if not args.offline:
+        sync_mirror(tables=['areas', 'official_routes'], prune=True)
+    extents = area_extents(open_mirror(), args.area_margin, args.area_radius)
+    areas = write_area_grids(store, zooms, extents, args.out)
+
+    manifest_tmp = args.out / 'manifest.tmp'
+    manifest_tmp.write_text(json.dumps({
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'table': state.table,
+        'zooms': zooms,
+        'points': state.points,
+        'watermark': [state.last_created_at, state.last_id],
+        'saturation': args.saturation,
+        'areas': areas,
+    }, ensure_ascii=False, indent=1), encoding='utf-8')
+    os.replace(manifest_tmp, args.out / 'manifest.json')
+
+    print("=" * 60)
+    print(f"✅ 新しいポイント {added:,}点 / 累計 {state.points:,}点 ({time.perf_counter() - started:.1f}秒)")
+    print(f"   更新タイル {len(touched)}枚 / PNG書込 {written}枚 / エリア配列 {len(areas)}件 → {args.out}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,12 @@ WanWalk テストデータ自動セットアップスクリプト
 
 import requests
 import json
+import sys
 from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from stream_rows import StreamError, stream_rows
 
 # Supabase設定
 SUPABASE_URL = "https://jkpenklhrlbctebkpvax.supabase.co"
@@ -108,29 +113,27 @@ def delete_existing_data():
     for table in tables:
         print(f"\n🗑️  {table} テーブルをクリア中...")
         
-        # すべてのレコードを取得
-        response = requests.get(
-            f"{REST_URL}/{table}?select=*",
-            headers=headers_anon
-        )
+        # IDだけを1件ずつ受け取る（削除しながらページを進めると行を飛ばすので、先にIDを集める）
+        try:
+            record_ids = [record["id"] for record in stream_rows(
+                f"{REST_URL}/{table}", headers_anon, params={"select": "id"}
+            )]
+        except StreamError as e:
+            print(f"   ⚠️  取得エラー: {e}")
+            continue
         
-        if response.status_code == 200:
-            records = response.json()
-            print(f"   削除対象: {len(records)}件")
-            
-            # 各レコードを削除
-            for record in records:
-                if "id" in record:
-                    del_response = requests.delete(
-                        f"{REST_URL}/{table}?id=eq.{record['id']}",
-                        headers=headers_anon
-                    )
-                    if del_response.status_code not in [200, 204]:
-                        print(f"   ⚠️  削除エラー: {del_response.text}")
-            
-            print(f"   ✅ クリア完了")
-        else:
-            print(f"   ⚠️  取得エラー: {response.status_code}")
+        print(f"   削除対象: {len(record_ids)}件")
+        
+        # 各レコードを削除
+        for record_id in record_ids:
+            del_response = requests.delete(
+                f"{REST_URL}/{table}?id=eq.{record_id}",
+                headers=headers_anon
+            )
+            if del_response.status_code not in [200, 204]:
+                print(f"   ⚠️  削除エラー: {del_response.text}")
+        
+        print(f"   ✅ クリア完了")
 
 def insert_test_data(user_ids):
     """テストデータを投入"""
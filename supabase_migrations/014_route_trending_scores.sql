@@ -0,0 +1,231 @@
+-- =====================================================
+-- 人気急上昇ルートの事前集計（ローリングカウンター）
+-- =====================================================
+-- 目的: get_trending_routes が呼ばれるたびに直近7日分の route_pins を
+--       全公式ルートについて数え直していたのをやめ、バックグラウンドジョブ
+--       （scripts/refresh_trending_routes.py / pg_cron）で増分集計した結果を読む
+--
+-- 構成:
+--   route_activity_daily   … ルート×日(JST)ごとのピン数・散歩数
+--   route_trending_scores  … ルートごとの直近N日の合計とスコア（ランキング用インデックス付き）
+--   maintenance_watermarks … 増分処理済みの created_at 位置
+
+-- ============================================================
+-- 1. テーブル
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS route_activity_daily (
+  route_id UUID NOT NULL REFERENCES official_routes ON DELETE CASCADE,
+  activity_date DATE NOT NULL,
+  pins_count INTEGER NOT NULL DEFAULT 0,
+  walks_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (route_id, activity_date)
+);
+
+CREATE INDEX IF NOT EXISTS route_activity_daily_date_idx ON route_activity_daily (activity_date);
+
+CREATE TABLE IF NOT EXISTS route_trending_scores (
+  route_id UUID PRIMARY KEY REFERENCES official_routes ON DELETE CASCADE,
+  recent_pins_count INTEGER NOT NULL DEFAULT 0,
+  recent_walks_count INTEGER NOT NULL DEFAULT 0,
+  trending_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS route_trending_scores_score_idx
+  ON route_trending_scores (trending_score DESC, recent_pins_count DESC);
+
+CREATE TABLE IF NOT EXISTS maintenance_watermarks (
+  job_name TEXT PRIMARY KEY,
+  last_created_at TIMESTAMPTZ NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- 増分取得用（route_pins は route_pins_created_at_idx が既存）
+CREATE INDEX IF NOT EXISTS route_walks_created_at_idx ON route_walks (created_at);
+
+ALTER TABLE route_activity_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE route_trending_scores ENABLE ROW LEVEL SECURITY;
+ALTER TABLE maintenance_watermarks ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Trending scores are viewable by everyone" ON route_trending_scores;
+CREATE POLICY "Trending scores are viewable by everyone"
+  ON route_trending_scores FOR SELECT
+  USING (true);
+
+-- ============================================================
+-- 2. 増分集計関数
+-- ============================================================
+-- p_window_days    : 集計対象の日数（従来の get_trending_routes は7日）
+-- p_half_life_days : 0以下なら減衰なし。正の値なら日ごとに半減期で重み付け
+-- p_walk_weight    : 散歩1回をピン何個分として数えるか（0なら従来どおりピン数のみ）
+-- p_lag            : コミット遅延で取りこぼさないよう、直近この時間分は次回に回す
+-- p_rebuild        : TRUE なら日次集計と水位を捨てて窓全体から作り直す
+
+CREATE OR REPLACE FUNCTION refresh_route_trending_scores(
+  p_window_days INT DEFAULT 7,
+  p_half_life_days DOUBLE PRECISION DEFAULT 0,
+  p_walk_weight DOUBLE PRECISION DEFAULT 0,
+  p_lag INTERVAL DEFAULT INTERVAL '1 minute',
+  p_rebuild BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_today DATE := (NOW() AT TIME ZONE 'Asia/Tokyo')::DATE;
+  v_window_start DATE := v_today - (p_window_days - 1);
+  v_window_start_ts TIMESTAMPTZ := v_window_start::TIMESTAMP AT TIME ZONE 'Asia/Tokyo';
+  v_upper TIMESTAMPTZ := NOW() - p_lag;
+  v_pins_from TIMESTAMPTZ;
+  v_walks_from TIMESTAMPTZ;
+  v_new_pins INT := 0;
+  v_new_walks INT := 0;
+  v_pruned INT := 0;
+  v_updated INT := 0;
+BEGIN
+  IF p_rebuild THEN
+    DELETE FROM route_activity_daily;
+    DELETE FROM maintenance_watermarks WHERE job_name LIKE 'trending:%';
+  END IF;
+
+  SELECT GREATEST(last_created_at, v_window_start_ts) INTO v_pins_from
+  FROM maintenance_watermarks WHERE job_name = 'trending:route_pins';
+  v_pins_from := COALESCE(v_pins_from, v_window_start_ts);
+
+  SELECT GREATEST(last_created_at, v_window_start_ts) INTO v_walks_from
+  FROM maintenance_watermarks WHERE job_name = 'trending:route_walks';
+  v_walks_from := COALESCE(v_walks_from, v_window_start_ts);
+
+  -- 新しいピンを日次バケットに加算
+  WITH new_pins AS (
+    SELECT route_id, (created_at AT TIME ZONE 'Asia/Tokyo')::DATE AS activity_date, COUNT(*)::INT AS cnt
+    FROM route_pins
+    WHERE route_id IS NOT NULL
+      AND created_at > v_pins_from
+      AND created_at <= v_upper
+    GROUP BY 1, 2
+  ), upserted AS (
+    INSERT INTO route_activity_daily (route_id, activity_date, pins_count)
+    SELECT route_id, activity_date, cnt FROM new_pins
+    ON CONFLICT (route_id, activity_date)
+      DO UPDATE SET pins_count = route_activity_daily.pins_count + EXCLUDED.pins_count
+    RETURNING 1
+  )
+  SELECT COALESCE(SUM(cnt), 0)::INT INTO v_new_pins FROM new_pins;
+
+  -- 新しい散歩記録を日次バケットに加算（日付は walked_at 基準）
+  WITH new_walks AS (
+    SELECT route_id, (walked_at AT TIME ZONE 'Asia/Tokyo')::DATE AS activity_date, COUNT(*)::INT AS cnt
+    FROM route_walks
+    WHERE created_at > v_walks_from
+      AND created_at <= v_upper
+      AND walked_at >= v_window_start_ts
+    GROUP BY 1, 2
+  ), upserted AS (
+    INSERT INTO route_activity_daily (route_id, activity_date, walks_count)
+    SELECT route_id, activity_date, cnt FROM new_walks
+    ON CONFLICT (route_id, activity_date)
+      DO UPDATE SET walks_count = route_activity_daily.walks_count + EXCLUDED.walks_count
+    RETURNING 1
+  )
+  SELECT COALESCE(SUM(cnt), 0)::INT INTO v_new_walks FROM new_walks;
+
+  INSERT INTO maintenance_watermarks (job_name, last_created_at, updated_at)
+  VALUES ('trending:route_pins', v_upper, NOW()), ('trending:route_walks', v_upper, NOW())
+  ON CONFLICT (job_name)
+    DO UPDATE SET last_created_at = EXCLUDED.last_created_at, updated_at = EXCLUDED.updated_at;
+
+  -- 窓の外に出た日次バケットを削除
+  DELETE FROM route_activity_daily WHERE activity_date < v_window_start;
+  GET DIAGNOSTICS v_pruned = ROW_COUNT;
+
+  -- ルート×日数分の小さな集計からスコアを再計算（変化した行だけ更新）
+  WITH totals AS (
+    SELECT
+      r.id AS route_id,
+      COALESCE(SUM(d.pins_count), 0)::INT AS pins,
+      COALESCE(SUM(d.walks_count), 0)::INT AS walks,
+      COALESCE(SUM(
+        (d.pins_count + p_walk_weight * d.walks_count)
+        * CASE
+            WHEN p_half_life_days > 0 THEN POWER(0.5, (v_today - d.activity_date) / p_half_life_days)
+            ELSE 1
+          END
+      ), 0)::DOUBLE PRECISION AS score
+    FROM official_routes r
+    LEFT JOIN route_activity_daily d ON d.route_id = r.id
+    GROUP BY r.id
+  ), changed AS (
+    INSERT INTO route_trending_scores AS s (route_id, recent_pins_count, recent_walks_count, trending_score, updated_at)
+    SELECT route_id, pins, walks, score, NOW() FROM totals
+    ON CONFLICT (route_id) DO UPDATE
+      SET recent_pins_count = EXCLUDED.recent_pins_count,
+          recent_walks_count = EXCLUDED.recent_walks_count,
+          trending_score = EXCLUDED.trending_score,
+          updated_at = EXCLUDED.updated_at
+      WHERE (s.recent_pins_count, s.recent_walks_count, s.trending_score)
+        IS DISTINCT FROM (EXCLUDED.recent_pins_count, EXCLUDED.recent_walks_count, EXCLUDED.trending_score)
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INT INTO v_updated FROM changed;
+
+  RETURN jsonb_build_object(
+    'new_pins', v_new_pins,
+    'new_walks', v_new_walks,
+    'pruned_days', v_pruned,
+    'updated_routes', v_updated,
+    'watermark', v_upper
+  );
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE ALL ON FUNCTION refresh_route_trending_scores(INT, DOUBLE PRECISION, DOUBLE PRECISION, INTERVAL, BOOLEAN) FROM PUBLIC;
+
+COMMENT ON FUNCTION refresh_route_trending_scores IS '人気急上昇スコアを新着の route_pins / route_walks から増分更新';
+
+-- ============================================================
+-- 3. get_trending_routes を事前集計テーブル参照に置き換え
+-- ============================================================
+-- 戻り値の形は 006_phase4_history_functions.sql と同じ。
+-- 並び順は trending_score（既定ではピン数）→ total_pins。
+
+CREATE OR REPLACE FUNCTION get_trending_routes(
+  p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+  route_id UUID,
+  route_name TEXT,
+  area_name TEXT,
+  distance_meters FLOAT,
+  estimated_minutes INT,
+  difficulty_level TEXT,
+  recent_pins_count INT,
+  total_pins INT,
+  thumbnail_url TEXT,
+  features TEXT[]
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    r.id,
+    r.name,
+    a.name,
+    r.distance_meters,
+    r.estimated_minutes,
+    r.difficulty_level,
+    s.recent_pins_count,
+    r.total_pins,
+    a.thumbnail_url,
+    r.features
+  FROM route_trending_scores s
+  INNER JOIN official_routes r ON r.id = s.route_id
+  INNER JOIN areas a ON r.area_id = a.id
+  WHERE r.is_active = TRUE
+  ORDER BY s.trending_score DESC, s.recent_pins_count DESC, r.total_pins DESC
+  LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION get_trending_routes IS '人気急上昇中のルートを取得（route_trending_scores の事前集計を参照）';
+
+-- 初回集計（直近の窓だけを走査）
+SELECT refresh_route_trending_scores();
@@ -0,0 +1,34 @@
+-- =====================================================
+-- 標高プロファイル（獲得標高・下り・最大勾配）
+-- =====================================================
+-- 目的: 手入力の elevation_gain_meters に代えて、経路ポイントの標高から
+--       scripts/elevation_profile.py が計算した値を保存する
+--
+-- 追加する列（公式ルート・散歩記録の両方）:
+--   elevation_loss_meters … 下りの合計（m）
+--   max_grade_percent     … 最大勾配（%、上り下りの絶対値）
+--   elevation_profile     … ルート詳細画面用の間引いた断面 [[距離m, 標高m], ...]
+--
+-- 獲得標高は official_routes.elevation_gain_meters（環境により elevation_gain_m）を
+-- そのまま使い、散歩記録側には新しく追加します。
+
+ALTER TABLE official_routes
+  ADD COLUMN IF NOT EXISTS elevation_loss_meters NUMERIC(10, 2),
+  ADD COLUMN IF NOT EXISTS max_grade_percent NUMERIC(5, 1),
+  ADD COLUMN IF NOT EXISTS elevation_profile JSONB;
+
+-- 散歩記録（アプリは routes / route_points に保存。001 適用環境では daily_walks）
+ALTER TABLE IF EXISTS routes
+  ADD COLUMN IF NOT EXISTS elevation_gain_meters NUMERIC(10, 2),
+  ADD COLUMN IF NOT EXISTS elevation_loss_meters NUMERIC(10, 2),
+  ADD COLUMN IF NOT EXISTS max_grade_percent NUMERIC(5, 1),
+  ADD COLUMN IF NOT EXISTS elevation_profile JSONB;
+
+ALTER TABLE IF EXISTS daily_walks
+  ADD COLUMN IF NOT EXISTS elevation_gain_meters NUMERIC(10, 2),
+  ADD COLUMN IF NOT EXISTS elevation_loss_meters NUMERIC(10, 2),
+  ADD COLUMN IF NOT EXISTS max_grade_percent NUMERIC(5, 1),
+  ADD COLUMN IF NOT EXISTS elevation_profile JSONB;
+
+COMMENT ON COLUMN official_routes.elevation_profile IS '間引いた標高断面 [[距離m, 標高m], ...]（scripts/elevation_profile.py で更新）';
+COMMENT ON COLUMN official_routes.max_grade_percent IS '最大勾配（%）。50m区間の平滑化標高から算出';
@@ -0,0 +1,30 @@
+-- =====================================================
+-- 実測の所要時間（route_walks からの経験的モデル）
+-- =====================================================
+-- 目的: 手入力の estimated_minutes（3.0km/h 想定）に代えて、実際の散歩記録の
+--       所要時間の中央値・四分位を scripts/estimate_durations.py で保存する
+--
+-- 構成:
+--   route_duration_histogram … ルート×所要時間(分)ごとの散歩数。新しい散歩だけを加算する
+--                              （分単位の整数なので、このヒストグラムから分位点が正確に求まる）
+--   official_routes.duration_* … 計算結果
+--   maintenance_watermarks    … 'duration:route_walks' に加算済みの created_at 位置（014 で作成）
+
+CREATE TABLE IF NOT EXISTS route_duration_histogram (
+  route_id UUID NOT NULL REFERENCES official_routes ON DELETE CASCADE,
+  minutes INTEGER NOT NULL,
+  walks INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (route_id, minutes)
+);
+
+ALTER TABLE route_duration_histogram ENABLE ROW LEVEL SECURITY;
+
+ALTER TABLE official_routes
+  ADD COLUMN IF NOT EXISTS duration_p25_minutes INTEGER,
+  ADD COLUMN IF NOT EXISTS duration_median_minutes INTEGER,
+  ADD COLUMN IF NOT EXISTS duration_p75_minutes INTEGER,
+  ADD COLUMN IF NOT EXISTS duration_walks_count INTEGER,
+  ADD COLUMN IF NOT EXISTS duration_source TEXT
+    CHECK (duration_source IN ('walks', 'bucket'));
+
+COMMENT ON COLUMN official_routes.duration_median_minutes IS '実測の所要時間の中央値（分）。duration_source=bucket は同じ難易度・標高帯のペースからの推定';
@@ -0,0 +1,48 @@
+-- =====================================================
+-- 散歩記録と公式ルートの対応付け（マップマッチング結果）
+-- =====================================================
+-- 目的: 自由散歩（routes / route_points）がどの公式ルートを歩いたものかを
+--       scripts/match_walks_to_routes.py でバッチ判定して保存し、
+--       公式ルートの散歩数・完走率を実データから集計できるようにする
+--       official_routes.total_walks は route_walks（ナビで歩いた記録）とこのテーブルの完走（is_completed）の
+--       件数の合計で、match_walks_to_routes.py が結果の変わったルートを更新する（reconcile_counters.py も同じ定義）
+--       walk_id は routes / daily_walks のどちらかを指すため外部キーを張れない。削除された散歩の結果は
+--       match_walks_to_routes.py が実行のたびに消す
+--       完走数・完走率は official_routes に列を増やさず、下の official_route_walk_stats ビューで見る
+--
+-- 完走の判定はナビエンジン（lib/nav/route_nav_engine.dart）と同じ
+--   25m区画のカバレッジ ≥ complete_coverage（既定0.80）かつ ゴール goal_radius_m（既定50m）圏
+-- ただし精度の悪い点は、ナビエンジンのようにルートへ射影して区画を塗るのではなく、判定幅以内のときだけ塗る
+-- 閾値は nav_params の有効行を使い、その version を params_version に記録する
+
+CREATE TABLE IF NOT EXISTS walk_route_matches (
+  walk_id UUID NOT NULL,
+  route_id UUID NOT NULL REFERENCES official_routes ON DELETE CASCADE,
+  walk_table TEXT NOT NULL DEFAULT 'routes',
+  coverage NUMERIC(5, 4) NOT NULL,
+  goal_distance_m NUMERIC(10, 1),
+  is_completed BOOLEAN NOT NULL DEFAULT FALSE,
+  walked_at TIMESTAMPTZ,
+  params_version INTEGER,
+  matched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (walk_id, route_id)
+);
+
+CREATE INDEX IF NOT EXISTS walk_route_matches_route_idx
+  ON walk_route_matches (route_id, is_completed);
+
+ALTER TABLE walk_route_matches ENABLE ROW LEVEL SECURITY;
+
+-- ルートごとの実績（マッチした散歩数・完走数・完走率）
+CREATE OR REPLACE VIEW official_route_walk_stats WITH (security_invoker = true) AS
+SELECT
+  route_id,
+  COUNT(*) AS matched_walks,
+  COUNT(*) FILTER (WHERE is_completed) AS completed_walks,
+  ROUND(AVG(coverage), 4) AS avg_coverage,
+  ROUND(COUNT(*) FILTER (WHERE is_completed)::NUMERIC / NULLIF(COUNT(*), 0), 4) AS completion_rate,
+  MAX(walked_at) AS last_walked_at
+FROM walk_route_matches
+GROUP BY route_id;
+
+COMMENT ON TABLE walk_route_matches IS '散歩記録と公式ルートのマッチング結果（scripts/match_walks_to_routes.py）';
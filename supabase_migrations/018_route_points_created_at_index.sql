@@ -0,0 +1,16 @@
+-- =====================================================
+-- 散歩ポイントの増分読み込み用インデックス
+-- =====================================================
+-- 目的: scripts/walk_heatmap.py が前回の位置 (created_at, id) 以降のポイントだけを
+--       順に読めるようにする（インデックスがないと毎回ポイント全体をソートする）
+-- アプリは route_points、001 適用環境では daily_walk_points に保存している
+
+DO $$
+BEGIN
+  IF to_regclass('public.route_points') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS route_points_created_at_idx ON route_points (created_at, id);
+  END IF;
+  IF to_regclass('public.daily_walk_points') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS daily_walk_points_created_at_idx ON daily_walk_points (created_at, id);
+  END IF;
+END $$;
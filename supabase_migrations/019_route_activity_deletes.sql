@@ -0,0 +1,263 @@
+-- =====================================================
+-- 人気急上昇の日次カウンター: 削除・付け替えの反映
+-- =====================================================
+-- 目的: 014 の route_activity_daily は新しいピン・散歩を加算するだけだったため、
+--       削除されたピン・散歩も窓を抜けるまでスコアに残っていた。
+--       集計済み（created_at が水位以下）の行が削除・付け替えられたら
+--       トリガーで日次バケットを戻す。水位より新しい行は次回の増分集計がそのまま数える。
+--       アプリのユーザーが自分のピン・散歩を消したときも、ポリシーのない maintenance_watermarks /
+--       route_activity_daily を読み書きできるよう、トリガー関数は SECURITY DEFINER にする。
+--
+-- あわせて、get_trending_routes を route_trending_scores への LEFT JOIN にし、
+-- 次回の集計前に追加されたルートもスコア0として一覧に出す。
+
+-- ============================================================
+-- 1. 集計済みの行の削除・付け替えを日次バケットに反映
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION sync_route_activity_daily_pins()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_watermark TIMESTAMPTZ;
+BEGIN
+  -- 増分集計と同時に走っても数え漏れ・二重減算しないよう、水位の行を共有ロックして読む
+  SELECT last_created_at INTO v_watermark
+  FROM maintenance_watermarks WHERE job_name = 'trending:route_pins'
+  FOR SHARE;
+  IF v_watermark IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  IF OLD.route_id IS NOT NULL AND OLD.created_at <= v_watermark THEN
+    UPDATE route_activity_daily
+    SET pins_count = GREATEST(pins_count - 1, 0)
+    WHERE route_id = OLD.route_id
+      AND activity_date = (OLD.created_at AT TIME ZONE 'Asia/Tokyo')::DATE;
+  END IF;
+
+  -- 付け替え後の行も増分集計では拾われないので、ここで加算する
+  IF TG_OP = 'UPDATE' THEN
+    IF NEW.route_id IS NOT NULL AND NEW.created_at <= v_watermark THEN
+      INSERT INTO route_activity_daily (route_id, activity_date, pins_count)
+      VALUES (NEW.route_id, (NEW.created_at AT TIME ZONE 'Asia/Tokyo')::DATE, 1)
+      ON CONFLICT (route_id, activity_date)
+        DO UPDATE SET pins_count = route_activity_daily.pins_count + 1;
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION sync_route_activity_daily_walks()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_watermark TIMESTAMPTZ;
+BEGIN
+  SELECT last_created_at INTO v_watermark
+  FROM maintenance_watermarks WHERE job_name = 'trending:route_walks'
+  FOR SHARE;
+  IF v_watermark IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  -- 窓より前の日のバケットは存在しないので、更新0行で終わる
+  IF OLD.created_at <= v_watermark THEN
+    UPDATE route_activity_daily
+    SET walks_count = GREATEST(walks_count - 1, 0)
+    WHERE route_id = OLD.route_id
+      AND activity_date = (OLD.walked_at AT TIME ZONE 'Asia/Tokyo')::DATE;
+  END IF;
+
+  -- 窓より前の日に加算したバケットは、次回の集計でスコア計算の前に削除される
+  IF TG_OP = 'UPDATE' THEN
+    IF NEW.created_at <= v_watermark THEN
+      INSERT INTO route_activity_daily (route_id, activity_date, walks_count)
+      VALUES (NEW.route_id, (NEW.walked_at AT TIME ZONE 'Asia/Tokyo')::DATE, 1)
+      ON CONFLICT (route_id, activity_date)
+        DO UPDATE SET walks_count = route_activity_daily.walks_count + 1;
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- 新しい行の INSERT は増分集計が数えるので、削除と集計対象の列の変更だけを拾う
+DROP TRIGGER IF EXISTS route_pins_activity_daily_sync ON route_pins;
+CREATE TRIGGER route_pins_activity_daily_sync
+  AFTER DELETE OR UPDATE OF route_id, created_at ON route_pins
+  FOR EACH ROW EXECUTE FUNCTION sync_route_activity_daily_pins();
+
+DROP TRIGGER IF EXISTS route_walks_activity_daily_sync ON route_walks;
+CREATE TRIGGER route_walks_activity_daily_sync
+  AFTER DELETE OR UPDATE OF route_id, walked_at, created_at ON route_walks
+  FOR EACH ROW EXECUTE FUNCTION sync_route_activity_daily_walks();
+
+-- ============================================================
+-- 2. 増分集計: 水位の行をロックしてから数える
+-- ============================================================
+-- 014 からの変更点は水位の読み取りに FOR UPDATE を付けたことだけ
+
+CREATE OR REPLACE FUNCTION refresh_route_trending_scores(
+  p_window_days INT DEFAULT 7,
+  p_half_life_days DOUBLE PRECISION DEFAULT 0,
+  p_walk_weight DOUBLE PRECISION DEFAULT 0,
+  p_lag INTERVAL DEFAULT INTERVAL '1 minute',
+  p_rebuild BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_today DATE := (NOW() AT TIME ZONE 'Asia/Tokyo')::DATE;
+  v_window_start DATE := v_today - (p_window_days - 1);
+  v_window_start_ts TIMESTAMPTZ := v_window_start::TIMESTAMP AT TIME ZONE 'Asia/Tokyo';
+  v_upper TIMESTAMPTZ := NOW() - p_lag;
+  v_pins_from TIMESTAMPTZ;
+  v_walks_from TIMESTAMPTZ;
+  v_new_pins INT := 0;
+  v_new_walks INT := 0;
+  v_pruned INT := 0;
+  v_updated INT := 0;
+BEGIN
+  IF p_rebuild THEN
+    DELETE FROM route_activity_daily;
+    DELETE FROM maintenance_watermarks WHERE job_name LIKE 'trending:%';
+  END IF;
+
+  -- 水位の行をロックしてから数える（削除トリガーは FOR SHARE で待ち、更新後の水位で判定する）
+  SELECT GREATEST(last_created_at, v_window_start_ts) INTO v_pins_from
+  FROM maintenance_watermarks WHERE job_name = 'trending:route_pins'
+  FOR UPDATE;
+  v_pins_from := COALESCE(v_pins_from, v_window_start_ts);
+
+  SELECT GREATEST(last_created_at, v_window_start_ts) INTO v_walks_from
+  FROM maintenance_watermarks WHERE job_name = 'trending:route_walks'
+  FOR UPDATE;
+  v_walks_from := COALESCE(v_walks_from, v_window_start_ts);
+
+  -- 新しいピンを日次バケットに加算
+  WITH new_pins AS (
+    SELECT route_id, (created_at AT TIME ZONE 'Asia/Tokyo')::DATE AS activity_date, COUNT(*)::INT AS cnt
+    FROM route_pins
+    WHERE route_id IS NOT NULL
+      AND created_at > v_pins_from
+      AND created_at <= v_upper
+    GROUP BY 1, 2
+  ), upserted AS (
+    INSERT INTO route_activity_daily (route_id, activity_date, pins_count)
+    SELECT route_id, activity_date, cnt FROM new_pins
+    ON CONFLICT (route_id, activity_date)
+      DO UPDATE SET pins_count = route_activity_daily.pins_count + EXCLUDED.pins_count
+    RETURNING 1
+  )
+  SELECT COALESCE(SUM(cnt), 0)::INT INTO v_new_pins FROM new_pins;
+
+  -- 新しい散歩記録を日次バケットに加算（日付は walked_at 基準）
+  WITH new_walks AS (
+    SELECT route_id, (walked_at AT TIME ZONE 'Asia/Tokyo')::DATE AS activity_date, COUNT(*)::INT AS cnt
+    FROM route_walks
+    WHERE created_at > v_walks_from
+      AND created_at <= v_upper
+      AND walked_at >= v_window_start_ts
+    GROUP BY 1, 2
+  ), upserted AS (
+    INSERT INTO route_activity_daily (route_id, activity_date, walks_count)
+    SELECT route_id, activity_date, cnt FROM new_walks
+    ON CONFLICT (route_id, activity_date)
+      DO UPDATE SET walks_count = route_activity_daily.walks_count + EXCLUDED.walks_count
+    RETURNING 1
+  )
+  SELECT COALESCE(SUM(cnt), 0)::INT INTO v_new_walks FROM new_walks;
+
+  INSERT INTO maintenance_watermarks (job_name, last_created_at, updated_at)
+  VALUES ('trending:route_pins', v_upper, NOW()), ('trending:route_walks', v_upper, NOW())
+  ON CONFLICT (job_name)
+    DO UPDATE SET last_created_at = EXCLUDED.last_created_at, updated_at = EXCLUDED.updated_at;
+
+  -- 窓の外に出た日次バケットを削除
+  DELETE FROM route_activity_daily WHERE activity_date < v_window_start;
+  GET DIAGNOSTICS v_pruned = ROW_COUNT;
+
+  -- ルート×日数分の小さな集計からスコアを再計算（変化した行だけ更新）
+  WITH totals AS (
+    SELECT
+      r.id AS route_id,
+      COALESCE(SUM(d.pins_count), 0)::INT AS pins,
+      COALESCE(SUM(d.walks_count), 0)::INT AS walks,
+      COALESCE(SUM(
+        (d.pins_count + p_walk_weight * d.walks_count)
+        * CASE
+            WHEN p_half_life_days > 0 THEN POWER(0.5, (v_today - d.activity_date) / p_half_life_days)
+            ELSE 1
+          END
+      ), 0)::DOUBLE PRECISION AS score
+    FROM official_routes r
+    LEFT JOIN route_activity_daily d ON d.route_id = r.id
+    GROUP BY r.id
+  ), changed AS (
+    INSERT INTO route_trending_scores AS s (route_id, recent_pins_count, recent_walks_count, trending_score, updated_at)
+    SELECT route_id, pins, walks, score, NOW() FROM totals
+    ON CONFLICT (route_id) DO UPDATE
+      SET recent_pins_count = EXCLUDED.recent_pins_count,
+          recent_walks_count = EXCLUDED.recent_walks_count,
+          trending_score = EXCLUDED.trending_score,
+          updated_at = EXCLUDED.updated_at
+      WHERE (s.recent_pins_count, s.recent_walks_count, s.trending_score)
+        IS DISTINCT FROM (EXCLUDED.recent_pins_count, EXCLUDED.recent_walks_count, EXCLUDED.trending_score)
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INT INTO v_updated FROM changed;
+
+  RETURN jsonb_build_object(
+    'new_pins', v_new_pins,
+    'new_walks', v_new_walks,
+    'pruned_days', v_pruned,
+    'updated_routes', v_updated,
+    'watermark', v_upper
+  );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- 3. get_trending_routes: 集計前の新しいルートもスコア0で含める
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_trending_routes(
+  p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+  route_id UUID,
+  route_name TEXT,
+  area_name TEXT,
+  distance_meters FLOAT,
+  estimated_minutes INT,
+  difficulty_level TEXT,
+  recent_pins_count INT,
+  total_pins INT,
+  thumbnail_url TEXT,
+  features TEXT[]
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    r.id,
+    r.name,
+    a.name,
+    r.distance_meters,
+    r.estimated_minutes,
+    r.difficulty_level,
+    COALESCE(s.recent_pins_count, 0),
+    r.total_pins,
+    a.thumbnail_url,
+    r.features
+  FROM official_routes r
+  INNER JOIN areas a ON r.area_id = a.id
+  LEFT JOIN route_trending_scores s ON s.route_id = r.id
+  WHERE r.is_active = TRUE
+  ORDER BY COALESCE(s.trending_score, 0) DESC, COALESCE(s.recent_pins_count, 0) DESC, r.total_pins DESC
+  LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION get_trending_routes IS '人気急上昇中のルートを取得（route_trending_scores の事前集計を参照、未集計のルートはスコア0）';
+
+-- 既存の日次カウンターには削除済みの行が残っているため作り直す
+SELECT refresh_route_trending_scores(p_rebuild => TRUE);
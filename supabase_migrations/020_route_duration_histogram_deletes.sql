@@ -0,0 +1,55 @@
+-- =====================================================
+-- 所要時間ヒストグラム: 散歩記録の削除・修正の反映
+-- =====================================================
+-- 目的: 016 の route_duration_histogram は scripts/estimate_durations.py が
+--       新しい route_walks を加算するだけだったため、削除・修正された散歩が残り続けていた。
+--       加算済み（created_at が水位 'duration:route_walks' 以下）の散歩が削除・修正されたら
+--       トリガーでヒストグラムから差し引き、修正後の値を加算する。
+--       水位より新しい散歩は次回のジョブがそのまま数える。
+--       ユーザー自身による削除・修正でも RLS で水位が読めずに素通りしないよう、SECURITY DEFINER にする。
+--
+-- 加算の条件はジョブと同じ（route_id があり、duration_minutes > 0、1440分で頭打ち）。
+
+CREATE OR REPLACE FUNCTION sync_route_duration_histogram()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_watermark TIMESTAMPTZ;
+BEGIN
+  -- ジョブは水位の行を FOR UPDATE してから数えるので、同時に走っても二重に数えない
+  SELECT last_created_at INTO v_watermark
+  FROM maintenance_watermarks WHERE job_name = 'duration:route_walks'
+  FOR SHARE;
+  IF v_watermark IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  IF OLD.created_at <= v_watermark AND OLD.route_id IS NOT NULL AND OLD.duration_minutes > 0 THEN
+    UPDATE route_duration_histogram
+    SET walks = walks - 1
+    WHERE route_id = OLD.route_id AND minutes = LEAST(OLD.duration_minutes, 1440);
+    DELETE FROM route_duration_histogram
+    WHERE route_id = OLD.route_id AND minutes = LEAST(OLD.duration_minutes, 1440) AND walks <= 0;
+  END IF;
+
+  IF TG_OP = 'UPDATE' THEN
+    IF NEW.created_at <= v_watermark AND NEW.route_id IS NOT NULL AND NEW.duration_minutes > 0 THEN
+      INSERT INTO route_duration_histogram AS h (route_id, minutes, walks)
+      VALUES (NEW.route_id, LEAST(NEW.duration_minutes, 1440), 1)
+      ON CONFLICT (route_id, minutes) DO UPDATE SET walks = h.walks + 1;
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- 新しい散歩の INSERT はジョブが数えるので、削除と集計対象の列の変更だけを拾う
+DROP TRIGGER IF EXISTS route_walks_duration_histogram_sync ON route_walks;
+CREATE TRIGGER route_walks_duration_histogram_sync
+  AFTER DELETE OR UPDATE OF route_id, duration_minutes, created_at ON route_walks
+  FOR EACH ROW EXECUTE FUNCTION sync_route_duration_histogram();
+
+COMMENT ON FUNCTION sync_route_duration_histogram IS '加算済みの散歩の削除・修正を route_duration_histogram に反映';
+
+-- 既存のヒストグラムには削除済みの散歩が残っているため、次回のジョブで作り直す
+DELETE FROM route_duration_histogram;
+DELETE FROM maintenance_watermarks WHERE job_name = 'duration:route_walks';
@@ -0,0 +1,26 @@
+-- =====================================================
+-- official_routes.updated_at の自動更新
+-- =====================================================
+-- 目的: local_mirror.py（offline_packs / route_vector_tiles / pin_cluster_tiles / route_dedup が使う）と
+--       route_resolver.py は official_routes.updated_at を水位にして変わった行だけを取り直すが、
+--       updated_at を更新しているのは sync_route_catalog.py だけで、pet_info・サムネイル・標高・所要時間・
+--       total_walks・is_active などを書き換えるスクリプトやトリガーの変更はミラーに届いていなかった。
+--       他のテーブルと同じ update_updated_at_column() を BEFORE UPDATE トリガーで付ける。
+--
+-- update_updated_at_column() は complete_schema_with_social.sql で定義しているが、
+-- 番号付きのマイグレーションだけを適用した環境にはないため、ここでも同じ内容で定義する。
+
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_official_routes_updated_at ON official_routes;
+CREATE TRIGGER update_official_routes_updated_at BEFORE UPDATE ON official_routes
+  FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- 水位での絞り込みと並べ替え用
+CREATE INDEX IF NOT EXISTS official_routes_updated_at_idx ON official_routes (updated_at, id);
@@ -0,0 +1,66 @@
+-- =====================================================
+-- 公式ルートの部分更新をまとめて適用するRPC
+-- =====================================================
+-- 目的: sync_route_catalog.py / sync_pet_info.py / update_hakone_pet_info.py は、
+--       変わったルートごとに変わった列だけを PATCH していたため、ルート数だけリクエストが飛んでいた。
+--       行全体を upsert するとトリガーが更新した total_pins / total_walks を取得時点の値に戻してしまうので、
+--       「行ごとに送ったキーの列だけを書く」部分更新のまま、1回の UPDATE ... FROM にまとめる。
+--
+-- p_rows: [{"id": "...", "<列名>": <値>, ...}, ...]
+--   - 各要素に含まれるキーの列だけを更新し、含まれない列は現在の値のまま（行ごとに違う列でもよい）
+--   - 値は jsonb_populate_record で列の型に変換する（geography は 'SRID=4326;POINT(lng lat)' の文字列）
+--   - official_routes にない列名が含まれていたら何も書かずにエラーにする
+-- 戻り値: 更新した行数
+--
+-- SECURITY INVOKER のままなので、RLS で official_routes を書けない利用者が呼んでも何も変わらない。
+
+CREATE OR REPLACE FUNCTION apply_official_route_updates(p_rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  v_keys TEXT[];
+  v_unknown TEXT[];
+  v_set TEXT;
+  v_updated INTEGER;
+BEGIN
+  SELECT ARRAY(
+    SELECT DISTINCT k
+    FROM jsonb_array_elements(p_rows) AS e(value), jsonb_object_keys(e.value) AS k
+    WHERE k <> 'id'
+    ORDER BY k
+  ) INTO v_keys;
+  IF cardinality(v_keys) = 0 THEN
+    RETURN 0;
+  END IF;
+
+  SELECT ARRAY(
+    SELECT k FROM unnest(v_keys) AS k
+    WHERE NOT EXISTS (
+      SELECT 1 FROM information_schema.columns c
+      WHERE c.table_schema = 'public' AND c.table_name = 'official_routes' AND c.column_name = k
+    )
+  ) INTO v_unknown;
+  IF cardinality(v_unknown) > 0 THEN
+    RAISE EXCEPTION 'official_routes に存在しない列です: %', array_to_string(v_unknown, ', ')
+      USING ERRCODE = 'undefined_column';
+  END IF;
+
+  SELECT string_agg(format('%1$I = CASE WHEN d.value ? %1$L THEN x.%1$I ELSE r.%1$I END', k), ', ')
+  INTO v_set
+  FROM unnest(v_keys) AS k;
+
+  EXECUTE format(
+    'UPDATE official_routes r SET %s
+     FROM jsonb_array_elements($1) AS d(value),
+          LATERAL jsonb_populate_record(NULL::official_routes, d.value) AS x
+     WHERE r.id = (d.value->>''id'')::uuid',
+    v_set
+  ) USING p_rows;
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql SET search_path = public;
+
+REVOKE ALL ON FUNCTION apply_official_route_updates(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION apply_official_route_updates(JSONB) TO service_role;
+
+COMMENT ON FUNCTION apply_official_route_updates IS '公式ルートの部分更新（行ごとに送った列だけ）を1回の UPDATE で適用';